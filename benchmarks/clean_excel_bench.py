@@ -0,0 +1,75 @@
+"""
+clean_excel_data mikro-benchmark'ı: eski karakter karakter temizleyici ile
+vektörel sürümün satır/sn verimini karşılaştırır.
+
+    python -m benchmarks.clean_excel_bench --rows 1000000
+"""
+import argparse
+import time
+import numpy as np
+import pandas as pd
+from src.excel_writer import clean_excel_data
+
+LEGACY_ILLEGAL_CHARS = ['\x00', '\x01', '\x02', '\x03', '\x04', '\x05', '\x06', '\x07',
+                        '\x08', '\x0b', '\x0c', '\x0e', '\x0f', '\x10', '\x11', '\x12',
+                        '\x13', '\x14', '\x15', '\x16', '\x17', '\x18', '\x19', '\x1a',
+                        '\x1b', '\x1c', '\x1d', '\x1e', '\x1f', '\x7f']
+
+
+def legacy_clean_excel_data(df):
+    """Önceki uygulama (karşılaştırma için)"""
+    for column in df.columns:
+        if df[column].dtype == 'object':
+            df[column] = df[column].astype(str).apply(
+                lambda x: ''.join(c for c in x if c not in LEGACY_ILLEGAL_CHARS) if isinstance(x, str) else x
+            )
+    return df
+
+
+def make_frame(rows, dirty_rate=0.01, seed=42):
+    """Sonuç tablosuna benzeyen, bir kısmı geçersiz karakter içeren sentetik veri"""
+    rng = np.random.default_rng(seed)
+    details = np.array([
+        "Siparişim eksik geldi", "Kupon kodu çalışmıyor", "İade süreci hakkında bilgi",
+        "Kargo takip numarası", "Şifremi sıfırlayamıyorum"
+    ], dtype=object)
+    intent_detay = details[rng.integers(0, len(details), rows)]
+    dirty = rng.random(rows) < dirty_rate
+    intent_detay[dirty] = [f"{value}\x0b\x1f" for value in intent_detay[dirty]]
+
+    return pd.DataFrame({
+        'sohbet_id': np.arange(rows),
+        'sohbet_baslangic': np.full(rows, "04.09.2024 09:00:00", dtype=object),
+        'toplam_sure': np.full(rows, "3 dk", dtype=object),
+        'sentiment': rng.choice(np.array(["Pozitif", "Negatif", "Nötr"], dtype=object), rows),
+        'intent_detay': intent_detay,
+        'hata_nedeni': np.where(rng.random(rows) < 0.02, "rate_limit", None)
+    })
+
+
+def measure(func, df):
+    start = time.perf_counter()
+    func(df)
+    return time.perf_counter() - start
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="clean_excel_data verim ölçümü")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--dirty-rate", type=float, default=0.01)
+    parser.add_argument("--skip-legacy", action="store_true", help="Eski uygulamayı ölçmez")
+    args = parser.parse_args(argv)
+
+    df = make_frame(args.rows, args.dirty_rate)
+    print(f"📏 {args.rows} satır, {len(df.columns)} sütun, %{args.dirty_rate * 100:.1f} kirli")
+
+    elapsed = measure(clean_excel_data, df.copy())
+    print(f"⚡ Vektörel: {elapsed:.2f} sn ({args.rows / elapsed:,.0f} satır/sn)")
+
+    if not args.skip_legacy:
+        legacy = measure(legacy_clean_excel_data, df.copy())
+        print(f"🐢 Eski: {legacy:.2f} sn ({args.rows / legacy:,.0f} satır/sn) - {legacy / elapsed:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,251 @@
+"""
+Yerel, OpenAI uyumlu sahte LLM sunucusu. Chat Completions (tekli ve
+paketlenmiş şema) ile Batch API uçlarını (dosya yükleme, batch oluşturma,
+durum sorgulama, çıktı indirme) taklit eder. Gecikme, hata oranı ve 429
+oranı ayarlanabilir; etiketler ChatAnalysis şemasındaki değerlerden seçilir.
+
+    python -m benchmarks.mock_server --port 8765 --latency 0.2 --rate-limit-rate 0.05
+    OPENAI_API_KEY=x OPENAI_BASE_URL=http://127.0.0.1:8765/v1 python -m src.main
+"""
+import argparse
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from email.parser import BytesParser
+from email.policy import default as default_policy
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from typing import get_args
+from src.chat_analyzer import ChatAnalysis
+
+LABEL_CHOICES = {
+    name: get_args(field.annotation)
+    for name, field in ChatAnalysis.model_fields.items()
+    if get_args(field.annotation)
+}
+PACKED_ID_PATTERN = re.compile(r"Sohbet ID: (\S+)")
+
+
+def random_analysis(rng):
+    """Şemaya uygun rastgele bir analiz sonucu"""
+    result = {name: rng.choice(values) for name, values in LABEL_CHOICES.items()}
+    result['intent_detay'] = f"{result['intent']} talebi"
+    return result
+
+
+class MockState:
+    """Sunucu ayarları ve Batch API için bellekteki dosya/iş kayıtları"""
+
+    def __init__(self, latency=0.0, jitter=0.0, error_rate=0.0, rate_limit_rate=0.0, retry_after=1.0,
+                 batch_polls=1, seed=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.retry_after = retry_after
+        self.batch_polls = batch_polls
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.files = {}
+        self.batches = {}
+        self.request_count = 0
+
+    def roll(self):
+        """Bu istek için hata kodu (429/500) veya None"""
+        with self.lock:
+            self.request_count += 1
+            r = self.rng.random()
+        if r < self.rate_limit_rate:
+            return 429
+        if r < self.rate_limit_rate + self.error_rate:
+            return 500
+        return None
+
+    def analysis(self):
+        with self.lock:
+            return random_analysis(self.rng)
+
+    def confidence(self):
+        with self.lock:
+            return round(self.rng.uniform(0.4, 1.0), 2)
+
+    def delay(self):
+        with self.lock:
+            return self.latency + self.rng.uniform(0, self.jitter)
+
+
+def completion_body(state, body):
+    """Chat Completions isteğine şemaya uygun yanıt gövdesi üretir"""
+    messages = body.get('messages', [])
+    prompt = messages[-1].get('content', '') if messages else ''
+    schema = (body.get('response_format') or {}).get('json_schema', {}).get('schema', {})
+    properties = schema.get('properties', {})
+
+    if 'sonuclar' in properties:
+        # Paketlenmiş istek: her "Sohbet ID" başlığı için ayrı sonuç
+        content = {'sonuclar': [{**state.analysis(), 'sohbet_id': chat_id}
+                                for chat_id in PACKED_ID_PATTERN.findall(prompt)]}
+    else:
+        content = state.analysis()
+        if 'guven' in properties:
+            # Model yönlendirme şeması
+            content['guven'] = state.confidence()
+
+    prompt_tokens = sum(len(str(message.get('content', ''))) for message in messages) // 4
+    system_tokens = len(str(messages[0].get('content', ''))) // 4 if len(messages) > 1 else 0
+    return {
+        'id': f"chatcmpl-{uuid.uuid4().hex[:12]}",
+        'object': 'chat.completion',
+        'created': int(time.time()),
+        'model': body.get('model', 'mock'),
+        'choices': [{
+            'index': 0,
+            'finish_reason': 'stop',
+            'message': {'role': 'assistant', 'content': json.dumps(content, ensure_ascii=False)}
+        }],
+        'usage': {
+            'prompt_tokens': prompt_tokens,
+            'completion_tokens': 30,
+            'total_tokens': prompt_tokens + 30,
+            'prompt_tokens_details': {'cached_tokens': system_tokens // 64 * 64}
+        }
+    }
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    state = None
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, status, payload=None, raw=None, headers=None):
+        data = raw if raw is not None else json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _error(self, status, message):
+        headers = {'retry-after': str(self.state.retry_after)} if status == 429 else None
+        self._send(status, {'error': {'message': message, 'type': 'mock_error', 'code': None}}, headers=headers)
+
+    def do_POST(self):
+        data = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        if self.path.endswith('/chat/completions'):
+            time.sleep(self.state.delay())
+            status = self.state.roll()
+            if status == 429:
+                return self._error(429, "Rate limit reached")
+            if status == 500:
+                return self._error(500, "Internal server error")
+            return self._send(200, completion_body(self.state, json.loads(data)))
+        if self.path.endswith('/files'):
+            return self._create_file(data)
+        if self.path.endswith('/batches'):
+            return self._create_batch(json.loads(data))
+        self._error(404, f"Bilinmeyen uç: {self.path}")
+
+    def do_GET(self):
+        match = re.search(r'/batches/([^/]+)$', self.path)
+        if match:
+            return self._retrieve_batch(match.group(1))
+        match = re.search(r'/files/([^/]+)/content$', self.path)
+        if match and match.group(1) in self.state.files:
+            return self._send(200, raw=self.state.files[match.group(1)])
+        self._error(404, f"Bilinmeyen uç: {self.path}")
+
+    def _create_file(self, data):
+        """multipart/form-data ile yüklenen dosyayı saklar"""
+        header = f"Content-Type: {self.headers['Content-Type']}\r\n\r\n".encode('utf-8')
+        message = BytesParser(policy=default_policy).parsebytes(header + data)
+        content = b''
+        for part in message.iter_parts():
+            if part.get_param('name', header='content-disposition') == 'file':
+                content = part.get_payload(decode=True)
+        file_id = f"file-{uuid.uuid4().hex[:12]}"
+        self.state.files[file_id] = content
+        self._send(200, {'id': file_id, 'object': 'file', 'bytes': len(content), 'created_at': int(time.time()),
+                         'filename': 'batch.jsonl', 'purpose': 'batch', 'status': 'processed'})
+
+    def _create_batch(self, body):
+        batch_id = f"batch_{uuid.uuid4().hex[:12]}"
+        lines = self.state.files.get(body['input_file_id'], b'').decode('utf-8').splitlines()
+        batch = {
+            'id': batch_id, 'object': 'batch', 'endpoint': body['endpoint'],
+            'input_file_id': body['input_file_id'], 'completion_window': body.get('completion_window', '24h'),
+            'status': 'in_progress', 'created_at': int(time.time()), 'output_file_id': None,
+            'request_counts': {'total': len(lines), 'completed': 0, 'failed': 0}
+        }
+        self.state.batches[batch_id] = {'batch': batch, 'lines': lines, 'polls': 0}
+        self._send(200, batch)
+
+    def _retrieve_batch(self, batch_id):
+        record = self.state.batches.get(batch_id)
+        if record is None:
+            return self._error(404, f"Batch bulunamadı: {batch_id}")
+        batch = record['batch']
+        record['polls'] += 1
+        if batch['status'] == 'in_progress' and record['polls'] > self.state.batch_polls:
+            self._complete_batch(batch, record.pop('lines'))
+        self._send(200, batch)
+
+    def _complete_batch(self, batch, lines):
+        """Her satır için (hata oranına göre) başarılı veya 500 yanıtı içeren çıktı dosyası üretir"""
+        output = []
+        failed = 0
+        for line in lines:
+            request = json.loads(line)
+            status = 500 if self.state.roll() else 200
+            failed += status != 200
+            body = completion_body(self.state, request['body']) if status == 200 else {'error': 'mock_error'}
+            output.append(json.dumps({'id': f"batch_req_{uuid.uuid4().hex[:12]}", 'custom_id': request['custom_id'],
+                                      'response': {'status_code': status, 'body': body}}, ensure_ascii=False))
+        file_id = f"file-{uuid.uuid4().hex[:12]}"
+        self.state.files[file_id] = ("\n".join(output) + "\n").encode('utf-8')
+        batch.update(status='completed', output_file_id=file_id,
+                     request_counts={'total': len(lines), 'completed': len(lines) - failed, 'failed': failed})
+
+
+def create_server(host="127.0.0.1", port=8765, **options):
+    """Ayarlanmış sahte sunucuyu oluşturur (serve_forever ile çalıştırılır)"""
+    handler = type('ConfiguredMockHandler', (MockHandler,), {'state': MockState(**options)})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="OpenAI uyumlu sahte LLM sunucusu")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.05, help="Yanıt başına sabit gecikme (sn)")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Gecikmeye eklenen rastgele süre üst sınırı (sn)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="500 dönen isteklerin oranı (0-1)")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="429 dönen isteklerin oranı (0-1)")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="429 yanıtlarındaki retry-after (sn)")
+    parser.add_argument("--batch-polls", type=int, default=1, help="Batch işi tamamlanmadan önceki sorgu sayısı")
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args(argv)
+
+    server = create_server(
+        args.host, args.port, latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate, retry_after=args.retry_after, batch_polls=args.batch_polls,
+        seed=args.seed
+    )
+    print(f"🧪 Sahte LLM sunucusu: http://{args.host}:{args.port}/v1", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,310 @@
+"""
+Uçtan uca verim ölçümü: sentetik veri (yoksa üretilir) sahte LLM sunucusuna
+karşı src.main ile aynı yoldan (akışla okuma, --workers ile ön işleme,
+AnalysisPipeline) analiz edilir; ardından raporlar ve Excel ayrı ölçülür.
+Aşama başına sohbet/sn, en yüksek bellek (RSS), hat içi alt aşama süreleri ve
+istek gecikmesi p50/p95 raporlanır; sonuçlar sürümler arası karşılaştırma
+için JSON dosyasına yazılır.
+
+    python -m benchmarks.run_benchmarks --chats 10000 --mode async --concurrency 64
+    python -m benchmarks.run_benchmarks --chats 100000 --compare benchmarks/results/onceki.json
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import resource
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+import numpy as np
+from config.settings import settings
+from benchmarks.synthetic_data import write_dataset
+
+STAGES = ['pipeline', 'reports', 'excel']
+
+
+def _reset_peak_rss():
+    """Linux'ta en yüksek RSS değerini (VmHWM) sıfırlar; desteklenmiyorsa süreç geneli tepe kullanılır"""
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+    except OSError:
+        pass
+
+
+def _peak_rss_mb():
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    # ru_maxrss Linux'ta KB, macOS'ta bayt
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def percentiles(values):
+    """Gecikme listesinin p50/p95/p99 değerleri (ms)"""
+    if not values:
+        return {}
+    p50, p95, p99 = np.percentile(np.asarray(values) * 1000, [50, 95, 99])
+    return {'p50_ms': round(float(p50), 1), 'p95_ms': round(float(p95), 1), 'p99_ms': round(float(p99), 1)}
+
+
+class StageRunner:
+    """Aşamaları ölçer; aşama içindeki sohbet başına çıktılar varsayılan olarak susturulur"""
+
+    def __init__(self, verbose=False):
+        self.verbose = verbose
+        self.stages = []
+
+    def run(self, name, func, count=None):
+        """count verilmezse len(değer); çağrılabilirse değerden hesaplanır"""
+        _reset_peak_rss()
+        output = contextlib.nullcontext() if self.verbose else contextlib.redirect_stdout(io.StringIO())
+        start = time.perf_counter()
+        with output:
+            value, extra = func()
+        elapsed = time.perf_counter() - start
+
+        items = count(value) if callable(count) else count if count is not None else len(value)
+        stage = {
+            'stage': name,
+            'seconds': round(elapsed, 3),
+            'chats': items,
+            'chats_per_sec': round(items / elapsed, 1) if elapsed > 0 else None,
+            'peak_rss_mb': _peak_rss_mb(),
+            **(extra or {})
+        }
+        self.stages.append(stage)
+        print(f"⏱️ {name:<10} {stage['seconds']:>9.2f} sn  {stage['chats_per_sec'] or 0:>12,.1f} sohbet/sn  "
+              f"{stage['peak_rss_mb']:>8.1f} MB" + (f"  p50 {extra['p50_ms']} ms / p95 {extra['p95_ms']} ms"
+                                                    if extra and 'p50_ms' in extra else ""))
+        return value
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+@contextlib.contextmanager
+def mock_server(args):
+    """Sahte sunucuyu ayrı süreçte başlatır (istemciyle aynı GIL'i paylaşmaz)"""
+    if args.base_url:
+        yield args.base_url
+        return
+
+    port = _free_port()
+    command = [
+        sys.executable, '-m', 'benchmarks.mock_server', '--port', str(port),
+        '--latency', str(args.latency), '--jitter', str(args.jitter), '--error-rate', str(args.error_rate),
+        '--rate-limit-rate', str(args.rate_limit_rate), '--retry-after', str(args.retry_after), '--seed', '42'
+    ]
+    process = subprocess.Popen(command, stdout=subprocess.DEVNULL)
+    try:
+        deadline = time.monotonic() + 30
+        while True:
+            try:
+                socket.create_connection(('127.0.0.1', port), timeout=0.5).close()
+                break
+            except OSError:
+                if process.poll() is not None or time.monotonic() > deadline:
+                    raise RuntimeError("Sahte sunucu başlatılamadı")
+                time.sleep(0.1)
+        yield f"http://127.0.0.1:{port}/v1"
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def instrument_latency(analyzer, latencies):
+    """API çağrılarını, her denemenin istek süresini (limit/yeniden deneme beklemeleri hariç) kaydeden sarmalayıcılarla değiştirir"""
+    call = analyzer._call_with_retry
+    call_async = analyzer._call_with_retry_async
+
+    def timed(request, attempt_times=None):
+        times = []
+        try:
+            return call(request, times)
+        finally:
+            latencies.extend(times)
+            if attempt_times is not None:
+                attempt_times.extend(times)
+
+    async def timed_async(request, token_estimate, attempt_times=None):
+        times = []
+        try:
+            return await call_async(request, token_estimate, times)
+        finally:
+            latencies.extend(times)
+            if attempt_times is not None:
+                attempt_times.extend(times)
+
+    analyzer._call_with_retry = timed
+    analyzer._call_with_retry_async = timed_async
+
+
+def run(args, data_path, base_url, work_dir):
+    from src.data_processor import DataProcessor
+    from src.chat_analyzer import ChatAnalyzer
+    from src.preprocessing import ChatPreprocessor
+    from src.pipeline import AnalysisPipeline, ExcelSpool
+    from src.report_generator import ReportGenerator
+    from src.result_store import ResultStore
+    from src.metrics import metrics
+    from src.main import export_excel, EXCEL_MAX_ROWS
+
+    settings.OPENAI_API_KEY = settings.OPENAI_API_KEY or 'benchmark'
+    settings.OPENAI_BASE_URL = base_url
+    settings.RATE_LIMIT_RPM = args.rpm
+    settings.RATE_LIMIT_TPM = args.tpm
+    settings.BATCH_POLL_INTERVAL = 0.1
+
+    runner = StageRunner(args.verbose)
+    selected = set(args.stages)
+    analyzer = ChatAnalyzer(max_concurrency=args.concurrency)
+    excel = ExcelSpool(EXCEL_MAX_ROWS) if 'excel' in selected else None
+
+    def analyze():
+        # src.main ile aynı yol: sohbetler okundukça ön işlenir, analiz edilir,
+        # Parquet'e yazılır ve rapor sayaçlarına eklenir
+        latencies = []
+        instrument_latency(analyzer, latencies)
+        metrics.reset()
+        processor = DataProcessor(data_path, streaming=True)
+        raw_chats = processor.iter_raw_chats()
+        if args.workers:
+            chats = ChatPreprocessor(analyzer, args.workers).iter_chats(raw_chats)
+        else:
+            chats = processor.iter_chats(raw_chats)
+        writer = ResultStore(os.path.join(work_dir, 'parquet')).open_writer()
+        pipeline = AnalysisPipeline(analyzer, args.mode, writer=writer, excel=excel,
+                                    batch_dir=os.path.join(work_dir, 'batch'))
+        pipeline.run(chats)
+        return pipeline, {
+            'mode': args.mode,
+            'workers': args.workers,
+            'requests': len(latencies),
+            'retries': analyzer.retry_count,
+            'fallbacks': dict(analyzer.fallback_reasons),
+            **percentiles(latencies),
+            # Hat içindeki aşamaların (okuma, çıkarım, prompt, zaman metrikleri, Parquet...) toplam süreleri
+            'substages': {stage: item['seconds'] for stage, item in metrics.to_dict()['stages'].items()}
+        }
+
+    pipeline = runner.run('pipeline', analyze, count=lambda pipeline: pipeline.count)
+
+    if 'reports' in selected:
+        report_generator = ReportGenerator()
+        output_paths = {name: os.path.join(work_dir, f"{name}.txt")
+                        for name in ('swot', 'recommendations', 'demand_summary', 'accuracy_report', 'timing')}
+
+        def reports():
+            accuracy_results = report_generator.accuracy_from_aggregates(pipeline.aggregates)
+            return report_generator.save_reports(pipeline.aggregates, output_paths, accuracy_results,
+                                                 timing=pipeline.timing), None
+
+        runner.run('reports', reports, count=pipeline.count)
+
+    if excel is not None:
+        if excel.overflowed:
+            excel.close()
+            print(f"⚠️ {excel.rows} satır Excel sınırını aşıyor, excel aşaması atlandı")
+        else:
+            path = os.path.join(work_dir, 'sohbet_analiz.xlsx')
+            runner.run('excel', lambda: (export_excel(excel.chunks, path), None), count=excel.rows)
+            excel.close()
+
+    return runner.stages
+
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(stages, previous_path):
+    """Önceki sonuç dosyasına göre aşama bazında verim değişimini yazdırır"""
+    with open(previous_path, 'r', encoding='utf-8') as f:
+        previous = {stage['stage']: stage for stage in json.load(f)['stages']}
+    print(f"\n📉 Karşılaştırma: {previous_path}")
+    for stage in stages:
+        before = previous.get(stage['stage'])
+        if before and before.get('chats_per_sec') and stage.get('chats_per_sec'):
+            ratio = stage['chats_per_sec'] / before['chats_per_sec']
+            icon = "✅" if ratio >= 0.95 else "⚠️"
+            print(f"   {icon} {stage['stage']:<10} {before['chats_per_sec']:>12,.1f} → "
+                  f"{stage['chats_per_sec']:>12,.1f} sohbet/sn ({ratio:.2f}x)")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Sohbet analiz hattı verim ölçümü")
+    parser.add_argument("--chats", type=int, default=10_000, help="Sentetik sohbet sayısı (10000, 100000, 1000000)")
+    parser.add_argument("--data", help="Hazır veri dosyası (verilmezse benchmarks/data altında üretilir)")
+    parser.add_argument("--mode", choices=["sync", "async", "batch", "packed"], default="async")
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--workers", type=int, default=0, help="Ön işleme süreç sayısı (0 = sıralı)")
+    parser.add_argument("--stages", nargs="+", choices=STAGES, default=STAGES,
+                        help="Ölçülecek aşamalar (analiz hattı her zaman çalışır)")
+    parser.add_argument("--base-url", help="Harici sunucu; verilmezse sahte sunucu başlatılır")
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--jitter", type=float, default=0.02)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0)
+    parser.add_argument("--retry-after", type=float, default=0.2)
+    parser.add_argument("--rpm", type=int, default=1_000_000, help="İstemci tarafı RPM bütçesi")
+    parser.add_argument("--tpm", type=int, default=1_000_000_000, help="İstemci tarafı TPM bütçesi")
+    parser.add_argument("--output", help="Sonuç JSON dosyası (varsayılan: benchmarks/results/...)")
+    parser.add_argument("--compare", help="Karşılaştırılacak önceki sonuç JSON dosyası")
+    parser.add_argument("--verbose", action="store_true", help="Aşama içi çıktıları gösterir")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    data_path = args.data or os.path.join("benchmarks", "data", f"sohbet_{args.chats}.jsonl")
+    if not os.path.exists(data_path):
+        print(f"🧬 Sentetik veri üretiliyor: {data_path}")
+        write_dataset(data_path, args.chats)
+
+    print(f"🏁 Ölçüm: {data_path}, {args.mode} mod, eşzamanlılık {args.concurrency}")
+    with mock_server(args) as base_url, tempfile.TemporaryDirectory(prefix="benchmark-") as work_dir:
+        stages = run(args, data_path, base_url, work_dir)
+
+    result = {
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'commit': _git_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'data': data_path,
+        'config': {key: value for key, value in vars(args).items() if key not in ('output', 'compare')},
+        'stages': stages
+    }
+    output = args.output or os.path.join(
+        "benchmarks", "results", f"benchmark_{args.chats}_{args.mode}_{datetime.now():%Y%m%d_%H%M%S}.json"
+    )
+    os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(result, f, ensure_ascii=False, indent=2)
+    print(f"💾 Sonuçlar: {output}")
+
+    if args.compare:
+        compare(stages, args.compare)
+
+
+if __name__ == "__main__":
+    main()
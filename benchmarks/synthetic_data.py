@@ -0,0 +1,91 @@
+"""
+Örnek veri setinin (data/40-sohbet-trendyol-mila.json) yapısında sentetik
+sohbetler üretir. Şablon sohbetler rastgele seçilir; sohbet_id, başlangıç
+zamanı ve mesaj aralıkları her sohbet için yeniden üretilir, hazır etiketler
+korunur. Çıktı NDJSON/JSONL'dir (akış modu için) veya .json uzantısıyla dizi.
+
+    python -m benchmarks.synthetic_data --chats 100000 --output benchmarks/data/sohbet_100k.jsonl
+"""
+import argparse
+import json
+import os
+import random
+from datetime import datetime, timedelta
+from config.settings import settings
+from utils.helpers import load_json_file
+
+TIMESTAMP_FORMAT = "%d.%m.%Y %H:%M:%S"
+FIRST_ID = 1_000_000
+START_DATE = datetime(2024, 9, 1)
+# Üretilen sohbetlerin yayıldığı gün sayısı (tarih bölümleri için)
+SPREAD_DAYS = 30
+
+
+def load_templates(source=None):
+    """Şablon sohbetleri ve mesajlarının başlangıca göre saniye farklarını hazırlar"""
+    templates = []
+    for chat in load_json_file(source or settings.DATA_FILE) or []:
+        start = datetime.strptime(chat['tarih_saat'], TIMESTAMP_FORMAT)
+        offsets = [
+            (datetime.strptime(message['timestamp'], TIMESTAMP_FORMAT) - start).total_seconds()
+            for message in chat.get('mesajlar', [])
+        ]
+        templates.append((chat, offsets))
+    return templates
+
+
+def generate_chats(count, templates, seed=42):
+    """count adet sentetik sohbet üretir (generator)"""
+    rng = random.Random(seed)
+    spread = SPREAD_DAYS * 24 * 3600
+    for i in range(count):
+        template, offsets = rng.choice(templates)
+        start = START_DATE + timedelta(seconds=rng.randrange(spread))
+        # Mesaj aralıkları sıra bozulmadan %50-%150 arasında ölçeklenir
+        scale = rng.uniform(0.5, 1.5)
+        messages = [
+            {**message, 'timestamp': (start + timedelta(seconds=round(offset * scale))).strftime(TIMESTAMP_FORMAT)}
+            for message, offset in zip(template['mesajlar'], offsets)
+        ]
+        yield {
+            **template,
+            'sohbet_id': FIRST_ID + i,
+            'tarih_saat': start.strftime(TIMESTAMP_FORMAT),
+            'mesajlar': messages
+        }
+
+
+def write_dataset(path, count, source=None, seed=42):
+    """Sentetik veri setini diske yazar; .json dizi, diğer uzantılar satır başına bir sohbet"""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    chats = generate_chats(count, load_templates(source), seed)
+    with open(path, 'w', encoding='utf-8') as f:
+        if path.endswith('.json'):
+            f.write('[\n')
+            for i, chat in enumerate(chats):
+                f.write((',\n' if i else '') + json.dumps(chat, ensure_ascii=False))
+            f.write('\n]\n')
+        else:
+            for chat in chats:
+                f.write(json.dumps(chat, ensure_ascii=False) + '\n')
+    return path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Sentetik sohbet verisi üretici")
+    parser.add_argument("--chats", type=int, default=10_000, help="Üretilecek sohbet sayısı (ör. 10000, 100000, 1000000)")
+    parser.add_argument("--output", help="Çıktı dosyası (varsayılan: benchmarks/data/sohbet_<N>.jsonl)")
+    parser.add_argument("--source", default=settings.DATA_FILE, help="Şablon sohbetlerin okunacağı dosya")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args(argv)
+
+    output = args.output or os.path.join("benchmarks", "data", f"sohbet_{args.chats}.jsonl")
+    write_dataset(output, args.chats, args.source, args.seed)
+    print(f"✅ {args.chats} sentetik sohbet yazıldı: {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,4 @@
+import json
 import os
 from dotenv import load_dotenv
 
@@ -6,11 +7,115 @@ load_dotenv()
 
 class Settings:
     OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+    OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL")  # Yerel test sunucusu için
     MODEL_NAME = os.getenv("MODEL_NAME", "gpt-5-nano")
+    REASONING_EFFORT = os.getenv("REASONING_EFFORT", "minimal")  # Token tasarrufu için
+    MAX_COMPLETION_TOKENS = int(os.getenv("MAX_COMPLETION_TOKENS", "200"))
+    # Model yönlendirme (--routing): ucuzdan pahalıya kademe. Fiyatlar 1M token başına $;
+    # MODEL_CASCADE ortam değişkeniyle aynı biçimde JSON liste olarak değiştirilebilir
+    MODEL_CASCADE = json.loads(os.getenv("MODEL_CASCADE", "null")) or [
+        {"name": MODEL_NAME, "reasoning_effort": REASONING_EFFORT, "max_completion_tokens": MAX_COMPLETION_TOKENS,
+         "input_cost": 0.05, "cached_input_cost": 0.005, "output_cost": 0.40},
+        {"name": "gpt-5-mini", "reasoning_effort": "low", "max_completion_tokens": 2000,
+         "input_cost": 0.25, "cached_input_cost": 0.025, "output_cost": 2.00},
+    ]
+    # Bu güvenin altındaki sonuçlar ve (ilk kademede) negatif sohbetler üst modele çıkar;
+    # sıkıştırma öncesi bu token sayısını aşan sohbetler doğrudan ikinci kademeden başlar
+    ROUTING_CONFIDENCE_THRESHOLD = float(os.getenv("ROUTING_CONFIDENCE_THRESHOLD", "0.7"))
+    ROUTING_LONG_CHAT_TOKENS = int(os.getenv("ROUTING_LONG_CHAT_TOKENS", "1500"))
+    ROUTING_ESCALATE_NEGATIVE = os.getenv("ROUTING_ESCALATE_NEGATIVE", "true").lower() == "true"
+    OUTPUT_ROUTING_REPORT = os.getenv("OUTPUT_ROUTING_REPORT", "outputs/model_yonlendirme.txt")
+    # Aynı önekli isteklerin sağlayıcı tarafında aynı prompt önbelleğine yönlenmesi için
+    PROMPT_CACHE_KEY = os.getenv("PROMPT_CACHE_KEY", "mila-sohbet-analizi")
     DATA_FILE = "data/40-sohbet-trendyol-mila.json"
     OUTPUT_EXCEL = "outputs/excel_raporlar/sohbet_analiz.xlsx"
+    # Ana çıktı: tarih bölümlü Parquet veri kümesi; Excel isteğe bağlı dışa aktarımdır
+    OUTPUT_PARQUET_DIR = "outputs/sonuclar_parquet"
+    EXCEL_EXPORT = os.getenv("EXCEL_EXPORT", "true").lower() == "true"
+    # --incremental: rapor sayaçlarının çalıştırmalar arasında biriktirildiği durum dosyası
+    REPORT_STATE_FILE = os.getenv("REPORT_STATE_FILE", "outputs/rapor_durumu.json")
+    # Metin raporlarını paralel üreten/yazan iş parçacığı sayısı
+    REPORT_WORKERS = int(os.getenv("REPORT_WORKERS", "4"))
     OUTPUT_SWOT = "outputs/swot_analizi.txt"
     OUTPUT_RECOMMENDATIONS = "outputs/bot_önerileri.txt"
     OUTPUT_DEMAND_SUMMARY = "outputs/talep_özeti.txt"
+    # Sayısal süre metriklerinin (toplam süre, ilk yanıt, bot yanıt süresi) yüzdelik özeti
+    OUTPUT_TIMING_REPORT = "outputs/zamanlama_özeti.txt"
+
+    # Sohbet başına çıktılar: INFO (varsayılan, hepsi), WARNING (yalnızca uyarı/hata), ERROR
+    LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+    # Aşama süreleri ve API histogramlarının yazılacağı dosya (.prom: Prometheus metni, diğer: JSON)
+    METRICS_FILE = os.getenv("METRICS_FILE")
+
+    # Veri dosyasını akış halinde oku (JSON dizisi veya NDJSON/JSONL)
+    STREAMING = os.getenv("STREAMING", "false").lower() == "true"
+
+    # Akışlı hat: aşamalar arası kuyruk boyutu, sonuç dosyasına yazma sıklığı (satır / saniye)
+    PIPELINE_QUEUE_SIZE = int(os.getenv("PIPELINE_QUEUE_SIZE", "1000"))
+    PIPELINE_FLUSH_ROWS = int(os.getenv("PIPELINE_FLUSH_ROWS", "10000"))
+    PIPELINE_FLUSH_SECONDS = float(os.getenv("PIPELINE_FLUSH_SECONDS", "5"))
+
+    # Çok süreçli ön işleme: süreç sayısı (0 = kapalı) ve süreçlere gönderilen parça boyutu
+    PREPROCESS_WORKERS = int(os.getenv("PREPROCESS_WORKERS", "0"))
+    PREPROCESS_CHUNK_SIZE = int(os.getenv("PREPROCESS_CHUNK_SIZE", "500"))
+
+    # Analiz modu: "sync" (sıralı, varsayılan), "async" (eşzamanlı), "batch" (Batch API)
+    # veya "packed" (istek başına birden fazla sohbet)
+    ANALYSIS_MODE = os.getenv("ANALYSIS_MODE", "sync")
+    MAX_CONCURRENCY = int(os.getenv("MAX_CONCURRENCY", "16"))
+    RATE_LIMIT_RPM = int(os.getenv("RATE_LIMIT_RPM", "500"))
+    RATE_LIMIT_TPM = int(os.getenv("RATE_LIMIT_TPM", "200000"))
+
+    # 429 / 5xx / zaman aşımı hatalarında jitter'lı üstel geri çekilme ile yeniden deneme
+    MAX_RETRIES = int(os.getenv("MAX_RETRIES", "5"))
+    RETRY_BASE_DELAY = float(os.getenv("RETRY_BASE_DELAY", "1.0"))
+    RETRY_MAX_DELAY = float(os.getenv("RETRY_MAX_DELAY", "60.0"))
+
+    # Paketli mod: tek istekte analiz edilecek sohbetlerin token bütçesi ve üst sınırı
+    PACK_TOKEN_BUDGET = int(os.getenv("PACK_TOKEN_BUDGET", "4000"))
+    PACK_MAX_CHATS = int(os.getenv("PACK_MAX_CHATS", "10"))
+
+    # Prompt sıkıştırma: sohbet metni için token bütçesi
+    PROMPT_TOKEN_BUDGET = int(os.getenv("PROMPT_TOKEN_BUDGET", "700"))
+    TOKENIZER_ENCODING = os.getenv("TOKENIZER_ENCODING", "o200k_base")
+
+    # Yerel hızlı sınıflandırıcı (--fast-path): analiz edilen veriden ayrı etiketli eğitim dosyası
+    # (zorunlu), model dosyası, kalibrasyona ayrılan oran, ayrılan kısımda tutturulacak kesinlik
+    # (tüm alanlar doğru) ve eşik seçimi için gereken en az sohbet sayısı
+    FAST_PATH_TRAIN_FILE = os.getenv("FAST_PATH_TRAIN_FILE")
+    FAST_PATH_MODEL = os.getenv("FAST_PATH_MODEL", "outputs/models/fast_path.npz")
+    FAST_PATH_HOLDOUT_RATE = float(os.getenv("FAST_PATH_HOLDOUT_RATE", "0.2"))
+    FAST_PATH_PRECISION = float(os.getenv("FAST_PATH_PRECISION", "0.95"))
+    FAST_PATH_MIN_SUPPORT = int(os.getenv("FAST_PATH_MIN_SUPPORT", "50"))
+    FAST_PATH_FEATURES = int(os.getenv("FAST_PATH_FEATURES", str(2 ** 16)))
+
+    # Neredeyse aynı sohbetlerin tekrar elenmesi (--dedup): MinHash/LSH benzerlik eşiği,
+    # imza boyutu / bant sayısı, etiketleri yine de kontrol edilen üye oranı ve küme sınırı
+    DEDUP_THRESHOLD = float(os.getenv("DEDUP_THRESHOLD", "0.9"))
+    DEDUP_NUM_PERM = int(os.getenv("DEDUP_NUM_PERM", "128"))
+    DEDUP_BANDS = int(os.getenv("DEDUP_BANDS", "16"))
+    DEDUP_AUDIT_RATE = float(os.getenv("DEDUP_AUDIT_RATE", "0.02"))
+    DEDUP_MAX_CLUSTERS = int(os.getenv("DEDUP_MAX_CLUSTERS", "500000"))
+    OUTPUT_DEDUP_AUDIT = os.getenv("OUTPUT_DEDUP_AUDIT", "outputs/kume_denetimi.csv")
+
+    # Shard'lı çalıştırma (--shards): shard dizinleri ve sahiplik dosyaları için paylaşılan dizin,
+    # süreci ölen shard'ın devredilmesi için sahiplik zaman aşımı (sn) ve RPM/TPM bütçesinin
+    # bölüneceği, aynı anda çalışan shard sayısı (0 = shard sayısı)
+    SHARD_DIR = os.getenv("SHARD_DIR", "outputs/shards")
+    SHARD_CLAIM_TIMEOUT = float(os.getenv("SHARD_CLAIM_TIMEOUT", "900"))
+    SHARD_PARALLELISM = int(os.getenv("SHARD_PARALLELISM", "0"))
+
+    # Kalıcı sonuç önbelleği
+    CACHE_ENABLED = os.getenv("CACHE_ENABLED", "true").lower() == "true"
+    CACHE_FILE = os.getenv("CACHE_FILE", "outputs/cache/analiz_cache.sqlite")
+    CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "500000"))
+
+    # Tamamlanan sohbetlerin kaydedildiği çalıştırma günlüğü (--resume)
+    RUN_JOURNAL = os.getenv("RUN_JOURNAL", "outputs/run_journal.jsonl")
+
+    # Batch API
+    BATCH_WORK_DIR = os.getenv("BATCH_WORK_DIR", "outputs/batch")
+    BATCH_POLL_INTERVAL = float(os.getenv("BATCH_POLL_INTERVAL", "30"))
+    BATCH_MAX_REQUESTS = int(os.getenv("BATCH_MAX_REQUESTS", "50000"))
 
 settings = Settings()
@@ -0,0 +1,261 @@
+import hashlib
+import io
+import json
+import os
+import time
+import openai
+from pydantic import ValidationError
+from config.settings import settings
+from src.chat_analyzer import ChatAnalysis, FALLBACK_RESULT
+from src.preprocessing import PREPARED_KEY
+from src.metrics import metrics
+from utils.helpers import write_text_atomic
+
+# Batch işinin bittiğini gösteren durumlar
+TERMINAL_STATUSES = {"completed", "failed", "expired", "cancelled"}
+# Bu durumlardaki işlere yeniden bağlanılmaz, istekler yeniden gönderilir
+FAILED_STATUSES = {"failed", "expired", "cancelled"}
+# Gönderilen işlerin kimlikleri: yarıda kalan çalıştırma aynı istekleri yeniden göndermez
+BATCH_STATE_FILE = "batch_state.json"
+
+
+def response_format_param(model):
+    """Pydantic modelinden katı (strict) json_schema response_format parametresi"""
+    function = openai.pydantic_function_tool(model)["function"]
+    return {
+        "type": "json_schema",
+        "json_schema": {"schema": function["parameters"], "name": function["name"], "strict": True}
+    }
+
+
+def _file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class BatchAnalyzer:
+    """
+    OpenAI Batch API ile toplu (çevrimdışı) sohbet analizi.
+    Promptlar JSONL olarak yüklenir, iş tamamlanana kadar beklenir ve
+    sonuçlar sohbet_id üzerinden ChatAnalysis sonuçlarına eşlenir.
+    """
+
+    def __init__(self, analyzer, poll_interval=None, max_requests_per_batch=None, work_dir=None):
+        self.analyzer = analyzer
+        self.client = analyzer.client
+        self.poll_interval = poll_interval or settings.BATCH_POLL_INTERVAL
+        self.max_requests_per_batch = max_requests_per_batch or settings.BATCH_MAX_REQUESTS
+        self.work_dir = work_dir or settings.BATCH_WORK_DIR
+        self._response_format = response_format_param(ChatAnalysis)
+
+    def build_request(self, chat_info, prompt):
+        """Tek bir sohbet için Batch API JSONL satırını oluşturur"""
+        body = self.analyzer._request_params(prompt)
+        body["response_format"] = self._response_format
+        return {
+            "custom_id": str(chat_info["sohbet_id"]),
+            "method": "POST",
+            "url": "/v1/chat/completions",
+            "body": body
+        }
+
+    def _input_path(self, index):
+        return os.path.join(self.work_dir, f"batch_input_{index:04d}.jsonl")
+
+    def write_jsonl(self, chats, journal=None):
+        """
+        Önbellekte ya da günlükte olmayan sohbetlerin isteklerini JSONL dosyalarına
+        akış halinde yazar.
+        (dosya yolları, [(cache_key, custom_id, küme, benzerlik)], sıra listesi, hazır sonuçlar,
+        günlükteki sonuçlar, temsilcisi aynı batch'te olan küme üyeleri) döner.
+        Yerel hızlı sınıflandırıcının emin olduğu sohbetler de batch'e eklenmez.
+        """
+        os.makedirs(self.work_dir, exist_ok=True)
+        paths = []
+        pending = []
+        order = []  # (sohbet_id, ham sohbet içermeyen temel bilgiler)
+        cached_results = {}
+        completed_results = {}
+        deferred = {}  # sohbet_id -> (küme, benzerlik)
+        f = None
+
+        try:
+            for chat_info in chats:
+                custom_id = str(chat_info["sohbet_id"])
+                completed = journal.get(custom_id) if journal is not None else None
+                if completed is not None:
+                    order.append((custom_id, None))
+                    completed_results[custom_id] = completed
+                    continue
+
+                order.append((custom_id, self.analyzer._combine_result(chat_info, {})))
+                local = self.analyzer._fast_path_result(chat_info["raw_chat"])
+                if local is not None:
+                    cached_results[custom_id] = local
+                    continue
+
+                prepared = chat_info.get(PREPARED_KEY)
+                cluster, similarity = self.analyzer._dedup_match(chat_info["raw_chat"], prepared)
+                shared = self.analyzer._dedup_shared(chat_info["raw_chat"], cluster, similarity)
+                if shared is not None:
+                    cached_results[custom_id] = shared
+                    continue
+                if (similarity is not None and cluster.labels is None
+                        and not self.analyzer.dedup.should_audit(custom_id)):
+                    # Temsilci bu çalıştırmanın batch'inde; etiketleri sonuçlar gelince dağıtılır
+                    deferred[custom_id] = (cluster, similarity)
+                    continue
+
+                prompt, _ = self.analyzer._build_prompt(chat_info["raw_chat"], prepared)
+                cache_key, cached = self.analyzer._cache_lookup(prompt, prepared and prepared["cache_key"])
+                if cached is not None:
+                    cached_results[custom_id] = self.analyzer._dedup_record(cluster, similarity, cached)
+                    continue
+
+                if len(pending) % self.max_requests_per_batch == 0:
+                    if f is not None:
+                        f.close()
+                    paths.append(self._input_path(len(paths)))
+                    f = open(paths[-1], "w", encoding="utf-8")
+                f.write(json.dumps(self.build_request(chat_info, prompt), ensure_ascii=False) + "\n")
+                pending.append((cache_key, custom_id, cluster, similarity))
+        finally:
+            if f is not None:
+                f.close()
+
+        return paths, pending, order, cached_results, completed_results, deferred
+
+    def submit(self, path):
+        """JSONL dosyasını yükler ve batch işini başlatır"""
+        with open(path, "rb") as f:
+            input_file = self.client.files.create(file=f, purpose="batch")
+        batch = self.client.batches.create(
+            input_file_id=input_file.id,
+            endpoint="/v1/chat/completions",
+            completion_window="24h"
+        )
+        print(f"📤 Batch gönderildi: {batch.id} ({path})")
+        return batch.id
+
+    @property
+    def _state_path(self):
+        return os.path.join(self.work_dir, BATCH_STATE_FILE)
+
+    def _load_state(self):
+        """{girdi dosyası: {batch_id, digest}} - önceki çalıştırmada gönderilen işler"""
+        if not os.path.exists(self._state_path):
+            return {}
+        with open(self._state_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def submit_once(self, path, state):
+        """
+        Aynı içerikli girdi dosyası daha önce gönderildiyse (ör. bekleme sırasında
+        çöken çalıştırma) o işe yeniden bağlanır, aksi halde gönderip kimliğini kaydeder
+        """
+        name = os.path.basename(path)
+        digest = _file_digest(path)
+        entry = state.get(name)
+        if entry is not None and entry["digest"] == digest:
+            try:
+                batch = self.client.batches.retrieve(entry["batch_id"])
+            except openai.NotFoundError:
+                batch = None
+            if batch is not None and batch.status not in FAILED_STATUSES:
+                print(f"♻️ Önceki batch işine bağlanıldı: {batch.id} ({path})")
+                return batch.id
+
+        batch_id = self.submit(path)
+        state[name] = {"batch_id": batch_id, "digest": digest}
+        write_text_atomic(self._state_path, json.dumps(state, ensure_ascii=False))
+        return batch_id
+
+    def wait(self, batch_id):
+        """Batch işi bitene kadar durumunu sorgular"""
+        while True:
+            batch = self.client.batches.retrieve(batch_id)
+            if batch.status in TERMINAL_STATUSES:
+                print(f"📥 Batch {batch_id}: {batch.status}")
+                return batch
+            counts = batch.request_counts
+            if counts is not None:
+                print(f"⏳ Batch {batch_id}: {batch.status} ({counts.completed}/{counts.total})")
+            time.sleep(self.poll_interval)
+
+    def fetch_results(self, batch):
+        """Tamamlanan batch çıktısını {custom_id: sonuç} sözlüğüne çevirir"""
+        results = {}
+        if not batch.output_file_id:
+            return results
+
+        content = self.client.files.content(batch.output_file_id)
+        for line in io.StringIO(content.text):
+            if not line.strip():
+                continue
+            item = json.loads(line)
+            custom_id = item.get("custom_id")
+            try:
+                response = item.get("response") or {}
+                if response.get("status_code") != 200:
+                    raise ValueError(f"HTTP {response.get('status_code')}")
+                self.analyzer.usage.record(response["body"].get("usage"))
+                message = response["body"]["choices"][0]["message"]
+                results[custom_id] = ChatAnalysis.model_validate_json(message["content"]).model_dump()
+            except (KeyError, IndexError, TypeError, ValueError, ValidationError) as e:
+                print(f"❌ Batch sonucu ayrıştırılamadı ({custom_id}): {str(e)[:200]}")
+        return results
+
+    def analyze_all_chats(self, chats, journal=None):
+        """
+        Tüm sohbetleri Batch API ile analiz eder - sonuçlar giriş sırasıyla döner
+        """
+        return list(self.iter_analyze_chats(chats, journal))
+
+    def iter_analyze_chats(self, chats, journal=None):
+        """
+        Batch işleri tamamlandıktan sonra sonuçları giriş sırasıyla tek tek döner (generator)
+        """
+        paths, pending, order, analyses, completed_results, deferred = self.write_jsonl(chats, journal)
+
+        state = self._load_state()
+        batch_ids = [self.submit_once(path, state) for path in paths]
+        for batch_id in batch_ids:
+            analyses.update(self.fetch_results(self.wait(batch_id)))
+
+        for cache_key, custom_id, cluster, similarity in pending:
+            response = analyses.get(custom_id)
+            if response is not None:
+                self.analyzer._cache_store(cache_key, response)
+                analyses[custom_id] = self.analyzer._dedup_record(cluster, similarity, response)
+
+        # Aynı batch'teki denetimler bu üyeleri geri almaz; güven düşüşü küme denetiminde görünür
+        for custom_id, (cluster, similarity) in deferred.items():
+            if cluster.labels is not None:
+                analyses[custom_id] = self.analyzer.dedup.shared_result(cluster, similarity)
+
+        success_count = 0
+        for sohbet_id, base_info in order:
+            if base_info is None:
+                success_count += 1
+                yield completed_results[sohbet_id]
+                continue
+
+            analysis_result = analyses.get(sohbet_id)
+            if analysis_result is None:
+                self.analyzer.fallback_reasons["batch_hatasi"] += 1
+                metrics.increment('fallbacks', reason="batch_hatasi")
+                yield {**base_info, **FALLBACK_RESULT, "hata_nedeni": "batch_hatasi"}
+            else:
+                result = {**base_info, **analysis_result}
+                if journal is not None:
+                    journal.record(result)
+                success_count += 1
+                yield result
+
+        # Tüm sonuçlar günlüğe işlendi, işlere yeniden bağlanmaya gerek kalmadı
+        if os.path.exists(self._state_path):
+            os.remove(self._state_path)
+        print(f"📊 Batch analiz tamamlandı: {success_count}/{len(order)} başarılı")
@@ -1,11 +1,20 @@
 import openai
+import asyncio
+import time
+from collections import Counter, deque
 import os
 import json
 import re
-import time
 from typing import Literal
 from pydantic import BaseModel, Field
 from config.settings import settings
+from src.rate_limiter import RateLimiter
+from src.prompt_compactor import PromptCompactor, TokenCounter
+from src.usage_tracker import UsageTracker
+from src.preprocessing import PREPARED_KEY
+from src.retry_policy import RetryPolicy, AdaptiveConcurrencyLimiter, error_reason, is_rate_limit, is_invalid_output
+from src.metrics import metrics
+from utils.helpers import aiter_items, log
 
 # Structured output model for our analysis
 class ChatAnalysis(BaseModel):
@@ -32,12 +41,60 @@ class ChatAnalysis(BaseModel):
         max_length=100
     )
 
+# Hata durumunda kullanılan varsayılan etiketler
+FALLBACK_RESULT = {
+    "yanıt_durumu": "Çözülemedi",
+    "sentiment": "Nötr",
+    "tür": "Sorun",
+    "intent": "Diğer",
+    "intent_detay": "Analiz hatası"
+}
+
+MAX_COMPLETION_TOKENS = settings.MAX_COMPLETION_TOKENS
+
+def is_fallback(analysis_result):
+    """Sonucun hata durumundaki varsayılan etiketler olup olmadığını kontrol eder"""
+    return all(analysis_result.get(key) == value for key, value in FALLBACK_RESULT.items())
+
 class ChatAnalyzer:
-    def __init__(self):
-        self.client = openai.OpenAI(api_key=settings.OPENAI_API_KEY)
+    def __init__(self, max_concurrency=None, requests_per_minute=None, tokens_per_minute=None, cache=None,
+                 fast_path=None, dedup=None, router=None):
+        # Yeniden denemeler RetryPolicy ile yönetilir, istemcinin kendi denemeleri kapalı
+        self.client = openai.OpenAI(
+            api_key=settings.OPENAI_API_KEY, base_url=settings.OPENAI_BASE_URL, max_retries=0
+        )
+        self._async_client = None
         self.model = settings.MODEL_NAME
-        self.api_delay = 0.5  # API çağrıları arası bekleme süresi
+        self.max_concurrency = max_concurrency or settings.MAX_CONCURRENCY
+        self.requests_per_minute = requests_per_minute or settings.RATE_LIMIT_RPM
+        self.tokens_per_minute = tokens_per_minute or settings.RATE_LIMIT_TPM
         self.system_prompt = self._load_system_prompt()
+        self.cache = cache  # Opsiyonel ResultCache
+        self.fast_path = fast_path  # Opsiyonel FastPathClassifier
+        self.dedup = dedup  # Opsiyonel ChatDeduplicator
+        self.router = router  # Opsiyonel ModelRouter
+        if router is not None:
+            # Sonuç kademedeki modellerden gelir; önbellek anahtarı kademeye bağlanır
+            self.model = router.key
+        self._schema = ChatAnalysis.model_json_schema()
+        self.token_counter = TokenCounter(settings.TOKENIZER_ENCODING)
+        self.compactor = PromptCompactor(settings.PROMPT_TOKEN_BUDGET, self.token_counter)
+        self._system_prompt_tokens = self.token_counter.count(self.system_prompt)
+        # Sağlayıcı tarafı prompt önbelleği için her istekte bayt bayt aynı kalan önek
+        self._system_message = {"role": "system", "content": self.system_prompt}
+        self.usage = UsageTracker()
+        self.retry_policy = RetryPolicy(settings.MAX_RETRIES, settings.RETRY_BASE_DELAY, settings.RETRY_MAX_DELAY)
+        self.retry_count = 0
+        self.fallback_reasons = Counter()
+    
+    @property
+    def async_client(self):
+        """Asenkron istemciyi ilk kullanımda oluşturur"""
+        if self._async_client is None:
+            self._async_client = openai.AsyncOpenAI(
+                api_key=settings.OPENAI_API_KEY, base_url=settings.OPENAI_BASE_URL, max_retries=0
+            )
+        return self._async_client
         
     def _load_system_prompt(self):
         """Sistem promptunu dosyadan yükler"""
@@ -52,47 +109,149 @@ class ChatAnalyzer:
             print(f"❌ Prompt yükleme hatası: {e}")
             return "Müşteri sohbetlerini analiz et: yanıt durumu, sentiment, tür, intent ve intent detayı."
     
-    def analyze_chat(self, chat_data):
+    def analyze_chat(self, chat_data, prepared=None):
         """
-        Tek bir sohbeti analiz eder
+        Tek bir sohbeti analiz eder (prepared: ChatPreprocessor'ın hazırladığı alanlar)
         """
-        prompt = self._create_analysis_prompt(chat_data)
-        response = self._get_api_response(prompt)
-        return self._parse_response(response)
+        local = self._fast_path_result(chat_data)
+        if local is not None:
+            return local
+        
+        cluster, similarity = self._dedup_match(chat_data, prepared)
+        return self._analyze_matched(chat_data, prepared, cluster, similarity)
     
-    def _create_analysis_prompt(self, chat_data):
+    def _analyze_matched(self, chat_data, prepared, cluster, similarity):
+        """Kümesi belirlenmiş sohbeti analiz eder; üyeye küme etiketleri yetiyorsa API'ye gitmez"""
+        shared = self._dedup_shared(chat_data, cluster, similarity)
+        if shared is not None:
+            return shared
+        
+        prompt, compaction = self._build_prompt(chat_data, prepared)
+        cache_key, cached = self._cache_lookup(prompt, prepared and prepared['cache_key'])
+        if cached is not None:
+            return self._dedup_record(cluster, similarity, {**cached, **compaction})
+        
+        response = self._get_api_response(prompt, chat_data, compaction)
+        self._cache_store(cache_key, response)
+        return self._dedup_record(cluster, similarity, {**self._parse_response(response), **compaction})
+    
+    def _fast_path_result(self, chat_data):
+        """Yerel sınıflandırıcı yeterince eminse API'ye gitmeden sonucu döner"""
+        if self.fast_path is None:
+            return None
+        return self.fast_path.try_predict(chat_data)
+    
+    def _dedup_match(self, chat_data, prepared=None):
+        """Sohbetin neredeyse aynı kümesini bulur: (küme, benzerlik) - temsilcide benzerlik None"""
+        if self.dedup is None:
+            return None, None
+        with metrics.timer('dedup'):
+            return self.dedup.match(chat_data, prepared and prepared.get('minhash'))
+    
+    def _dedup_shared(self, chat_data, cluster, similarity):
         """
-        API için analiz promptu oluşturur - SADELEŞTİRİLMİŞ
+        Üye sohbete kümenin etiketlerini döner; temsilcide, etiketsiz ya da güvenilmez
+        kümede ve denetim örneğine düşen üyede None (sohbet ayrıca analiz edilir)
         """
-        # Sohbet metnini formatla
-        chat_text = ""
-        for message in chat_data.get('mesajlar', []):
-            sender = "Müşteri" if message.get('sender') == 'Müşteri' else "Bot"
-            chat_text += f"{sender}: {message.get('text', '')}\n"
+        if similarity is None or cluster.labels is None or not cluster.trusted:
+            return None
+        if self.dedup.should_audit(chat_data.get('sohbet_id')):
+            return None
+        return self.dedup.shared_result(cluster, similarity)
+    
+    def _dedup_record(self, cluster, similarity, analysis_result):
+        """Analiz sonucunu kümeye işler (yedek sonuçlar paylaşılmaz), sonuca küme kolonlarını ekler"""
+        if cluster is None:
+            return analysis_result
+        if not is_fallback(analysis_result):
+            labels = {field: analysis_result[field] for field in ChatAnalysis.model_fields if field in analysis_result}
+            self.dedup.record(cluster, similarity, labels)
+        return {**analysis_result, **self.dedup.cluster_fields(cluster, similarity)}
+    
+    def _dedup_begin_async(self, cluster, similarity):
+        """Temsilcinin analizi sürerken üyelerin bekleyeceği noktayı kurar"""
+        if cluster is not None and similarity is None:
+            cluster.pending = asyncio.get_running_loop().create_future()
+    
+    def _dedup_release(self, cluster, similarity):
+        """Temsilcinin analizi bitince bekleyen üyeleri serbest bırakır"""
+        if cluster is not None and similarity is None and cluster.pending is not None:
+            if not cluster.pending.done():
+                cluster.pending.set_result(None)
+            cluster.pending = None
+    
+    def _cache_lookup(self, prompt, cache_key=None):
+        """Önbellekte sonuç varsa (anahtar, sonuç), yoksa (anahtar, None) döner"""
+        if self.cache is None:
+            return None, None
+        if cache_key is None:
+            cache_key = self.cache.make_key(prompt, self.system_prompt, self.model, self._schema)
+        return cache_key, self.cache.get(cache_key)
+    
+    def _cache_store(self, cache_key, response):
+        """Başarılı API sonucunu önbelleğe yazar (fallback sonuçlar saklanmaz)"""
+        if cache_key is not None and not is_fallback(response):
+            self.cache.put(cache_key, response)
+    
+    async def _cache_lookup_async(self, prompt, cache_key=None):
+        """_cache_lookup'un SQLite erişimini olay döngüsü dışında yapan karşılığı"""
+        if self.cache is None:
+            return None, None
+        return await asyncio.to_thread(self._cache_lookup, prompt, cache_key)
     
+    async def _cache_store_async(self, cache_key, response):
+        if cache_key is not None and not is_fallback(response):
+            await asyncio.to_thread(self.cache.put, cache_key, response)
+    
+    def _build_prompt(self, chat_data, prepared=None):
+        """
+        Token bütçesine sığdırılmış analiz promptunu ve sıkıştırma istatistiğini döner
+        """
+        if prepared is not None:
+            # Ön işleme sürecinde hazırlanmış prompt
+            self.compactor.record(prepared['compaction'])
+            return prepared['prompt'], prepared['compaction']
         # Sadece sohbet metni - kurallar system prompt'ta zaten var
-        return f"Aşağıdaki sohbeti analiz edin:\n\n{chat_text}"
+        with metrics.timer('prompt_build'):
+            return self.compactor.compact(chat_data)
     
-    def _get_api_response(self, prompt):
+    def _create_analysis_prompt(self, chat_data):
         """
-        API'den yanıt alır
+        API için analiz promptu oluşturur - SADELEŞTİRİLMİŞ
         """
-        try:
-            # Konuşma metnini kısalt (token tasarrufu)
-            if len(prompt) > 1000:
-                prompt = prompt[:1000] + "..."
-            
-            completion = self.client.chat.completions.parse(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": self.system_prompt},
-                    {"role": "user", "content": prompt}
-                ],
-                response_format=ChatAnalysis,
-                max_completion_tokens=200,
-                reasoning_effort="minimal",  # Token tasarrufu için
-            )
-            
+        return self._build_prompt(chat_data)[0]
+    
+    def _request_params(self, prompt, tier=None):
+        """
+        Senkron ve asenkron çağrıların ortak istek parametreleri.
+        Statik system prompt ve şema önde, değişen sohbet metni en sonda yer alır;
+        böylece istekler prompt önbelleğinden yararlanabilecek ortak bir önek paylaşır.
+        tier verilirse model ve çıktı parametreleri kademedeki modelden alınır.
+        """
+        params = {
+            "model": self.model,
+            "messages": [
+                self._system_message,
+                {"role": "user", "content": prompt}
+            ],
+            "response_format": ChatAnalysis,
+            "max_completion_tokens": MAX_COMPLETION_TOKENS,
+            "reasoning_effort": settings.REASONING_EFFORT,
+            "prompt_cache_key": settings.PROMPT_CACHE_KEY,
+        }
+        if tier is not None:
+            del params["reasoning_effort"]
+            params.update(tier.request_params(), response_format=self.router.response_format)
+        return params
+    
+    def _estimate_tokens(self, prompt, max_completion_tokens=MAX_COMPLETION_TOKENS):
+        """TPM bütçesi için istek başına token tahmini"""
+        return self._system_prompt_tokens + self.token_counter.count(prompt) + max_completion_tokens
+    
+    def _handle_completion(self, completion):
+        """Tamamlanmış API yanıtını dict'e çevirir"""
+        with metrics.timer('parse'):
+            self.usage.record(completion.usage)
             parsed = completion.choices[0].message.parsed
             
             if parsed is None:
@@ -100,19 +259,178 @@ class ChatAnalyzer:
             
             # Pydantic modelini dict'e çevir
             result = parsed.model_dump()
-            print(f"✅ API başarılı: {result}")
-            return result
+        log(f"✅ API başarılı: {result}")
+        return result
+    
+    def _fallback(self, error):
+        """Hata nedeniyle etiketlenmiş yedek sonuç döner"""
+        reason = error_reason(error)
+        self.fallback_reasons[reason] += 1
+        metrics.increment('fallbacks', reason=reason)
+        log(f"❌ API hatası ({reason}): {str(error)[:200]}", 'ERROR')
+        return {**FALLBACK_RESULT, "hata_nedeni": reason}
+    
+    def _log_retry(self, error, attempt, delay):
+        self.retry_count += 1
+        metrics.increment('retries', reason=error_reason(error))
+        log(f"🔁 Yeniden deneme {attempt + 1}/{self.retry_policy.max_retries} "
+            f"({error_reason(error)}) - {delay:.1f} sn bekleniyor", 'WARNING')
+
+    
+    def _call_with_retry(self, request, attempt_times=None):
+        """
+        İsteği retry politikasına göre tekrar dener. attempt_times listesi verilirse
+        her denemenin yalnızca istek süresi (yeniden deneme beklemesi hariç) eklenir.
+        """
+        attempt = 0
+        while True:
+            start = time.perf_counter()
+            try:
+                with metrics.timer('api_call', 'api_latency_seconds'):
+                    return request()
+            except Exception as e:
+                error = e
+            finally:
+                if attempt_times is not None:
+                    attempt_times.append(time.perf_counter() - start)
+            if not self.retry_policy.should_retry(error, attempt):
+                raise error
+            delay = self.retry_policy.delay(error, attempt)
+            self._log_retry(error, attempt, delay)
+            time.sleep(delay)
+            attempt += 1
+    
+    async def _call_with_retry_async(self, request, token_estimate, attempt_times=None):
+        """
+        İsteği RPM/TPM bütçesi ve uyarlanabilir eşzamanlılık limiti altında çalıştırır;
+        429'da limit düşer, başarıda yeniden yükselir. attempt_times listesi verilirse
+        her denemenin yalnızca istek süresi (limit ve yeniden deneme beklemeleri hariç) eklenir.
+        """
+        attempt = 0
+        while True:
+            async with self._concurrency:
+                try:
+                    await self._rate_limiter.acquire(token_estimate)
+                    # Gecikme yalnızca isteğin kendisini kapsar (limit beklemeleri hariç)
+                    start = time.perf_counter()
+                    try:
+                        with metrics.timer('api_call', 'api_latency_seconds'):
+                            completion = await request()
+                    finally:
+                        if attempt_times is not None:
+                            attempt_times.append(time.perf_counter() - start)
+                    self._concurrency.on_success()
+                    return completion
+                except Exception as e:
+                    if is_rate_limit(e):
+                        self._concurrency.on_throttle()
+                    if not self.retry_policy.should_retry(e, attempt):
+                        raise
+                    error = e
+            # Bekleme sırasında eşzamanlılık slotu serbest kalır
+            delay = self.retry_policy.delay(error, attempt)
+            self._log_retry(error, attempt, delay)
+            await asyncio.sleep(delay)
+            attempt += 1
+    
+    def _start_async_run(self):
+        """Her asenkron çalıştırma için hız ve eşzamanlılık sınırlayıcılarını kurar"""
+        self._rate_limiter = RateLimiter(self.requests_per_minute, self.tokens_per_minute)
+        self._concurrency = AdaptiveConcurrencyLimiter(self.max_concurrency)
+    
+    def _get_api_response(self, prompt, chat_data=None, compaction=None):
+        """
+        API'den yanıt alır
+        """
+        if self.router is not None:
+            return self._get_routed_response(prompt, chat_data, compaction)
+        try:
+            completion = self._call_with_retry(
+                lambda: self.client.chat.completions.parse(**self._request_params(prompt))
+            )
+            return self._handle_completion(completion)
             
         except Exception as e:
-            print(f"❌ API hatası: {str(e)[:200]}")
             # Hata durumunda fallback değerler
-            return {
-                "yanıt_durumu": "Çözülemedi",
-                "sentiment": "Nötr", 
-                "tür": "Sorun",
-                "intent": "Diğer",
-                "intent_detay": "Analiz hatası"
-            }
+            return self._fallback(e)
+    
+    async def _get_api_response_async(self, prompt, chat_data=None, compaction=None):
+        """
+        API'den asenkron yanıt alır - RPM/TPM bütçesine uyarak
+        """
+        if self.router is not None:
+            return await self._get_routed_response_async(prompt, chat_data, compaction)
+        try:
+            completion = await self._call_with_retry_async(
+                lambda: self.async_client.chat.completions.parse(**self._request_params(prompt)),
+                self._estimate_tokens(prompt)
+            )
+            return self._handle_completion(completion)
+            
+        except Exception as e:
+            return self._fallback(e)
+    
+    def _get_routed_response(self, prompt, chat_data, compaction):
+        """
+        Model kademesiyle yanıt alır: ucuz modelden başlar, çıktı geçersizse,
+        güven düşükse ya da sohbet negatifse bir üst modele çıkar
+        """
+        tier_index, escalations = self.router.start(compaction)
+        while True:
+            tier = self.router.tiers[tier_index]
+            completion, analysis, error = None, None, None
+            attempt_times = []
+            try:
+                completion = self._call_with_retry(
+                    lambda: self.client.chat.completions.parse(**self._request_params(prompt, tier)),
+                    attempt_times
+                )
+                analysis = self._handle_completion(completion)
+            except Exception as e:
+                if not is_invalid_output(e):
+                    self.router.record_error(tier_index)
+                    return self._fallback(e)
+                error = e
+            # Kademe gecikmesi: son denemenin istek süresi (limit/yeniden deneme beklemeleri hariç)
+            self.router.observe(tier_index, attempt_times[-1] if attempt_times else 0.0,
+                                completion, analysis, chat_data)
+            
+            next_index = self.router.next_tier(tier_index, analysis, escalations)
+            if next_index is None:
+                if analysis is None:
+                    return self._fallback(error)
+                return self.router.finalize(tier_index, analysis, escalations)
+            tier_index = next_index
+    
+    async def _get_routed_response_async(self, prompt, chat_data, compaction):
+        """_get_routed_response'un asenkron karşılığı - RPM/TPM bütçesine uyarak"""
+        tier_index, escalations = self.router.start(compaction)
+        while True:
+            tier = self.router.tiers[tier_index]
+            completion, analysis, error = None, None, None
+            attempt_times = []
+            try:
+                completion = await self._call_with_retry_async(
+                    lambda: self.async_client.chat.completions.parse(**self._request_params(prompt, tier)),
+                    self._estimate_tokens(prompt, tier.max_completion_tokens),
+                    attempt_times
+                )
+                analysis = self._handle_completion(completion)
+            except Exception as e:
+                if not is_invalid_output(e):
+                    self.router.record_error(tier_index)
+                    return self._fallback(e)
+                error = e
+            # Kademe gecikmesi: son denemenin istek süresi (limit/yeniden deneme beklemeleri hariç)
+            self.router.observe(tier_index, attempt_times[-1] if attempt_times else 0.0,
+                                completion, analysis, chat_data)
+            
+            next_index = self.router.next_tier(tier_index, analysis, escalations)
+            if next_index is None:
+                if analysis is None:
+                    return self._fallback(error)
+                return self.router.finalize(tier_index, analysis, escalations)
+            tier_index = next_index
     
     def _parse_response(self, response_data):
         """
@@ -120,40 +438,145 @@ class ChatAnalyzer:
         """
         return response_data
     
-    def analyze_all_chats(self, chats):
+    async def analyze_chat_async(self, chat_data, prepared=None):
         """
-        Tüm sohbetleri analiz eder
+        Tek bir sohbeti asenkron analiz eder
+        """
+        local = self._fast_path_result(chat_data)
+        if local is not None:
+            return local
+        
+        cluster, similarity = self._dedup_match(chat_data, prepared)
+        self._dedup_begin_async(cluster, similarity)
+        try:
+            return await self._analyze_matched_async(chat_data, prepared, cluster, similarity)
+        finally:
+            self._dedup_release(cluster, similarity)
+    
+    async def _analyze_matched_async(self, chat_data, prepared, cluster, similarity):
+        """_analyze_matched'in asenkron karşılığı; üye, temsilcinin sonucunu bekler"""
+        if similarity is not None and cluster.pending is not None:
+            await asyncio.shield(cluster.pending)
+        shared = self._dedup_shared(chat_data, cluster, similarity)
+        if shared is not None:
+            return shared
+        
+        prompt, compaction = self._build_prompt(chat_data, prepared)
+        cache_key, cached = await self._cache_lookup_async(prompt, prepared and prepared['cache_key'])
+        if cached is not None:
+            return self._dedup_record(cluster, similarity, {**cached, **compaction})
+        
+        response = await self._get_api_response_async(prompt, chat_data, compaction)
+        await self._cache_store_async(cache_key, response)
+        return self._dedup_record(cluster, similarity, {**self._parse_response(response), **compaction})
+    
+    def _combine_result(self, chat_info, analysis_result):
+        """Temel bilgileri analiz sonucuyla birleştirir (ham sohbet taşınmaz)"""
+        combined = {k: v for k, v in chat_info.items() if k not in ('raw_chat', PREPARED_KEY)}
+        combined.update(analysis_result)
+        return combined
+    
+    def _record_result(self, journal, result, analysis_result):
+        """Başarılı sonucu çalıştırma günlüğüne yazar (fallback sonuçlar yeniden denenir)"""
+        if journal is not None and not is_fallback(analysis_result):
+            journal.record(result)
+    
+    async def _record_result_async(self, journal, result, analysis_result):
+        """_record_result'un event loop'u bloklamayan sürümü: günlük yazımı iş parçacığında yapılır"""
+        if journal is not None and not is_fallback(analysis_result):
+            await asyncio.to_thread(journal.record, result)
+    
+    def iter_analyze_chats(self, chats, journal=None):
+        """
+        Sohbetleri sırayla analiz eder ve sonuçları tek tek döner (generator).
+        Günlükte tamamlanmış görünen sohbetler için API çağrısı yapılmaz.
         """
-        results = []
         success_count = 0
+        total = 0
         
         for i, chat_info in enumerate(chats, 1):
-            print(f"🔄 Analiz: {i}/{len(chats)} - Sohbet ID: {chat_info['sohbet_id']}")
+            total = i
+            completed = journal.get(chat_info['sohbet_id']) if journal is not None else None
+            if completed is not None:
+                success_count += 1
+                yield completed
+                continue
+            
+            log(f"🔄 Analiz: {i} - Sohbet ID: {chat_info['sohbet_id']}")
             
             try:
-                analysis_result = self.analyze_chat(chat_info['raw_chat'])
+                analysis_result = self.analyze_chat(chat_info['raw_chat'], chat_info.get(PREPARED_KEY))
                 
                 # Temel bilgilerle birleştir
-                combined_result = {**chat_info, **analysis_result}
-                results.append(combined_result)
-                success_count += 1
-                
-                # Her 3 analizde bir bekle (rate limiting)
-                if i % 3 == 0:
-                    time.sleep(self.api_delay)
+                result = self._combine_result(chat_info, analysis_result)
+                self._record_result(journal, result, analysis_result)
+                yield result
+                success_count += not is_fallback(analysis_result)
                     
             except Exception as e:
-                print(f"❌ Analiz hatası: {e}")
                 # Hata durumunda fallback değerlerle devam et
-                fallback_result = {
-                    **chat_info,
-                    "yanıt_durumu": "Çözülemedi",
-                    "sentiment": "Nötr",
-                    "tür": "Sorun",
-                    "intent": "Diğer",
-                    "intent_detay": "Analiz hatası"
-                }
-                results.append(fallback_result)
+                yield self._combine_result(chat_info, self._fallback(e))
         
-        print(f"📊 Analiz tamamlandı: {success_count}/{len(chats)} başarılı")
-        return results
+        print(f"📊 Analiz tamamlandı: {success_count}/{total} başarılı")
+    
+    def analyze_all_chats(self, chats, journal=None):
+        """
+        Tüm sohbetleri analiz eder
+        """
+        return list(self.iter_analyze_chats(chats, journal))
+    
+    async def aiter_analyze_chats(self, chats, journal=None):
+        """
+        Sohbetleri eşzamanlı analiz eder ve sonuçları giriş sırasıyla tek tek döner.
+        Bellekte en fazla sınırlı sayıda bekleyen sohbet tutulur. chats senkron ya da
+        asenkron (ör. hat kuyruğundan bloklamadan okuyan) yinelenebilir olabilir.
+        """
+        self._start_async_run()
+        window = deque()
+        window_size = self.max_concurrency * 2
+        success_count = 0
+        total = 0
+        
+        async def analyze_one(i, chat_info):
+            completed = journal.get(chat_info['sohbet_id']) if journal is not None else None
+            if completed is not None:
+                return completed, True
+            
+            log(f"🔄 Analiz: {i} - Sohbet ID: {chat_info['sohbet_id']}")
+            try:
+                analysis_result = await self.analyze_chat_async(chat_info['raw_chat'], chat_info.get(PREPARED_KEY))
+                result = self._combine_result(chat_info, analysis_result)
+                await self._record_result_async(journal, result, analysis_result)
+                return result, not is_fallback(analysis_result)
+            except Exception as e:
+                return self._combine_result(chat_info, self._fallback(e)), False
+        
+        async for chat_info in aiter_items(chats):
+            total += 1
+            window.append(asyncio.ensure_future(analyze_one(total, chat_info)))
+            if len(window) >= window_size:
+                result, ok = await window.popleft()
+                success_count += ok
+                yield result
+        
+        while window:
+            result, ok = await window.popleft()
+            success_count += ok
+            yield result
+        
+        print(f"📊 Analiz tamamlandı: {success_count}/{total} başarılı")
+    
+    async def analyze_all_chats_async(self, chats, journal=None):
+        """
+        Tüm sohbetleri eşzamanlı analiz eder - sonuçlar giriş sırasıyla döner
+        """
+        return [result async for result in self.aiter_analyze_chats(chats, journal)]
+    
+    def run_analysis(self, chats, mode=None, journal=None):
+        """
+        Seçilen moda göre tüm sohbetleri analiz eder ("sync" veya "async")
+        """
+        mode = mode or settings.ANALYSIS_MODE
+        if mode == "async":
+            return asyncio.run(self.analyze_all_chats_async(chats, journal))
+        return self.analyze_all_chats(chats, journal)
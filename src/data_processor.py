@@ -1,15 +1,38 @@
 import json
+import time
 from datetime import datetime
-from utils.helpers import load_json_file, parse_timestamp, format_duration
+from utils.helpers import load_json_file, iter_json_records, parse_fixed_timestamp, format_duration
+from src.metrics import metrics
 
 class DataProcessor:
-    def __init__(self, json_file_path):
+    def __init__(self, json_file_path, streaming=False):
         self.json_file_path = json_file_path
-        self.data = self.load_data()
+        self.streaming = streaming
+        # Akış modunda dosya belleğe alınmaz, sohbetler okundukça işlenir
+        self.data = None if streaming else self.load_data()
         
     def load_data(self):
         """JSON verisini yükler"""
-        return load_json_file(self.json_file_path)
+        with metrics.timer('load'):
+            if self.json_file_path.endswith(('.jsonl', '.ndjson')):
+                try:
+                    return list(iter_json_records(self.json_file_path))
+                except Exception as e:
+                    print(f"JSON yükleme hatası: {e}")
+                    return None
+            return load_json_file(self.json_file_path)
+    
+    def iter_raw_chats(self):
+        """Ham sohbetleri tek tek döner (JSON dizisi veya NDJSON/JSONL)"""
+        if self.streaming:
+            # Akış modunda okuma süresi sohbet başına ölçülür
+            start = time.perf_counter()
+            for chat in iter_json_records(self.json_file_path):
+                metrics.record_time('load', time.perf_counter() - start)
+                yield chat
+                start = time.perf_counter()
+        elif self.data:
+            yield from self.data
     
     def extract_chat_info(self, chat):
         """Sohbetten temel bilgileri çıkarır"""
@@ -45,9 +68,9 @@ class DataProcessor:
             return format_duration(0)
             
         try:
-            # Zaman formatını ayarla
-            start_dt = parse_timestamp(start, "%d.%m.%Y %H:%M:%S")
-            end_dt = parse_timestamp(end, "%d.%m.%Y %H:%M:%S")
+            # "%d.%m.%Y %H:%M:%S" biçimi strptime'sız parse edilir
+            start_dt = parse_fixed_timestamp(start)
+            end_dt = parse_fixed_timestamp(end)
             
             if start_dt and end_dt:
                 diff = end_dt - start_dt
@@ -58,27 +81,48 @@ class DataProcessor:
             
         return format_duration(0)
     
-    def get_all_chats(self):
-        """Tüm sohbetleri ve bilgilerini getirir"""
-        chat_infos = []
-        for chat in self.data:
-            chat_info = self.extract_chat_info(chat)
+    def iter_chats(self, raw_chats=None):
+        """Sohbetleri (ya da verilen ham sohbetleri) ve bilgilerini tek tek döner (generator)"""
+        for chat in (self.iter_raw_chats() if raw_chats is None else raw_chats):
+            with metrics.timer('extract'):
+                chat_info = self.extract_chat_info(chat)
             if chat_info:
                 chat_info['raw_chat'] = chat  # Orijinal sohbet verisini de sakla
-                chat_infos.append(chat_info)
-                
-        return chat_infos
+                yield chat_info
+    
+    def get_all_chats(self):
+        """Tüm sohbetleri ve bilgilerini getirir"""
+        return list(self.iter_chats())
+    
+    def iter_ground_truth_labels(self):
+        """Önceden hazırlanmış etiketleri tek tek döner (generator)"""
+        for chat in self.iter_raw_chats():
+            yield self.ground_truth_record(chat)
+    
+    @staticmethod
+    def ground_truth_record(chat):
+        """Ham sohbetteki hazır etiketleri döner"""
+        return {
+            'sohbet_id': chat.get('sohbet_id'),
+            'yanit_durumu': chat.get('yanit_durumu'),
+            'sentiment': chat.get('sentiment'),
+            'tur': chat.get('tur'),
+            'intent': chat.get('intent'),
+            'intent_detay': chat.get('intent_detay')
+        }
+    
+    @staticmethod
+    def ground_truth_from_result(result):
+        """Sonuca taşınan gercek_* alanlarından ground_truth_record biçiminde kayıt"""
+        return {
+            'sohbet_id': result.get('sohbet_id'),
+            'yanit_durumu': result.get('gercek_yanit_durumu'),
+            'sentiment': result.get('gercek_sentiment'),
+            'tur': result.get('gercek_tur'),
+            'intent': result.get('gercek_intent'),
+            'intent_detay': result.get('gercek_intent_detay')
+        }
     
     def get_ground_truth_labels(self):
         """Önceden hazırlanmış etiketleri getirir"""
-        ground_truth = []
-        for chat in self.data:
-            ground_truth.append({
-                'sohbet_id': chat.get('sohbet_id'),
-                'yanit_durumu': chat.get('yanit_durumu'),
-                'sentiment': chat.get('sentiment'),
-                'tur': chat.get('tur'),
-                'intent': chat.get('intent'),
-                'intent_detay': chat.get('intent_detay')
-            })
-        return ground_truth
+        return list(self.iter_ground_truth_labels())
@@ -0,0 +1,239 @@
+import re
+import zlib
+import numpy as np
+import pandas as pd
+from config.settings import settings
+from src.fast_classifier import LABEL_FIELDS
+from src.metrics import metrics
+from utils.helpers import write_text_atomic
+
+# Sohbetten sohbete değişen, etiketi etkilemeyen parçalar (sıra önemli: önce özel kalıplar)
+VOLATILE_PATTERNS = [
+    (re.compile(r"https?://\S+|www\.\S+"), " <link> "),
+    (re.compile(r"[\w.+-]+@[\w-]+\.[\w.]+"), " <eposta> "),
+    (re.compile(r"\b\d{1,4}[./-]\d{1,2}[./-]\d{1,4}\b"), " <tarih> "),
+    (re.compile(r"\b\d{1,2}:\d{2}(?::\d{2})?\b"), " <saat> "),
+    (re.compile(r"\b((?i:sayın|adım|ismim))\s+[A-ZÇĞİÖŞÜ]\w*(?:\s+[A-ZÇĞİÖŞÜ]\w*)?"), r" \1 <isim> "),
+    (re.compile(r"\b[A-ZÇĞİÖŞÜ]\w*\s+(bey|hanım)\b", re.IGNORECASE), r" <isim> \1 "),
+    # Sipariş / kargo numaraları, kodlar, tutarlar, telefonlar
+    (re.compile(r"[\w-]*\d[\w-]*"), " <no> "),
+]
+
+WORD_PATTERN = re.compile(r"<\w+>|\w+", re.UNICODE)
+
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+
+
+def normalize_text(text):
+    """Değişken parçaları yer tutucularla değiştirip küçük harfli kelime listesi döner"""
+    text = str(text)
+    for pattern, replacement in VOLATILE_PATTERNS:
+        text = pattern.sub(replacement, text)
+    return WORD_PATTERN.findall(text.lower())
+
+
+def chat_shingles(chat_data, size=3):
+    """Normalize edilmiş sohbetin gönderen işaretli kelime n-gram hashleri"""
+    tokens = []
+    for message in chat_data.get('mesajlar', []):
+        tokens.append("|m|" if message.get('sender') == 'Müşteri' else "|b|")
+        tokens.extend(normalize_text(message.get('text', '')))
+    if not tokens:
+        return np.empty(0, dtype=np.uint64)
+    windows = [tokens] if len(tokens) < size else (tokens[i:i + size] for i in range(len(tokens) - size + 1))
+    return np.unique(np.fromiter(
+        (zlib.crc32(" ".join(window).encode('utf-8')) for window in windows), dtype=np.uint64
+    ))
+
+
+class MinHasher:
+    """Kelime n-gram kümeleri için MinHash imzası; aynı tohumla her süreçte aynı imzayı üretir"""
+
+    def __init__(self, num_perm=None, seed=1):
+        self.num_perm = num_perm or settings.DEDUP_NUM_PERM
+        self.seed = seed
+        rng = np.random.RandomState(seed)
+        self._a = rng.randint(1, _MERSENNE_PRIME, size=self.num_perm, dtype=np.uint64)
+        self._b = rng.randint(0, _MERSENNE_PRIME, size=self.num_perm, dtype=np.uint64)
+
+    def signature(self, chat_data):
+        """Sohbetin imzası; metni olmayan sohbet için None"""
+        shingles = chat_shingles(chat_data)
+        if not shingles.size:
+            return None
+        hashed = (np.outer(shingles, self._a) + self._b) % _MERSENNE_PRIME & _MAX_HASH
+        return hashed.min(axis=0).astype(np.uint32)
+
+
+class DedupCluster:
+    """Neredeyse aynı sohbetlerden oluşan küme; ilk sohbet temsilcidir"""
+
+    __slots__ = ('id', 'signature', 'labels', 'size', 'shared', 'similarity_sum', 'min_similarity',
+                 'audits', 'agreements', 'trusted', 'pending')
+
+    def __init__(self, cluster_id, signature):
+        self.id = cluster_id
+        self.signature = signature
+        self.labels = None  # Temsilcinin (ya da ilk başarılı üyenin) etiketleri
+        self.size = 1
+        self.shared = 0
+        self.similarity_sum = 0.0
+        self.min_similarity = 1.0
+        self.audits = 0
+        self.agreements = 0
+        self.trusted = True
+        self.pending = None  # Async modda temsilcinin analizi bitene kadar bekleme noktası
+
+    @property
+    def confidence(self):
+        """En düşük üye benzerliği x denetim uyum oranı"""
+        agreement = self.agreements / self.audits if self.audits else 1.0
+        return round(self.min_similarity * agreement, 3)
+
+
+class ChatDeduplicator:
+    """
+    Analizden önce neredeyse aynı sohbetleri kümeler. Sipariş numarası, tarih,
+    isim gibi değişken parçalar normalize edilir; MinHash imzaları LSH bantlarıyla
+    aday temsilcilere eşlenir ve tahmini Jaccard benzerliği eşiği aşan sohbet
+    kümeye katılır. Kümede yalnızca temsilci analiz edilir, etiketleri üyelere
+    dağıtılır. Üyelerin bir örneği (DEDUP_AUDIT_RATE) yine de analiz edilir;
+    etiketler uyuşmazsa küme güvenilmez sayılır ve sonraki üyeler tek tek analiz edilir.
+    """
+
+    def __init__(self, threshold=None, num_perm=None, bands=None, audit_rate=None, max_clusters=None, seed=1):
+        self.threshold = threshold if threshold is not None else settings.DEDUP_THRESHOLD
+        self.hasher = MinHasher(num_perm, seed)
+        self.bands = bands or settings.DEDUP_BANDS
+        if self.hasher.num_perm % self.bands:
+            raise ValueError("DEDUP_NUM_PERM, DEDUP_BANDS'in katı olmalı")
+        self.rows = self.hasher.num_perm // self.bands
+        self.audit_rate = audit_rate if audit_rate is not None else settings.DEDUP_AUDIT_RATE
+        self.max_clusters = max_clusters or settings.DEDUP_MAX_CLUSTERS
+        self.clusters = {}
+        self._buckets = [{} for _ in range(self.bands)]
+        self.seen = 0
+        self.shared = 0
+
+    @property
+    def context(self):
+        """Ön işleme süreçlerinde aynı imzayı üretmek için MinHasher parametreleri"""
+        return self.hasher.num_perm, self.hasher.seed
+
+    def _band_keys(self, signature):
+        return [signature[i * self.rows:(i + 1) * self.rows].tobytes() for i in range(self.bands)]
+
+    def match(self, chat_data, signature=None):
+        """
+        (küme, benzerlik) döner. Yeni küme açıldıysa benzerlik None'dır (temsilci);
+        imza çıkarılamazsa ya da küme sınırı dolduysa (None, None) döner.
+        """
+        if signature is None:
+            signature = self.hasher.signature(chat_data)
+        if signature is None:
+            return None, None
+        self.seen += 1
+
+        keys = self._band_keys(signature)
+        best, best_similarity = None, 0.0
+        checked = set()
+        for bucket, key in zip(self._buckets, keys):
+            candidate = bucket.get(key)
+            if candidate is None or candidate.id in checked:
+                continue
+            checked.add(candidate.id)
+            similarity = float(np.count_nonzero(candidate.signature == signature)) / len(signature)
+            if similarity > best_similarity:
+                best, best_similarity = candidate, similarity
+
+        if best is not None and best_similarity >= self.threshold:
+            best.size += 1
+            best.similarity_sum += best_similarity
+            best.min_similarity = min(best.min_similarity, best_similarity)
+            return best, best_similarity
+
+        if len(self.clusters) >= self.max_clusters:
+            return None, None
+        cluster = DedupCluster(str(chat_data.get('sohbet_id', '')), signature)
+        self.clusters[cluster.id] = cluster
+        for bucket, key in zip(self._buckets, keys):
+            bucket.setdefault(key, cluster)
+        return cluster, None
+
+    def should_audit(self, sohbet_id):
+        """Üyenin denetim için yine de analiz edilip edilmeyeceği (sohbet_id'ye göre sabit)"""
+        return zlib.crc32(str(sohbet_id).encode('utf-8')) % 10000 < self.audit_rate * 10000
+
+    def shared_result(self, cluster, similarity):
+        """Küme etiketlerini üyeye dağıtır"""
+        cluster.shared += 1
+        self.shared += 1
+        metrics.increment('dedup_shared')
+        return {**cluster.labels, **self.cluster_fields(cluster, similarity, shared=True)}
+
+    @staticmethod
+    def cluster_fields(cluster, similarity, shared=False):
+        """Sonuca eklenen küme kolonları"""
+        return {
+            'kume_id': cluster.id,
+            'kume_benzerlik': round(similarity if similarity is not None else 1.0, 3),
+            'kume_paylasildi': shared
+        }
+
+    def record(self, cluster, similarity, labels):
+        """
+        Analiz edilmiş bir sohbetin etiketlerini kümeye işler: küme henüz etiketsizse
+        etiketleri kümeye yazılır, üye etiketli kümedeyse denetim olarak karşılaştırılır
+        """
+        if cluster.labels is None:
+            cluster.labels = labels
+            return
+        if similarity is None:
+            return
+        cluster.audits += 1
+        if all(labels.get(field) == cluster.labels.get(field) for field in LABEL_FIELDS):
+            cluster.agreements += 1
+        else:
+            cluster.trusted = False
+
+    def stats(self):
+        audits = sum(cluster.audits for cluster in self.clusters.values())
+        agreements = sum(cluster.agreements for cluster in self.clusters.values())
+        return {
+            'seen': self.seen,
+            'clusters': len(self.clusters),
+            'shared': self.shared,
+            'shared_rate': round((self.shared / self.seen) * 100, 1) if self.seen else 0.0,
+            'audits': audits,
+            'agreements': agreements,
+            'untrusted': sum(not cluster.trusted for cluster in self.clusters.values())
+        }
+
+    def audit_frame(self):
+        """Birden fazla üyesi olan kümeler için küme başına güven denetimi"""
+        rows = []
+        for cluster in self.clusters.values():
+            if cluster.size < 2:
+                continue
+            labels = cluster.labels or {}
+            rows.append({
+                'kume_id': cluster.id,
+                'uye_sayisi': cluster.size,
+                'paylasilan': cluster.shared,
+                'ort_benzerlik': round(cluster.similarity_sum / (cluster.size - 1), 3),
+                'min_benzerlik': round(cluster.min_similarity, 3),
+                'denetim': cluster.audits,
+                'uyusan': cluster.agreements,
+                'guven': cluster.confidence,
+                'guvenilir': cluster.trusted,
+                **{field: labels.get(field) for field in LABEL_FIELDS}
+            })
+        columns = ['kume_id', 'uye_sayisi', 'paylasilan', 'ort_benzerlik', 'min_benzerlik',
+                   'denetim', 'uyusan', 'guven', 'guvenilir', *LABEL_FIELDS]
+        return pd.DataFrame(rows, columns=columns).sort_values(['guven', 'uye_sayisi'], ascending=[True, False])
+
+    def save_audit(self, path):
+        """Küme denetimini CSV olarak yazar"""
+        write_text_atomic(path, self.audit_frame().to_csv(index=False))
+        return path
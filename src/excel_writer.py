@@ -0,0 +1,182 @@
+import os
+import re
+from copy import copy
+import pandas as pd
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import PatternFill, Font, Alignment
+from openpyxl.utils import get_column_letter
+
+# Karşılaştırma yapılacak alanlar (analiz alanı, gerçek değer alanı)
+COMPARISON_FIELDS = [
+    ('yanıt_durumu', 'gercek_yanit_durumu'),
+    ('sentiment', 'gercek_sentiment'),
+    ('tür', 'gercek_tur'),
+    ('intent', 'gercek_intent')
+]
+
+MAX_COLUMN_WIDTH = 30
+
+# XML 1.0'da geçersiz kod noktaları: kontrol karakterleri, eşleşmemiş surrogate'ler,
+# U+FFFE/U+FFFF (DEL önceki davranışla uyum için ayrıca temizlenir)
+ILLEGAL_XML_CHARS = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f\x7f\ud800-\udfff\ufffe\uffff]')
+
+# Renk tanımlamaları
+CORRECT_FILL = PatternFill(start_color='E8F5E8', end_color='E8F5E8', fill_type='solid')  # Açık yeşil - DOĞRU
+INCORRECT_FILL = PatternFill(start_color='FFEBEE', end_color='FFEBEE', fill_type='solid')  # Açık kırmızı - YANLIŞ
+HEADER_FILL = PatternFill(start_color='2E86AB', end_color='2E86AB', fill_type='solid')  # Mavi başlık
+HEADER_FONT = Font(color='FFFFFF', bold=True, size=12)
+HEADER_ALIGNMENT = Alignment(horizontal='center', vertical='center')
+SUMMARY_TITLE_FILL = PatternFill(start_color='F0F8FF', end_color='F0F8FF', fill_type='solid')
+SUMMARY_TITLE_FONT = Font(bold=True, size=14, color='2E86AB')
+SUMMARY_FONT = Font(bold=True, size=11)
+LEGEND_FONT = Font(bold=True, size=12, color='2E86AB')
+
+
+def clean_excel_data(df):
+    """
+    Excel'de geçersiz karakterleri temizler. Metin sütunlarında önce vektörel
+    olarak eşleşen satırlar bulunur, yalnızca onlarda değiştirme yapılır;
+    boş (null) ve metin olmayan değerler olduğu gibi kalır.
+    """
+    for column in df.columns:
+        series = df[column]
+        if not (pd.api.types.is_object_dtype(series.dtype) or pd.api.types.is_string_dtype(series.dtype)):
+            continue
+        # Hiç metin içermeyen object sütunlar (ör. boşluklu bool) .str desteklemez
+        if pd.api.types.infer_dtype(series, skipna=True) not in ('string', 'mixed', 'mixed-integer'):
+            continue
+
+        # Metin olmayan değerler için .str sonucu NaN olur, na=False ile atlanır
+        dirty = series.str.contains(ILLEGAL_XML_CHARS, na=False)
+        if dirty.any():
+            df[column] = series.mask(dirty, series[dirty].str.replace(ILLEGAL_XML_CHARS, '', regex=True))
+
+    return df
+
+
+def _normalized(series):
+    return series.astype('string').str.lower().str.strip()
+
+
+def comparison_mask(df):
+    """
+    Her karşılaştırma alanı için doğru/yanlış maskesini vektörel hesaplar
+    (büyük/küçük harf ve boşluklar yok sayılır, boş değerler yanlış sayılır)
+    """
+    masks = {}
+    for ai_field, truth_field in COMPARISON_FIELDS:
+        if ai_field in df.columns and truth_field in df.columns:
+            ai_values = _normalized(df[ai_field])
+            truth_values = _normalized(df[truth_field])
+            correct = (ai_values == truth_values) & (ai_values != '') & (truth_values != '')
+            masks[ai_field] = correct.fillna(False).to_numpy(dtype=bool)
+    return masks
+
+
+def column_widths(df, extra_values=None):
+    """Sütun genişliklerini hücreleri gezmeden DataFrame istatistiklerinden çıkarır"""
+    widths = []
+    for idx, column in enumerate(df.columns):
+        lengths = df[column].astype('string').str.len()
+        longest = int(lengths.max()) if lengths.notna().any() else 0
+        if df[column].isna().any():
+            longest = max(longest, len('None'))
+        longest = max(longest, len(str(column)), *(len(str(v)) for v in (extra_values or {}).get(idx, [])))
+        widths.append(min(longest + 2, MAX_COLUMN_WIDTH))
+    return widths
+
+
+def _styled(ws, value, fill=None, font=None, alignment=None):
+    cell = WriteOnlyCell(ws, value=value)
+    if fill is not None:
+        cell.fill = fill
+    if font is not None:
+        cell.font = font
+    if alignment is not None:
+        cell.alignment = alignment
+    return cell
+
+
+def write_formatted_excel_chunks(chunks, output_path):
+    """
+    Sonuçları başlık stili, doğru/yanlış renklendirmesi ve performans özetiyle
+    yazar. chunks() her çağrıda aynı sütunlara sahip DataFrame parçalarını
+    sırasıyla döner; ilk geçişte sütun genişlikleri ve doğruluk sayıları,
+    ikincisinde satırlar hesaplanır. Write-only çalışma kitabı ve parça parça
+    okuma sayesinde bellekte yalnızca bir parça tutulur.
+    Toplam ve tam doğru satır sayısını döner.
+    """
+    directory = os.path.dirname(output_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    columns = []
+    widths = []
+    total_rows = 0
+    correct_rows = 0
+    for df in chunks():
+        columns = list(df.columns)
+        widths = [max(pair) for pair in zip(widths, column_widths(df))] if widths else column_widths(df)
+        masks = comparison_mask(df)
+        total_rows += len(df)
+        correct_rows += int(pd.DataFrame(masks).all(axis=1).sum()) if masks else len(df)
+
+    summary_data = [
+        ("🔢 Toplam Sohbet", total_rows),
+        ("✅ Tam Doğru Tahmin", correct_rows),
+        ("⚠️ Kısmi Doğru Tahmin", total_rows - correct_rows),
+        ("🎯 Tam Doğruluk Oranı", f"%{(correct_rows/total_rows)*100:.1f}" if total_rows > 0 else "%0.0")
+    ]
+    legend_data = [
+        ("🟢 Yeşil", "Doğru Tahmin"),
+        ("🔴 Kırmızı", "Yanlış Tahmin")
+    ]
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet(title='Sheet1')
+
+    # Genişlikler satırlar yazılmadan önce ayarlanmalı
+    extra_values = {
+        0: ["📊 PERFORMANS ÖZETİ", "🎨 RENK AÇIKLAMASI"]
+           + [label for label, _ in summary_data] + [color for color, _ in legend_data],
+        1: [value for _, value in summary_data] + [meaning for _, meaning in legend_data]
+    }
+    for idx, values in extra_values.items():
+        if idx < len(widths):
+            widths[idx] = min(max(widths[idx], *(len(str(v)) + 2 for v in values)), MAX_COLUMN_WIDTH)
+    for idx, width in enumerate(widths, 1):
+        ws.column_dimensions[get_column_letter(idx)].width = width
+
+    ws.append([_styled(ws, str(column), HEADER_FILL, HEADER_FONT, HEADER_ALIGNMENT) for column in columns])
+
+    # Stil kaydı her hücre için yeniden aranmasın diye hazır stil dizileri kopyalanır
+    correct_style = _styled(ws, None, CORRECT_FILL)._style
+    incorrect_style = _styled(ws, None, INCORRECT_FILL)._style
+    for df in chunks():
+        styled_columns = {df.columns.get_loc(field): mask for field, mask in comparison_mask(df).items()}
+        for row_idx, row in enumerate(df.itertuples(index=False, name=None)):
+            values = [None if isinstance(value, float) and value != value else value for value in row]
+            for col_idx, mask in styled_columns.items():
+                cell = WriteOnlyCell(ws, value=values[col_idx])
+                cell._style = copy(correct_style if mask[row_idx] else incorrect_style)
+                values[col_idx] = cell
+            ws.append(values)
+
+    # Özet satırları (başlık iki sütuna birleştirilir)
+    ws.append([])
+    ws.append([])
+    summary_row = total_rows + 4
+    ws.append([_styled(ws, "📊 PERFORMANS ÖZETİ", SUMMARY_TITLE_FILL, SUMMARY_TITLE_FONT, Alignment(horizontal='center'))])
+    ws.merged_cells.add(f"A{summary_row}:B{summary_row}")
+    for label, value in summary_data:
+        ws.append([_styled(ws, label, font=SUMMARY_FONT), _styled(ws, value, font=SUMMARY_FONT)])
+
+    # Renk açıklaması
+    ws.append([])
+    ws.append([_styled(ws, "🎨 RENK AÇIKLAMASI", font=LEGEND_FONT)])
+    for color, meaning in legend_data:
+        ws.append([color, meaning])
+
+    wb.save(output_path)
+    return total_rows, correct_rows
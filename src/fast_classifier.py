@@ -0,0 +1,264 @@
+import json
+import os
+import re
+import zlib
+from collections import Counter, defaultdict
+import numpy as np
+from config.settings import settings
+
+# Analiz alanı -> ground truth alanı
+LABEL_FIELDS = {
+    'yanıt_durumu': 'yanit_durumu',
+    'sentiment': 'sentiment',
+    'tür': 'tur',
+    'intent': 'intent'
+}
+
+WORD_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+
+# Sıcaklık ölçekleme için denenen değerler (NB log olasılıkları aşırı keskin olduğundan geniş aralık)
+TEMPERATURES = np.logspace(0, 4, 161)
+
+
+def in_holdout(sohbet_id, rate):
+    """Sohbetin kalibrasyon için ayrılan kısma düşüp düşmediği (sohbet_id'ye göre sabit)"""
+    return zlib.crc32(str(sohbet_id).encode('utf-8')) % 10000 < rate * 10000
+
+
+def _softmax(scores):
+    probs = np.exp(scores - scores.max(axis=-1, keepdims=True))
+    return probs / probs.sum(axis=-1, keepdims=True)
+
+
+class FastPathClassifier:
+    """
+    API'ye gitmeden önce kalıp sohbetleri yerelde etiketleyen hızlı sınıflandırıcı.
+    Hashlenmiş kelime n-gram özellikleri üzerinde alan başına multinomial
+    Naive Bayes (log uzayında doğrusal model) kullanır. Naive Bayes olasılıkları
+    aşırı emin olduğundan eğitim verisinin bir kısmı ayrılır: alan başına sıcaklık
+    ölçeklemesi bu kısımda öğrenilir, güven eşiği de ayrılan kısımda tüm alanları
+    doğru çıkan sonuçların oranı (kesinlik) hedefi tutacak şekilde seçilir.
+    Hedef tutturulamazsa eşik yoktur ve hiçbir sohbet yerelde etiketlenmez.
+    """
+
+    def __init__(self, precision=None, n_features=None, alpha=1.0, holdout_rate=None, min_support=None):
+        self.precision = precision if precision is not None else settings.FAST_PATH_PRECISION
+        self.n_features = n_features or settings.FAST_PATH_FEATURES
+        self.alpha = alpha
+        self.holdout_rate = holdout_rate if holdout_rate is not None else settings.FAST_PATH_HOLDOUT_RATE
+        self.min_support = min_support or settings.FAST_PATH_MIN_SUPPORT
+        self.classes = {}
+        self.log_priors = {}
+        self.log_likelihoods = {}
+        self.temperatures = {}
+        self.intent_details = {}
+        self.threshold = None  # Kalibrasyonla seçilir; None ise hızlı yol kapalı
+        self.calibration = {}
+        self.train_file = None
+        self.seen = 0
+        self.deflected = 0
+
+    def _features(self, chat_data):
+        """Müşteri ve bot mesajlarından hashlenmiş unigram/bigram indeksleri"""
+        indices = []
+        for message in chat_data.get('mesajlar', []):
+            prefix = "m" if message.get('sender') == 'Müşteri' else "b"
+            words = WORD_PATTERN.findall(str(message.get('text', '')).lower())
+            tokens = words + [f"{a}_{b}" for a, b in zip(words, words[1:])]
+            indices.extend(
+                zlib.crc32(f"{prefix}:{token}".encode('utf-8')) % self.n_features for token in tokens
+            )
+        return np.unique(np.asarray(indices, dtype=np.int64), return_counts=True)
+
+    def fit(self, chats, ground_truth, train_file=None):
+        """
+        Ham sohbetler ve DataProcessor.get_ground_truth_labels() etiketleriyle eğitir,
+        ayrılan kısımda kalibre eder. Sohbetler akış halinde işlenir; bellekte
+        sayaçlar ve yalnızca ayrılan sohbetlerin özellikleri tutulur.
+        """
+        truth_index = {str(item['sohbet_id']): item for item in ground_truth}
+        counts = {field: defaultdict(lambda: np.zeros(self.n_features)) for field in LABEL_FIELDS}
+        class_totals = {field: Counter() for field in LABEL_FIELDS}
+        details = defaultdict(Counter)
+        holdout = []
+        trained = 0
+
+        for chat in chats:
+            truth = truth_index.get(str(chat.get('sohbet_id')))
+            if not truth:
+                continue
+            indices, values = self._features(chat)
+            if in_holdout(chat.get('sohbet_id'), self.holdout_rate):
+                holdout.append((indices, values, truth))
+                continue
+            for field, truth_field in LABEL_FIELDS.items():
+                label = truth.get(truth_field)
+                if not label:
+                    continue
+                np.add.at(counts[field][label], indices, values)
+                class_totals[field][label] += 1
+            if truth.get('intent') and truth.get('intent_detay'):
+                details[truth['intent']][truth['intent_detay']] += 1
+            trained += 1
+
+        for field in LABEL_FIELDS:
+            labels = sorted(class_totals[field])
+            if not labels:
+                continue
+            matrix = np.vstack([counts[field][label] for label in labels]) + self.alpha
+            self.classes[field] = labels
+            self.log_likelihoods[field] = np.log(matrix / matrix.sum(axis=1, keepdims=True))
+            priors = np.array([class_totals[field][label] for label in labels], dtype=float)
+            self.log_priors[field] = np.log(priors / priors.sum())
+
+        self.intent_details = {
+            intent: detail_counts.most_common(1)[0][0][:100] for intent, detail_counts in details.items()
+        }
+        self.train_file = os.path.realpath(train_file) if train_file else None
+        print(f"⚡ Hızlı sınıflandırıcı {trained} etiketli sohbetle eğitildi, {len(holdout)} sohbet kalibrasyona ayrıldı")
+        if self.is_trained:
+            self._calibrate(holdout)
+        return self
+
+    def _scores(self, field, indices, values):
+        return self.log_priors[field] + self.log_likelihoods[field][:, indices] @ values
+
+    def _calibrate(self, holdout):
+        """Alan başına sıcaklığı ve hedef kesinliği tutan en düşük güven eşiğini ayrılan kısımda seçer"""
+        confidence = np.ones(len(holdout))
+        correct = np.ones(len(holdout), dtype=bool)
+        for field, truth_field in LABEL_FIELDS.items():
+            classes = self.classes[field]
+            scores = np.array([self._scores(field, indices, values) for indices, values, _ in holdout])
+            truth = np.array([
+                classes.index(item[truth_field]) if item.get(truth_field) in classes else -1
+                for _, _, item in holdout
+            ], dtype=int)
+            known = truth >= 0
+            temperature = 1.0
+            if known.any():
+                # Bilinen etiketlerde negatif log olabilirliği en küçük sıcaklık
+                losses = [
+                    -np.log(_softmax(scores[known] / t)[np.arange(known.sum()), truth[known]] + 1e-12).mean()
+                    for t in TEMPERATURES
+                ]
+                temperature = float(TEMPERATURES[int(np.argmin(losses))])
+            self.temperatures[field] = temperature
+            if len(holdout):
+                probs = _softmax(scores / temperature)
+                confidence *= probs.max(axis=1)
+                # Etiketi olmayan alan sonucu bozmaz, bilinmeyen etiket yanlış sayılır
+                has_truth = np.array([bool(item.get(truth_field)) for _, _, item in holdout])
+                correct &= ~has_truth | (probs.argmax(axis=1) == truth)
+
+        self.threshold = None
+        self.calibration = {'holdout': len(holdout), 'target_precision': self.precision,
+                            'precision': None, 'coverage': 0.0}
+        if len(holdout) < self.min_support:
+            print(f"⚠️ Kalibrasyon için en az {self.min_support} ayrılmış sohbet gerekli ({len(holdout)} var), "
+                  f"hızlı yol kapalı")
+            return
+
+        order = np.argsort(-confidence, kind='stable')
+        hits = np.cumsum(correct[order])
+        support = np.arange(1, len(order) + 1)
+        precision = hits / support
+        eligible = np.flatnonzero((support >= self.min_support) & (precision >= self.precision))
+        if not eligible.size:
+            print(f"⚠️ Ayrılan {len(holdout)} sohbette %{self.precision * 100:g} kesinliği tutan güven eşiği yok, "
+                  f"hızlı yol kapalı")
+            return
+
+        k = int(eligible[-1])
+        self.threshold = float(confidence[order][k])
+        # Eşitlik durumunda eşiği geçen tüm sohbetler sayılır
+        accepted = confidence >= self.threshold
+        self.calibration.update({
+            'precision': round(float(correct[accepted].mean()), 4),
+            'coverage': round(float(accepted.mean()), 4)
+        })
+        print(f"⚡ Kalibrasyon: güven eşiği {self.threshold:.4f}, ayrılan kısımda kesinlik "
+              f"%{self.calibration['precision'] * 100:.1f}, kapsam %{self.calibration['coverage'] * 100:.1f}")
+
+    @property
+    def is_trained(self):
+        return all(field in self.classes for field in LABEL_FIELDS)
+
+    def trained_on(self, path):
+        """Model verilen dosyayla eğitildiyse True (analiz edilen veriyle eğitilmiş modeli ayırt eder)"""
+        return self.train_file is not None and os.path.realpath(path) == self.train_file
+
+    def predict(self, chat_data):
+        """(etiketler, güven) döner - güven alanların kalibre edilmiş olasılıklarının çarpımıdır"""
+        indices, values = self._features(chat_data)
+        labels = {}
+        confidence = 1.0
+        for field in LABEL_FIELDS:
+            probs = _softmax(self._scores(field, indices, values) / self.temperatures.get(field, 1.0))
+            best = int(probs.argmax())
+            labels[field] = self.classes[field][best]
+            confidence *= float(probs[best])
+
+        labels['intent_detay'] = self.intent_details.get(labels['intent'], labels['intent'])
+        return labels, confidence
+
+    def try_predict(self, chat_data):
+        """Kalibre edilmiş güven eşiği aşılırsa etiketleri, aksi halde None döner"""
+        if not self.is_trained or self.threshold is None:
+            return None
+        self.seen += 1
+        labels, confidence = self.predict(chat_data)
+        if confidence < self.threshold:
+            return None
+        self.deflected += 1
+        return labels
+
+    def stats(self):
+        """API'ye gitmeden yerelde cevaplanan trafik oranı ve ayrılan kısımdaki kesinlik"""
+        return {
+            'seen': self.seen,
+            'deflected': self.deflected,
+            'holdout_precision': self.calibration.get('precision'),
+            'deflection_rate': round((self.deflected / self.seen) * 100, 1) if self.seen else 0.0
+        }
+
+    def save(self, path):
+        """Modeli .npz dosyasına kaydeder"""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        meta = {
+            'n_features': self.n_features,
+            'alpha': self.alpha,
+            'classes': self.classes,
+            'intent_details': self.intent_details,
+            'temperatures': self.temperatures,
+            'threshold': self.threshold,
+            'calibration': self.calibration,
+            'train_file': self.train_file
+        }
+        arrays = {}
+        for field in self.classes:
+            arrays[f"prior_{field}"] = self.log_priors[field]
+            arrays[f"likelihood_{field}"] = self.log_likelihoods[field]
+        np.savez_compressed(path, meta=np.array(json.dumps(meta, ensure_ascii=False)), **arrays)
+
+    @classmethod
+    def load(cls, path):
+        """Kaydedilmiş modeli (kalibrasyonuyla birlikte) yükler"""
+        with np.load(path) as data:
+            meta = json.loads(str(data['meta']))
+            calibration = meta.get('calibration', {})
+            model = cls(precision=calibration.get('target_precision'), n_features=meta['n_features'],
+                        alpha=meta['alpha'])
+            model.classes = meta['classes']
+            model.intent_details = meta['intent_details']
+            model.temperatures = meta.get('temperatures', {})
+            model.threshold = meta.get('threshold')
+            model.calibration = calibration
+            model.train_file = meta.get('train_file')
+            for field in model.classes:
+                model.log_priors[field] = data[f"prior_{field}"]
+                model.log_likelihoods[field] = data[f"likelihood_{field}"]
+        return model
@@ -1,238 +1,508 @@
+import argparse
+import os
 import pandas as pd
 from config.settings import settings
 from src.data_processor import DataProcessor
 from src.chat_analyzer import ChatAnalyzer
 from src.report_generator import ReportGenerator
+from src.report_aggregator import ReportAggregates
+from src.result_cache import ResultCache
+from src.fast_classifier import FastPathClassifier
+from src.deduplicator import ChatDeduplicator
+from src.model_router import ModelRouter
+from src.run_journal import RunJournal
+from src.preprocessing import ChatPreprocessor
+from src.result_store import ResultStore, new_run_id
+from src.excel_writer import clean_excel_data, write_formatted_excel_chunks
+from src.pipeline import AnalysisPipeline, ExcelSpool
+from src.sharding import ShardLostError, ShardQueue, iter_shard, merge_parquet, shard_cache_path
+from src.timing_metrics import TimingStats
+from src.metrics import metrics
 from utils.helpers import save_to_txt
-from openpyxl import load_workbook
-from openpyxl.styles import PatternFill, Font, Alignment
-from openpyxl.utils import get_column_letter
 
-def clean_excel_data(df):
-    """Excel'de geçersiz karakterleri temizler"""
-    illegal_chars = ['\x00', '\x01', '\x02', '\x03', '\x04', '\x05', '\x06', '\x07', 
-                    '\x08', '\x0b', '\x0c', '\x0e', '\x0f', '\x10', '\x11', '\x12', 
-                    '\x13', '\x14', '\x15', '\x16', '\x17', '\x18', '\x19', '\x1a', 
-                    '\x1b', '\x1c', '\x1d', '\x1e', '\x1f', '\x7f']
-    
-    for column in df.columns:
-        if df[column].dtype == 'object':
-            df[column] = df[column].astype(str).apply(
-                lambda x: ''.join(c for c in x if c not in illegal_chars) if isinstance(x, str) else x
-            )
-    
-    return df
+# Başlık satırı hariç bir Excel sayfasına sığan en fazla satır
+EXCEL_MAX_ROWS = 1048575
 
-def add_excel_formatting(df, output_path):
-    """Excel'e akıllı renklendirme ve özet ekler"""
+# Shard dizininde birleştirme için bırakılan çıktılar
+SHARD_STATE_FILE = "rapor_durumu.json"
+SHARD_TIMING_FILE = "zamanlama.json"
+SHARD_EXCEL_FILE = "excel_sonuclari.pkl"
+
+# Excel sütun sırası (yalnızca sonuçlarda bulunanlar yazılır)
+EXCEL_COLUMNS = [
+    'sohbet_id', 'sohbet_baslangic', 'sohbet_bitis', 'toplam_sure',
+    'toplam_sure_sn', 'ilk_yanit_sn', 'ort_bot_yanit_sn', 'musteri_tur_sayisi',
+    'yanıt_durumu', 'sentiment', 'tür', 'intent', 'intent_detay', 'hata_nedeni',
+    'model', 'model_guven', 'yukseltme', 'kume_id', 'kume_benzerlik', 'kume_paylasildi',
+    'gercek_yanit_durumu', 'gercek_sentiment', 'gercek_tur',
+    'gercek_intent', 'gercek_intent_detay'
+]
+
+def export_excel(chunks, output_path):
+    """
+    Sonuçları renklendirilmiş Excel raporu olarak dışa aktarır. chunks() her çağrıda
+    sonuçları sırasıyla parça parça döner (ör. ExcelSpool.chunks); sonuçların
+    tamamı hiçbir aşamada belleğe alınmaz.
+    """
+    print("\n💾 Excel raporu oluşturuluyor...")
+    
+    # Sadece sonuçlarda bulunan sütunlar, sabit sırayla
+    present = set()
+    for results in chunks():
+        for result in results:
+            present.update(result)
+    columns = [column for column in EXCEL_COLUMNS if column in present]
+    
+    def frames():
+        # Excel için veri parça parça temizlenir
+        for results in chunks():
+            yield clean_excel_data(pd.DataFrame(results).reindex(columns=columns))
+    
+    # Excel dosyasını kaydet
     try:
-        # Workbook'u aç
-        wb = load_workbook(output_path)
-        ws = wb.active
-        
-        # Renk tanımlamaları
-        correct_fill = PatternFill(start_color='E8F5E8', end_color='E8F5E8', fill_type='solid')  # Açık yeşil - DOĞRU
-        incorrect_fill = PatternFill(start_color='FFEBEE', end_color='FFEBEE', fill_type='solid')  # Açık kırmızı - YANLIŞ
-        header_fill = PatternFill(start_color='2E86AB', end_color='2E86AB', fill_type='solid')  # Mavi başlık
-        header_font = Font(color='FFFFFF', bold=True, size=12)
-        summary_fill = PatternFill(start_color='FFD700', end_color='FFD700', fill_type='solid')  # Altın sarı - özet
-        summary_font = Font(bold=True, size=11)
-        
-        # Başlık satırını formatla
-        for cell in ws[1]:
-            cell.fill = header_fill
-            cell.font = header_font
-            cell.alignment = Alignment(horizontal='center', vertical='center')
-        
-        # Sütun indekslerini bul
-        column_mapping = {}
-        for idx, cell in enumerate(ws[1], 1):
-            column_mapping[cell.value] = idx
-        
-        total_rows = 0
-        correct_rows = 0
-        
-        # Her satır için renklendirme
-        for row in range(2, ws.max_row + 1):
-            total_rows += 1
-            row_correct = True
-            
-            # Karşılaştırma yapılacak alanlar
-            comparison_fields = [
-                ('yanıt_durumu', 'gercek_yanit_durumu'),
-                ('sentiment', 'gercek_sentiment'),
-                ('tür', 'gercek_tur'),
-                ('intent', 'gercek_intent')
-            ]
-            
-            for ai_field, truth_field in comparison_fields:
-                if ai_field in column_mapping and truth_field in column_mapping:
-                    ai_col = column_mapping[ai_field]
-                    truth_col = column_mapping[truth_field]
-                    
-                    ai_value = ws.cell(row=row, column=ai_col).value
-                    truth_value = ws.cell(row=row, column=truth_col).value
-                    
-                    # Değerleri karşılaştır (case-insensitive ve boşlukları yok say)
-                    if (ai_value and truth_value and 
-                        str(ai_value).lower().strip() == str(truth_value).lower().strip()):
-                        ws.cell(row=row, column=ai_col).fill = correct_fill
-                    else:
-                        ws.cell(row=row, column=ai_col).fill = incorrect_fill
-                        row_correct = False
-            
-            if row_correct:
-                correct_rows += 1
-        
-        # Özet satırları ekle
-        summary_row = ws.max_row + 3
-        
-        # Özet başlığı
-        ws.merge_cells(f'A{summary_row}:B{summary_row}')
-        ws.cell(row=summary_row, column=1).value = "📊 PERFORMANS ÖZETİ"
-        ws.cell(row=summary_row, column=1).font = Font(bold=True, size=14, color='2E86AB')
-        ws.cell(row=summary_row, column=1).fill = PatternFill(start_color='F0F8FF', end_color='F0F8FF', fill_type='solid')
-        ws.cell(row=summary_row, column=1).alignment = Alignment(horizontal='center')
-        
-        # Özet verileri
-        summary_data = [
-            ("🔢 Toplam Sohbet", total_rows),
-            ("✅ Tam Doğru Tahmin", correct_rows),
-            ("⚠️ Kısmi Doğru Tahmin", total_rows - correct_rows),
-            ("🎯 Tam Doğruluk Oranı", f"%{(correct_rows/total_rows)*100:.1f}" if total_rows > 0 else "%0.0")
-        ]
-        
-        for i, (label, value) in enumerate(summary_data, 1):
-            ws.cell(row=summary_row + i, column=1).value = label
-            ws.cell(row=summary_row + i, column=1).font = summary_font
-            ws.cell(row=summary_row + i, column=2).value = value
-            ws.cell(row=summary_row + i, column=2).font = summary_font
-        
-        # Renk Açıklaması
-        legend_row = summary_row + len(summary_data) + 2
-        ws.cell(row=legend_row, column=1).value = "🎨 RENK AÇIKLAMASI"
-        ws.cell(row=legend_row, column=1).font = Font(bold=True, size=12, color='2E86AB')
-        
-        legend_data = [
-            ("🟢 Yeşil", "Doğru Tahmin"),
-            ("🔴 Kırmızı", "Yanlış Tahmin")
-        ]
-        
-        for i, (color, meaning) in enumerate(legend_data, 1):
-            ws.cell(row=legend_row + i, column=1).value = color
-            ws.cell(row=legend_row + i, column=2).value = meaning
-        
-        # Sütun genişliklerini ayarla
-        for column in ws.columns:
-            max_length = 0
-            column_letter = get_column_letter(column[0].column)
-            for cell in column:
-                try:
-                    if len(str(cell.value)) > max_length:
-                        max_length = len(str(cell.value))
-                except:
-                    pass
-            adjusted_width = min(max_length + 2, 30)
-            ws.column_dimensions[column_letter].width = adjusted_width
-        
-        wb.save(output_path)
-        print("🎨 Excel formatlama ve renklendirme uygulandı")
+        # Renklendirme ve özet aynı yazımda uygulanır
+        with metrics.timer('excel'):
+            write_formatted_excel_chunks(frames, output_path)
+        print(f"✅ Excel raporu kaydedildi: {output_path}")
         
     except Exception as e:
-        print(f"❌ Excel formatlama hatası: {e}")
+        print(f"❌ Excel kaydetme hatası: {e}")
+        # Hata durumunda CSV olarak kaydet
+        csv_path = output_path.replace('.xlsx', '.csv')
+        for i, df in enumerate(frames()):
+            df.to_csv(csv_path, index=False, encoding='utf-8', mode='a' if i else 'w', header=not i)
+        print(f"✅ CSV olarak kaydedildi: {csv_path}")
 
-def main():
-    print("🤖 Sohbet Analiz Sistemi Başlatılıyor...")
-    print("=" * 60)
+def load_fast_path(precision):
+    """
+    Kayıtlı hızlı sınıflandırıcıyı yükler, yoksa (ya da hedef kesinlik değiştiyse) ayrı
+    etiketli eğitim dosyasıyla eğitip kaydeder. Analiz edilen veriyle eğitim yapılmaz;
+    kullanılamıyorsa None döner.
+    """
+    train_file = settings.FAST_PATH_TRAIN_FILE
+    if os.path.exists(settings.FAST_PATH_MODEL):
+        classifier = FastPathClassifier.load(settings.FAST_PATH_MODEL)
+        if classifier.precision == precision and (not train_file or classifier.trained_on(train_file)):
+            print(f"⚡ Hızlı sınıflandırıcı yükleniyor: {settings.FAST_PATH_MODEL}")
+            if classifier.trained_on(settings.DATA_FILE):
+                print("⚠️ Hızlı sınıflandırıcı analiz edilen veriyle eğitilmiş, hızlı yol kapalı")
+                return None
+            if classifier.threshold is None:
+                print("⚠️ Hızlı sınıflandırıcının hedef kesinliği tutan güven eşiği yok, hızlı yol kapalı")
+                return None
+            return classifier
     
+    if not train_file:
+        print("⚠️ Hızlı yol için analiz edilen veriden ayrı etiketli eğitim dosyası gerekli "
+              "(FAST_PATH_TRAIN_FILE), hızlı yol kapalı")
+        return None
+    if os.path.realpath(train_file) == os.path.realpath(settings.DATA_FILE):
+        print("⚠️ FAST_PATH_TRAIN_FILE analiz edilen veri dosyasıyla aynı, hızlı yol kapalı")
+        return None
+    
+    trainer = DataProcessor(train_file, streaming=True)
+    classifier = FastPathClassifier(precision=precision).fit(
+        trainer.iter_raw_chats(), trainer.get_ground_truth_labels(), train_file=train_file
+    )
+    classifier.save(settings.FAST_PATH_MODEL)
+    # Hedef kesinlik tutturulamadıysa eşik yoktur
+    return classifier if classifier.threshold is not None else None
+
+def parse_args(argv=None):
+    """Komut satırı argümanlarını okur"""
+    parser = argparse.ArgumentParser(description="Sohbet Analiz Sistemi")
+    parser.add_argument(
+        "--mode", choices=["sync", "async", "batch", "packed"], default=settings.ANALYSIS_MODE,
+        help="Analiz modu: sıralı (sync), eşzamanlı (async), Batch API (batch) "
+             "veya istek başına birden fazla sohbet (packed)"
+    )
+    parser.add_argument(
+        "--concurrency", type=int, default=settings.MAX_CONCURRENCY,
+        help="Async modda aynı anda yapılacak en fazla API çağrısı"
+    )
+    parser.add_argument(
+        "--no-cache", action="store_true",
+        help="Kalıcı sonuç önbelleğini devre dışı bırakır"
+    )
+    parser.add_argument(
+        "--stream", action="store_true", default=settings.STREAMING,
+        help="Veri dosyasını belleğe almadan sohbet sohbet okur (JSON dizisi veya NDJSON/JSONL)"
+    )
+    parser.add_argument(
+        "--workers", type=int, default=settings.PREPROCESS_WORKERS,
+        help="Ön işlemeyi (zaman, süre, prompt, önbellek anahtarı) N süreçte yapar; 0 kapalı"
+    )
+    parser.add_argument(
+        "--fast-path", action="store_true",
+        help="Kalıp sohbetleri API'ye göndermeden yerel sınıflandırıcıyla etiketler"
+    )
+    parser.add_argument(
+        "--fast-path-precision", type=float, default=settings.FAST_PATH_PRECISION,
+        help="Güven eşiğinin seçildiği, eğitim verisinden ayrılan kısımda tutturulacak kesinlik (0-1)"
+    )
+    parser.add_argument(
+        "--routing", action="store_true",
+        help="Sohbetleri ucuz modelden başlatır; geçersiz çıktı, düşük güven, uzun ya da negatif sohbette "
+             "üst modele çıkar (sync/async mod)"
+    )
+    parser.add_argument(
+        "--dedup", action="store_true",
+        help="Neredeyse aynı sohbetleri kümeler; kümede yalnızca bir sohbet analiz edilir, etiketler üyelere dağıtılır"
+    )
+    parser.add_argument(
+        "--dedup-threshold", type=float, default=settings.DEDUP_THRESHOLD,
+        help="Sohbetin kümeye katılması için gereken en düşük tahmini benzerlik (0-1)"
+    )
+    parser.add_argument(
+        "--resume", action="store_true",
+        help="Yarıda kalan çalıştırmaya günlükten devam eder, tamamlanan sohbetleri atlar"
+    )
+    parser.add_argument(
+        "--incremental", action="store_true",
+        help="Raporları kayıtlı durumla birleştirerek üretir (günlük ek veriler için)"
+    )
+    parser.add_argument(
+        "--replace-partitions", action="store_true",
+        help="Parquet'te bu çalıştırmanın yazdığı tarih bölümlerinin önceki dosyalarını siler "
+             "(aynı günün yeniden analizi için); varsayılan yalnızca ekler"
+    )
+    parser.add_argument(
+        "--no-excel", dest="excel", action="store_false", default=settings.EXCEL_EXPORT,
+        help="Excel raporunu oluşturmaz; sonuçlar yalnızca Parquet olarak yazılır"
+    )
+    parser.add_argument(
+        "--shards", type=int, default=0,
+        help="Sohbetleri sohbet_id hash'ine göre K shard'a böler; bu süreç boşta shard kalmayana kadar shard alır"
+    )
+    parser.add_argument(
+        "--shard", type=int,
+        help="Yalnızca verilen shard'ı (0..K-1) analiz eder (--shards ile)"
+    )
+    parser.add_argument(
+        "--shard-dir", default=settings.SHARD_DIR,
+        help="Shard çıktıları ve sahiplik dosyaları için paylaşılan dizin"
+    )
+    parser.add_argument(
+        "--run-id",
+        help="Shard dizinini bu çalıştırmaya bağlayan kimlik (ör. 2026-10-18); verilmezse veri dosyasının "
+             "adı, boyutu ve değişiklik zamanı kullanılır. Her süreçte aynı olmalı"
+    )
+    parser.add_argument(
+        "--merge", action="store_true",
+        help="Tamamlanan shard'ların sonuçlarını ve rapor sayaçlarını Excel/metin raporlarında birleştirir"
+    )
+    parser.add_argument(
+        "--log-level", type=str.upper, choices=["INFO", "WARNING", "ERROR"], default=settings.LOG_LEVEL,
+        help="WARNING sohbet başına ilerleme/başarı satırlarını, ERROR yeniden deneme uyarılarını da susturur"
+    )
+    parser.add_argument(
+        "--metrics-out", default=settings.METRICS_FILE,
+        help="Aşama süreleri ve API histogramlarını yazar (.prom: Prometheus metni, diğer: JSON)"
+    )
+    args = parser.parse_args(argv)
+    if args.shard is not None and not 0 <= args.shard < args.shards:
+        parser.error("--shard, 0 ile --shards - 1 arasında olmalı")
+    return args
+
+def output_path(default, output_dir=None):
+    """Shard çalıştırmasında çıktı dosyası shard dizinine yazılır"""
+    return default if output_dir is None else os.path.join(output_dir, os.path.basename(default))
+
+def analyze_chats(args, shard=None, output_dir=None, rate_slices=1, guard=None):
+    """
+    Sohbetleri seçilen modda analiz eder; sonuçlar Parquet'e yazılır, rapor sayaçları
+    toplanır. shard=(indeks, shard sayısı) verilirse yalnızca o shard'ın sohbetleri
+    analiz edilir ve çalıştırma çıktıları output_dir'e yazılır; guard günlük ve sonuç
+    yazımlarından önce çağrılır (shard sahipliği kaybedildiyse çalıştırmayı durdurur).
+    (pipeline, excel, router) döner; veri yoksa None.
+    """
     # Veri işlemciyi başlat
     print("📂 Veri yükleniyor...")
-    processor = DataProcessor(settings.DATA_FILE)
-    chats = processor.get_all_chats()
-    ground_truth = processor.get_ground_truth_labels()
+    processor = DataProcessor(settings.DATA_FILE, streaming=args.stream)
+    if not args.stream:
+        if not processor.data:
+            print("❌ Sohbet verisi bulunamadı!")
+            return None
+        
+        print(f"✅ {len(processor.data)} sohbet bulundu.")
     
-    if not chats:
-        print("❌ Sohbet verisi bulunamadı!")
-        return
+    # Analizörü başlat
+    cache = None
+    if settings.CACHE_ENABLED and not args.no_cache:
+        cache_file = settings.CACHE_FILE if shard is None else shard_cache_path(settings.CACHE_FILE, *shard)
+        cache = ResultCache(cache_file, settings.CACHE_MAX_ENTRIES)
+    fast_path = load_fast_path(args.fast_path_precision) if args.fast_path else None
+    dedup = ChatDeduplicator(threshold=args.dedup_threshold) if args.dedup else None
+    router = None
+    if args.routing:
+        if args.mode in ("sync", "async"):
+            router = ModelRouter()
+            print(f"🧭 Model kademesi: {' → '.join(tier.name for tier in router.tiers)}")
+        else:
+            print(f"⚠️ Model yönlendirme yalnızca sync/async modda kullanılır; {args.mode} modunda "
+                  f"{settings.MODEL_NAME} kullanılıyor")
+    # Aynı anda çalışan shard'lar RPM/TPM bütçesini paylaşır
+    analyzer = ChatAnalyzer(max_concurrency=args.concurrency,
+                            requests_per_minute=max(1, settings.RATE_LIMIT_RPM // rate_slices),
+                            tokens_per_minute=max(1, settings.RATE_LIMIT_TPM // rate_slices),
+                            cache=cache, fast_path=fast_path, dedup=dedup, router=router)
+    # Devralınan shard günlüğünden kaldığı yerden devam eder
+    journal = RunJournal(output_path(settings.RUN_JOURNAL, output_dir), resume=args.resume or shard is not None,
+                         run_id=new_run_id(), guard=guard)
     
-    print(f"✅ {len(chats)} sohbet bulundu.")
+    # Sohbetler analizöre okundukça aktarılır
+    raw_chats = processor.iter_raw_chats()
+    if shard is not None:
+        raw_chats = iter_shard(raw_chats, *shard)
+    if args.workers:
+        # Zaman/süre, prompt ve önbellek anahtarı hesapları süreç havuzunda yapılır
+        chats = ChatPreprocessor(analyzer, args.workers).iter_chats(raw_chats)
+    else:
+        chats = processor.iter_chats(raw_chats)
     
-    # Analizörü başlat
-    analyzer = ChatAnalyzer()
+    # Sonuçlar geldikçe Parquet'e yazılır, rapor sayaçları güncellenir;
+    # Excel için sonuçlar geçici dosyada (shard'da birleştirme için shard dizininde) sırasıyla biriktirilir
+    excel = None
+    if args.excel:
+        excel = ExcelSpool(EXCEL_MAX_ROWS, None if output_dir is None else os.path.join(output_dir, SHARD_EXCEL_FILE))
+    # Dosyalar günlükteki çalıştırma kimliğiyle yazılır: --resume (ya da devralınan shard)
+    # yalnızca bu çalıştırmanın önceki dosyalarını günlükten yeniden yazar
+    writer = ResultStore(output_path(settings.OUTPUT_PARQUET_DIR, output_dir)).open_writer(
+        replace=args.replace_partitions, run_id=journal.run_id, guard=guard
+    )
+    pipeline = AnalysisPipeline(analyzer, args.mode, journal, writer, excel,
+                                batch_dir=output_path(settings.BATCH_WORK_DIR, output_dir), guard=guard)
     
     # Tüm sohbetleri analiz et
-    print("\n🔍 Sohbetler analiz ediliyor...")
-    results = analyzer.analyze_all_chats(chats)
+    print(f"\n🔍 Sohbetler analiz ediliyor ({args.mode} mod)...")
+    try:
+        pipeline.run(chats)
+    finally:
+        journal.close()
     
-    # Excel'e kaydet
-    print("\n💾 Excel raporu oluşturuluyor...")
-    df = pd.DataFrame(results)
+    usage = analyzer.usage.summary()
+    print(f"🧮 Token kullanımı: {usage['requests']} istek, {usage['prompt_tokens']} prompt token "
+          f"({usage['cached_tokens']} önbellekten / {usage['uncached_tokens']} önbelleksiz, "
+          f"%{usage['cached_rate']} önbellek oranı), {usage['completion_tokens']} çıktı token")
     
-    # Gereksiz sütunları kaldır
-    if 'raw_chat' in df.columns:
-        df = df.drop('raw_chat', axis=1)
+    if analyzer.retry_count or analyzer.fallback_reasons:
+        reasons = ", ".join(f"{reason}: {count}" for reason, count in analyzer.fallback_reasons.most_common())
+        print(f"🔁 Yeniden deneme: {analyzer.retry_count}, yedek sonuç: "
+              f"{sum(analyzer.fallback_reasons.values())} ({reasons or '-'})")
     
-    # Excel için veriyi temizle
-    df = clean_excel_data(df)
+    if fast_path is not None:
+        deflection = fast_path.stats()
+        precision = deflection['holdout_precision']
+        print(f"⚡ Hızlı yol: {deflection['deflected']}/{deflection['seen']} sohbet yerelde etiketlendi "
+              f"(%{deflection['deflection_rate']} API'ye gitmedi; ayrılan kısımda kesinlik "
+              f"{'-' if precision is None else f'%{precision * 100:.1f}'})")
     
-    # Sütun sırasını düzenle
-    column_order = [
-        'sohbet_id', 'sohbet_baslangic', 'sohbet_bitis', 'toplam_sure',
-        'yanıt_durumu', 'sentiment', 'tür', 'intent', 'intent_detay',
-        'gercek_yanit_durumu', 'gercek_sentiment', 'gercek_tur', 
-        'gercek_intent', 'gercek_intent_detay'
-    ]
+    if dedup is not None:
+        stats = dedup.stats()
+        print(f"🧬 Tekrar eleme: {stats['seen']} sohbet {stats['clusters']} kümede, {stats['shared']} sohbet "
+              f"küme etiketiyle API'ye gitmeden etiketlendi (%{stats['shared_rate']}); denetim: "
+              f"{stats['agreements']}/{stats['audits']} uyumlu, {stats['untrusted']} güvenilmez küme")
+        print(f"🧾 Küme denetimi: {dedup.save_audit(output_path(settings.OUTPUT_DEDUP_AUDIT, output_dir))}")
     
-    # Sadece mevcut sütunları al
-    existing_columns = [col for col in column_order if col in df.columns]
-    df = df[existing_columns]
+    if router is not None:
+        for name, item in router.summary().items():
+            print(f"🧭 {name}: {item['requests']} istek, {item['final']} son karar, "
+                  f"{sum(item['escalated'].values())} üst modele, ort {item['latency_avg_ms']} ms, ${item['cost']:.4f}")
+        save_to_txt(output_path(settings.OUTPUT_ROUTING_REPORT, output_dir), router.generate_report())
     
-    # Excel dosyasını kaydet
-    try:
-        df.to_excel(settings.OUTPUT_EXCEL, index=False, engine='openpyxl')
-        print(f"✅ Excel raporu kaydedildi: {settings.OUTPUT_EXCEL}")
-        
-        # Formatlama ekle
-        add_excel_formatting(df, settings.OUTPUT_EXCEL)
-        
-    except Exception as e:
-        print(f"❌ Excel kaydetme hatası: {e}")
-        # Hata durumunda CSV olarak kaydet
-        csv_path = settings.OUTPUT_EXCEL.replace('.xlsx', '.csv')
-        df.to_csv(csv_path, index=False, encoding='utf-8')
-        print(f"✅ CSV olarak kaydedildi: {csv_path}")
+    compaction = analyzer.compactor.stats()
+    print(f"✂️ Prompt sıkıştırma: {compaction['saved_tokens']} token tasarruf (%{compaction['saved_rate']})")
     
-    # Raporları oluştur ve kaydet
+    if cache is not None:
+        stats = cache.stats()
+        print(f"🗄️ Önbellek: {stats['hits']} isabet, {stats['misses']} ıska (%{stats['hit_rate']} isabet oranı)")
+        cache.close()
+    
+    return pipeline, excel, router
+
+def write_reports(args, aggregates, timing, router=None):
+    """Doğruluk ve diğer metin raporlarını toplanmış sayaçlardan üretir, özeti yazdırır"""
     print("\n📊 Raporlar oluşturuluyor...")
     report_generator = ReportGenerator()
     
     # Doğruluk raporu
-    accuracy_results = report_generator.calculate_accuracy(results, ground_truth)
-    accuracy_report = report_generator.generate_accuracy_report(accuracy_results)
-    save_to_txt("outputs/doğruluk_raporu.txt", accuracy_report)
+    # Tüm raporlar için sayaçlar analiz sırasında sonuçlar geldikçe toplandı
+    if args.incremental:
+        # Yeni sonuçlar önceki çalıştırmaların durumuna eklenir, geçmiş yeniden işlenmez
+        # Aynı sohbetler (ör. aynı günün tekrar çalıştırılması) ikinci kez eklenmez
+        state = ReportAggregates.load(settings.REPORT_STATE_FILE)
+        if state.apply(aggregates):
+            print(f"📚 Rapor durumu: {state.total - aggregates.total} önceki + {aggregates.total} yeni sohbet")
+            state.save(settings.REPORT_STATE_FILE)
+        else:
+            print(f"⏭️ Bu {aggregates.total} sohbet rapor durumuna daha önce eklenmiş, durum değişmedi "
+                  f"({state.total} sohbet)")
+        aggregates = state
+    with metrics.timer('accuracy'):
+        accuracy_results = report_generator.accuracy_from_aggregates(aggregates)
+        accuracy_report = report_generator.generate_accuracy_report(accuracy_results)
+        save_to_txt("outputs/doğruluk_raporu.txt", accuracy_report)
     
     # Diğer raporlar
     output_paths = {
         'swot': settings.OUTPUT_SWOT,
         'recommendations': settings.OUTPUT_RECOMMENDATIONS,
-        'demand_summary': settings.OUTPUT_DEMAND_SUMMARY
+        'demand_summary': settings.OUTPUT_DEMAND_SUMMARY,
+        'timing': settings.OUTPUT_TIMING_REPORT
     }
     
-    reports = report_generator.save_all_reports(results, ground_truth, output_paths)
+    reports = report_generator.save_reports(aggregates, output_paths, accuracy_results, timing=timing)
     
     print("=" * 60)
     print("🎉 ANALİZ TAMAMLANDI")
     print("=" * 60)
-    print(f"📊 Excel raporu: {settings.OUTPUT_EXCEL}")
+    print(f"🗃️ Parquet sonuçları: {settings.OUTPUT_PARQUET_DIR}")
+    if args.excel:
+        print(f"📊 Excel raporu: {settings.OUTPUT_EXCEL}")
     print(f"📈 Doğruluk raporu: outputs/doğruluk_raporu.txt")
     print(f"🔍 SWOT analizi: {settings.OUTPUT_SWOT}")
     print(f"💡 Öneriler: {settings.OUTPUT_RECOMMENDATIONS}")
     print(f"📋 Talep özeti: {settings.OUTPUT_DEMAND_SUMMARY}")
+    print(f"⏱️ Zamanlama özeti: {settings.OUTPUT_TIMING_REPORT}")
+    if router is not None:
+        print(f"🧭 Model yönlendirme: {settings.OUTPUT_ROUTING_REPORT}")
+    if args.metrics_out:
+        print(f"📐 Metrikler: {metrics.export(args.metrics_out)}")
     
     # Doğruluk sonuçlarını ekrana yazdır
     print("\n📊 DOĞRULUK SONUÇLARI:")
-    for field, accuracy in accuracy_results.items():
+    for field, accuracy in accuracy_results['accuracy'].items():
         print(f"   {field}: %{accuracy}")
 
+def run_shards(args):
+    """
+    Paylaşılan shard dizininden shard alıp analiz eder; --shard verilmediyse boşta
+    shard kalmayana kadar sıradakini alır. Her shard'ın sonuçları, rapor sayaçları ve
+    zamanlama metrikleri sahipliğin nesil dizinine yazılır, shard tamamlanınca dizin
+    yayımlanır; sahipliği kaybeden süreç yazmayı bırakır. Raporları --merge üretir.
+    """
+    queue = ShardQueue(args.shard_dir, args.shards, settings.DATA_FILE, run_id=args.run_id)
+    rate_slices = settings.SHARD_PARALLELISM or args.shards
+    print(f"🧩 {args.shards} shard, dizin: {args.shard_dir}, kimlik: {queue.run_id} (süreç {queue.worker}, "
+          f"RPM/TPM bütçesinin 1/{rate_slices}'i)")
+    
+    while True:
+        index = queue.claim(args.shard)
+        if index is None:
+            if args.shard is not None:
+                print(f"⏭️ Shard {args.shard} tamamlanmış ya da başka bir süreçte çalışıyor")
+            break
+        
+        print(f"\n🧩 Shard {index}/{args.shards} analiz ediliyor...")
+        output_dir = queue.staging_dir(index)
+        try:
+            with queue.hold(index):
+                outcome = analyze_chats(args, (index, args.shards), output_dir, rate_slices,
+                                        guard=lambda: queue.check(index))
+                summary = {'sohbet': 0, 'excel_rows': None}
+                if outcome is not None:
+                    pipeline, excel, _ = outcome
+                    if excel is not None:
+                        excel.close()
+                    queue.check(index)
+                    pipeline.aggregates.save(os.path.join(output_dir, SHARD_STATE_FILE))
+                    pipeline.timing.save(os.path.join(output_dir, SHARD_TIMING_FILE))
+                    summary = {'sohbet': pipeline.count, 'excel_rows': None if excel is None else excel.rows}
+            queue.complete(index, summary)
+        except ShardLostError as e:
+            print(f"⚠️ {e}")
+        else:
+            print(f"✅ Shard {index} tamamlandı: {summary['sohbet']} sohbet")
+        if args.shard is not None:
+            break
+    
+    done, running, pending = queue.status()
+    print(f"\n🧩 Shard durumu: {len(done)}/{args.shards} tamamlandı, {len(running)} çalışıyor, {len(pending)} bekliyor")
+    if len(done) == args.shards:
+        print(f"➡️ Birleştirmek için: python -m src.main --merge --shard-dir {args.shard_dir}")
+    if args.metrics_out:
+        print(f"📐 Metrikler: {metrics.export(args.metrics_out)}")
+
+def merge_shards(args):
+    """Tamamlanan shard'ların sonuçlarını ve rapor sayaçlarını tek çalıştırmanın çıktılarında birleştirir"""
+    queue = ShardQueue.open(args.shard_dir)
+    done, running, pending = queue.status()
+    if len(done) < queue.shard_count:
+        missing = ", ".join(str(index) for index in running + pending)
+        print(f"❌ {queue.shard_count - len(done)} shard tamamlanmadı ({missing}), birleştirme yapılmadı")
+        return
+    
+    print(f"🧩 {queue.shard_count} shard birleştiriliyor: {args.shard_dir}")
+    summaries = [queue.summary(index) for index in done]
+    shard_dirs = [queue.published_dir(index) for index in done]
+    total = sum(summary['sohbet'] for summary in summaries)
+    if not total:
+        print("❌ Sohbet verisi bulunamadı!")
+        return
+    
+    aggregates = ReportAggregates()
+    timing = TimingStats()
+    for shard_dir in shard_dirs:
+        aggregates.merge(ReportAggregates.load(os.path.join(shard_dir, SHARD_STATE_FILE)))
+        timing.merge(TimingStats.load(os.path.join(shard_dir, SHARD_TIMING_FILE)))
+    
+    files = merge_parquet([output_path(settings.OUTPUT_PARQUET_DIR, shard_dir) for shard_dir in shard_dirs],
+                          settings.OUTPUT_PARQUET_DIR, replace=args.replace_partitions)
+    print(f"✅ Parquet sonuçları birleştirildi: {settings.OUTPUT_PARQUET_DIR} ({total} sohbet, {files} yeni dosya)")
+    
+    excel_rows = [summary.get('excel_rows') for summary in summaries]
+    if not args.excel:
+        print("⏭️ Excel raporu atlandı")
+    elif None in excel_rows:
+        print("⚠️ Shard'lar Excel sonuçları olmadan çalıştırıldı, Excel raporu atlandı")
+    elif sum(excel_rows) > EXCEL_MAX_ROWS:
+        print(f"⚠️ {sum(excel_rows)} satır Excel sınırını ({EXCEL_MAX_ROWS}) aşıyor, Excel raporu atlandı. "
+              f"Sonuçlar için: {settings.OUTPUT_PARQUET_DIR}")
+    else:
+        # Satırlar shard sırasıyla, shard içinde giriş sırasıyla
+        def chunks():
+            for shard_dir in shard_dirs:
+                yield from ExcelSpool.read_chunks(os.path.join(shard_dir, SHARD_EXCEL_FILE))
+        export_excel(chunks, settings.OUTPUT_EXCEL)
+    
+    write_reports(args, aggregates, timing)
+    print(f"🧩 Shard başına günlük, küme denetimi ve model yönlendirme çıktıları: {args.shard_dir}/shard-*/cikti")
+
+def main(argv=None):
+    args = parse_args(argv)
+    settings.LOG_LEVEL = args.log_level
+    print("🤖 Sohbet Analiz Sistemi Başlatılıyor...")
+    print("=" * 60)
+    
+    if args.merge:
+        merge_shards(args)
+        return
+    if args.shards:
+        run_shards(args)
+        return
+    
+    outcome = analyze_chats(args)
+    if outcome is None:
+        return
+    pipeline, excel, router = outcome
+    if not pipeline.count:
+        print("❌ Sohbet verisi bulunamadı!")
+        if excel is not None:
+            excel.close()
+        return
+    
+    if not args.excel:
+        print("⏭️ Excel raporu atlandı")
+    elif excel.overflowed:
+        print(f"⚠️ {excel.rows} satır Excel sınırını ({EXCEL_MAX_ROWS}) aşıyor, Excel raporu atlandı. "
+              f"Sonuçlar için: {settings.OUTPUT_PARQUET_DIR}")
+    else:
+        export_excel(excel.chunks, settings.OUTPUT_EXCEL)
+    if excel is not None:
+        excel.close()
+    
+    # Raporları oluştur ve kaydet
+    write_reports(args, pipeline.aggregates, pipeline.timing, router)
+
 if __name__ == "__main__":
     main()
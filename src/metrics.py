@@ -0,0 +1,191 @@
+import json
+import math
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from utils.helpers import write_text_atomic
+
+METRIC_PREFIX = "sohbet_analiz"
+
+# Histogram üst sınırları (Prometheus "le" kovaları, +Inf otomatik eklenir)
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+PROMPT_TOKEN_BUCKETS = (100, 250, 500, 1000, 2000, 4000, 8000, 16000, 32000)
+COMPLETION_TOKEN_BUCKETS = (25, 50, 100, 200, 400, 800, 1600)
+
+HISTOGRAM_BUCKETS = {
+    'api_latency_seconds': LATENCY_BUCKETS,
+    'prompt_tokens': PROMPT_TOKEN_BUCKETS,
+    'completion_tokens': COMPLETION_TOKEN_BUCKETS
+}
+
+
+class Histogram:
+    """Sabit kovalı histogram; yüzdelikler kovalar içinde doğrusal ara değerle tahmin edilir"""
+
+    def __init__(self, buckets):
+        self.buckets = tuple(buckets) + (math.inf,)
+        self.counts = [0] * len(self.buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        for i, upper in enumerate(self.buckets):
+            if value <= upper:
+                self.counts[i] += 1
+                break
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q):
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        lower = 0.0
+        for upper, count in zip(self.buckets, self.counts):
+            if seen + count >= rank and count:
+                if math.isinf(upper):
+                    return lower
+                return lower + (upper - lower) * (rank - seen) / count
+            seen += count
+            lower = upper
+        return lower
+
+    def summary(self):
+        return {
+            'count': self.count,
+            'sum': round(self.sum, 3),
+            'avg': round(self.sum / self.count, 3) if self.count else None,
+            'p50': _rounded(self.quantile(0.5)),
+            'p95': _rounded(self.quantile(0.95)),
+            'p99': _rounded(self.quantile(0.99))
+        }
+
+
+def _rounded(value):
+    return None if value is None else round(value, 3)
+
+
+class StageTimer:
+    """Bir aşamanın toplam süresi ve çağrı sayısı"""
+
+    def __init__(self):
+        self.calls = 0
+        self.seconds = 0.0
+
+    def add(self, seconds, calls=1):
+        self.calls += calls
+        self.seconds += seconds
+
+
+class Metrics:
+    """
+    Hat boyunca aşama süreleri (yükleme, çıkarım, prompt, API, ayrıştırma,
+    rapor toplama, sonuç yazma, Excel, raporlar), API gecikmesi / token histogramları ve yeniden deneme /
+    yedek sonuç sayaçlarını toplar. İş parçacıkları arasında güvenlidir;
+    Prometheus metin formatında veya JSON özeti olarak dışa aktarılır.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.stages = defaultdict(StageTimer)
+            self.histograms = {name: Histogram(buckets) for name, buckets in HISTOGRAM_BUCKETS.items()}
+            self.counters = defaultdict(int)
+
+    @contextmanager
+    def timer(self, stage, histogram=None):
+        """
+        with metrics.timer('excel'): ... bloğunun süresini aşamaya ekler;
+        histogram verilirse süre o histograma da işlenir
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.record_time(stage, elapsed)
+            if histogram is not None:
+                self.observe(histogram, elapsed)
+
+    def record_time(self, stage, seconds, calls=1):
+        with self._lock:
+            self.stages[stage].add(seconds, calls)
+
+    def observe(self, name, value):
+        with self._lock:
+            self.histograms[name].observe(value)
+
+    def increment(self, name, amount=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self.counters[key] += amount
+
+    def to_dict(self):
+        """JSON özeti"""
+        with self._lock:
+            counters = defaultdict(dict)
+            for (name, labels), value in sorted(self.counters.items()):
+                label = ",".join(f"{k}={v}" for k, v in labels) or "toplam"
+                counters[name][label] = value
+            return {
+                'stages': {
+                    stage: {
+                        'calls': timer.calls,
+                        'seconds': round(timer.seconds, 3),
+                        'avg_ms': round(timer.seconds / timer.calls * 1000, 3) if timer.calls else None
+                    }
+                    for stage, timer in self.stages.items()
+                },
+                'histograms': {name: histogram.summary() for name, histogram in self.histograms.items()},
+                'counters': dict(counters)
+            }
+
+    def to_prometheus(self):
+        """Prometheus metin formatı (node_exporter textfile toplayıcısı için)"""
+        lines = []
+        with self._lock:
+            lines.append(f"# TYPE {METRIC_PREFIX}_stage_seconds_total counter")
+            for stage, timer in self.stages.items():
+                lines.append(f'{METRIC_PREFIX}_stage_seconds_total{{stage="{stage}"}} {timer.seconds:.6f}')
+            lines.append(f"# TYPE {METRIC_PREFIX}_stage_calls_total counter")
+            for stage, timer in self.stages.items():
+                lines.append(f'{METRIC_PREFIX}_stage_calls_total{{stage="{stage}"}} {timer.calls}')
+
+            for name, histogram in self.histograms.items():
+                metric = f"{METRIC_PREFIX}_{name}"
+                lines.append(f"# TYPE {metric} histogram")
+                cumulative = 0
+                for upper, count in zip(histogram.buckets, histogram.counts):
+                    cumulative += count
+                    le = "+Inf" if math.isinf(upper) else f"{upper:g}"
+                    lines.append(f'{metric}_bucket{{le="{le}"}} {cumulative}')
+                lines.append(f"{metric}_sum {histogram.sum:.6f}")
+                lines.append(f"{metric}_count {histogram.count}")
+
+            declared = set()
+            for (name, labels), value in sorted(self.counters.items()):
+                metric = f"{METRIC_PREFIX}_{name}_total"
+                if metric not in declared:
+                    lines.append(f"# TYPE {metric} counter")
+                    declared.add(metric)
+                label_text = ",".join(f'{k}="{v}"' for k, v in labels)
+                lines.append(f"{metric}{{{label_text}}} {value}" if label_text else f"{metric} {value}")
+        return "\n".join(lines) + "\n"
+
+    def export(self, path):
+        """Uzantı .prom ise Prometheus metni, aksi halde JSON özeti yazar"""
+        if path.endswith('.prom'):
+            content = self.to_prometheus()
+        else:
+            content = json.dumps(self.to_dict(), ensure_ascii=False, indent=2)
+        write_text_atomic(path, content)
+        return path
+
+
+# Süreç genelinde tek metrik kaydı
+metrics = Metrics()
@@ -0,0 +1,211 @@
+from collections import Counter
+from pydantic import Field
+from config.settings import settings
+from src.chat_analyzer import ChatAnalysis
+from src.fast_classifier import LABEL_FIELDS
+from src.metrics import Histogram, LATENCY_BUCKETS, metrics
+
+
+class RoutedChatAnalysis(ChatAnalysis):
+    """Kademeli yönlendirmede modelden etiketlerle birlikte güven de istenir"""
+
+    guven: float = Field(
+        description="Etiketlerin doğru olduğuna dair güven (0-1)",
+        ge=0,
+        le=1
+    )
+
+
+class ModelTier:
+    """Kademedeki bir model: istek parametreleri ve 1M token başına fiyatlar ($)"""
+
+    def __init__(self, name, reasoning_effort=None, max_completion_tokens=None,
+                 input_cost=0.0, cached_input_cost=None, output_cost=0.0):
+        self.name = name
+        self.reasoning_effort = reasoning_effort
+        self.max_completion_tokens = max_completion_tokens or settings.MAX_COMPLETION_TOKENS
+        self.input_cost = input_cost
+        self.cached_input_cost = cached_input_cost if cached_input_cost is not None else input_cost
+        self.output_cost = output_cost
+
+    def request_params(self):
+        params = {"model": self.name, "max_completion_tokens": self.max_completion_tokens}
+        # Akıl yürütmeyen modeller reasoning_effort kabul etmez
+        if self.reasoning_effort:
+            params["reasoning_effort"] = self.reasoning_effort
+        return params
+
+    def cost(self, prompt_tokens, cached_tokens, completion_tokens):
+        return ((prompt_tokens - cached_tokens) * self.input_cost + cached_tokens * self.cached_input_cost
+                + completion_tokens * self.output_cost) / 1_000_000
+
+
+class TierStats:
+    """Bir modelin istek, gecikme, token, maliyet, yükseltme ve doğruluk sayaçları"""
+
+    def __init__(self):
+        self.requests = 0
+        self.invalid = 0
+        self.errors = 0
+        self.final = 0
+        self.escalated = Counter()
+        self.latency = Histogram(LATENCY_BUCKETS)
+        self.prompt_tokens = 0
+        self.cached_tokens = 0
+        self.completion_tokens = 0
+        self.cost = 0.0
+        self.correct = Counter()
+        self.judged = Counter()
+
+
+def _usage_field(usage, name):
+    return getattr(usage, name, None) or 0
+
+
+class ModelRouter:
+    """
+    Sohbetleri ucuzdan pahalıya sıralı model kademesinde analiz eder. Her sohbet
+    ilk (en ucuz, en hızlı) modelle başlar; yapılandırılmış çıktı doğrulanamazsa
+    ya da model güveni eşiğin altındaysa bir üst modele çıkılır. Uzun sohbetler
+    doğrudan ikinci kademeden başlar, ilk kademede negatif bulunan sohbetler bir
+    üst modelle yeniden analiz edilir. Model başına gecikme, maliyet ve (hazır
+    etiketler varsa) doğruluk raporlanır.
+    """
+
+    def __init__(self, tiers=None, confidence_threshold=None, long_chat_tokens=None, escalate_negative=None):
+        self.tiers = [ModelTier(**config) for config in (tiers or settings.MODEL_CASCADE)]
+        if not self.tiers:
+            raise ValueError("MODEL_CASCADE en az bir model içermeli")
+        self.confidence_threshold = (confidence_threshold if confidence_threshold is not None
+                                     else settings.ROUTING_CONFIDENCE_THRESHOLD)
+        self.long_chat_tokens = long_chat_tokens or settings.ROUTING_LONG_CHAT_TOKENS
+        self.escalate_negative = (escalate_negative if escalate_negative is not None
+                                  else settings.ROUTING_ESCALATE_NEGATIVE)
+        self.response_format = RoutedChatAnalysis
+        self.stats = {tier.name: TierStats() for tier in self.tiers}
+
+    @property
+    def key(self):
+        """Önbellek anahtarında tek model adı yerine kullanılan kademe kimliği"""
+        return ">".join(tier.name for tier in self.tiers)
+
+    def _escalate(self, tier_index, reason, escalations):
+        self.stats[self.tiers[tier_index].name].escalated[reason] += 1
+        metrics.increment('escalations', model=self.tiers[tier_index].name, reason=reason)
+        escalations.append(reason)
+        return tier_index + 1
+
+    def start(self, compaction=None):
+        """(başlangıç kademesi, yükseltme nedenleri) döner"""
+        escalations = []
+        chat_tokens = (compaction or {}).get('orijinal_token') or 0
+        if len(self.tiers) > 1 and chat_tokens > self.long_chat_tokens:
+            return self._escalate(0, "uzun_sohbet", escalations), escalations
+        return 0, escalations
+
+    def observe(self, tier_index, seconds, completion, analysis, chat_data=None):
+        """Bir kademe denemesinin gecikmesini, token/maliyetini ve doğruluğunu kaydeder"""
+        tier = self.tiers[tier_index]
+        stats = self.stats[tier.name]
+        stats.requests += 1
+        stats.latency.observe(seconds)
+        usage = getattr(completion, 'usage', None)
+        if usage is not None:
+            prompt_tokens = _usage_field(usage, 'prompt_tokens')
+            cached_tokens = _usage_field(getattr(usage, 'prompt_tokens_details', None), 'cached_tokens')
+            completion_tokens = _usage_field(usage, 'completion_tokens')
+            stats.prompt_tokens += prompt_tokens
+            stats.cached_tokens += cached_tokens
+            stats.completion_tokens += completion_tokens
+            stats.cost += tier.cost(prompt_tokens, cached_tokens, completion_tokens)
+
+        if analysis is None:
+            stats.invalid += 1
+            return
+        for field, truth_field in LABEL_FIELDS.items():
+            truth = (chat_data or {}).get(truth_field)
+            if truth:
+                stats.judged[field] += 1
+                stats.correct[field] += analysis.get(field) == truth
+
+    def record_error(self, tier_index):
+        self.stats[self.tiers[tier_index].name].errors += 1
+
+    def next_tier(self, tier_index, analysis, escalations):
+        """Üst kademeye çıkılacaksa yeni kademe indeksini, aksi halde None döner"""
+        if tier_index + 1 >= len(self.tiers):
+            return None
+        if analysis is None:
+            return self._escalate(tier_index, "gecersiz_yanit", escalations)
+        if analysis.get('guven', 1.0) < self.confidence_threshold:
+            return self._escalate(tier_index, "dusuk_guven", escalations)
+        # Negatif sohbetler yalnızca ilk kademeden bir üste taşınır
+        if tier_index == 0 and self.escalate_negative and analysis.get('sentiment') == "Negatif":
+            return self._escalate(tier_index, "negatif", escalations)
+        return None
+
+    def finalize(self, tier_index, analysis, escalations):
+        """Son kademenin sonucuna model, güven ve yükseltme kolonlarını ekler"""
+        tier = self.tiers[tier_index]
+        self.stats[tier.name].final += 1
+        result = dict(analysis)
+        result['model_guven'] = round(result.pop('guven', 1.0), 3)
+        result['model'] = tier.name
+        result['yukseltme'] = ">".join(escalations) or None
+        return result
+
+    def summary(self):
+        """Model başına özet"""
+        summary = {}
+        for tier in self.tiers:
+            stats = self.stats[tier.name]
+            latency = stats.latency.summary()
+            summary[tier.name] = {
+                'requests': stats.requests,
+                'final': stats.final,
+                'invalid': stats.invalid,
+                'errors': stats.errors,
+                'escalated': dict(stats.escalated),
+                'latency_avg_ms': None if latency['avg'] is None else round(latency['avg'] * 1000, 1),
+                'latency_p95_ms': None if latency['p95'] is None else round(latency['p95'] * 1000, 1),
+                'prompt_tokens': stats.prompt_tokens,
+                'cached_tokens': stats.cached_tokens,
+                'completion_tokens': stats.completion_tokens,
+                'cost': round(stats.cost, 6),
+                'accuracy': {
+                    field: round(stats.correct[field] / stats.judged[field] * 100, 1)
+                    for field in LABEL_FIELDS if stats.judged[field]
+                }
+            }
+        return summary
+
+    def generate_report(self):
+        """Model başına gecikme, maliyet, yükseltme ve doğruluk raporu"""
+        summary = self.summary()
+        total_cost = sum(item['cost'] for item in summary.values())
+        total_final = sum(item['final'] for item in summary.values())
+
+        report = "MODEL YÖNLENDİRME RAPORU\n"
+        report += "=" * 60 + "\n\n"
+        report += f"Kademe: {' → '.join(tier.name for tier in self.tiers)}\n"
+        report += (f"Güven eşiği: {self.confidence_threshold}, uzun sohbet: >{self.long_chat_tokens} token, "
+                   f"negatif yükseltme: {'açık' if self.escalate_negative else 'kapalı'}\n")
+        report += f"Toplam maliyet: ${total_cost:.4f} ({total_final} sohbet"
+        report += f", sohbet başına ${total_cost / total_final:.6f})\n\n" if total_final else ")\n\n"
+
+        for name, item in summary.items():
+            report += f"🤖 {name}\n"
+            report += "-" * 45 + "\n"
+            report += (f"   İstek: {item['requests']} (geçersiz çıktı: {item['invalid']}, hata: {item['errors']}), "
+                       f"son karar verdiği sohbet: {item['final']}\n")
+            report += f"   Gecikme: ort {item['latency_avg_ms']} ms, p95 {item['latency_p95_ms']} ms\n"
+            report += (f"   Token: {item['prompt_tokens']} prompt ({item['cached_tokens']} önbellekten), "
+                       f"{item['completion_tokens']} çıktı - maliyet ${item['cost']:.4f}\n")
+            if item['escalated']:
+                reasons = ", ".join(f"{reason}: {count}" for reason, count in Counter(item['escalated']).most_common())
+                report += f"   Üst modele yükseltilen: {sum(item['escalated'].values())} ({reasons})\n"
+            if item['accuracy']:
+                accuracy = ", ".join(f"{field} %{value}" for field, value in item['accuracy'].items())
+                report += f"   Doğruluk (yanıtladığı sohbetlerde): {accuracy}\n"
+            report += "\n"
+        return report
@@ -0,0 +1,211 @@
+import asyncio
+from collections import deque
+from pydantic import BaseModel, Field
+from config.settings import settings
+from src.chat_analyzer import ChatAnalysis, MAX_COMPLETION_TOKENS
+from src.prompt_compactor import PROMPT_HEADER
+from src.preprocessing import PREPARED_KEY
+from utils.helpers import aiter_items, log
+
+
+class PackedChatResult(ChatAnalysis):
+    """Paketlenmiş istekteki tek bir sohbetin sonucu"""
+
+    sohbet_id: str = Field(
+        description="Sonucun ait olduğu sohbetin ID'si"
+    )
+
+
+class PackedChatAnalysis(BaseModel):
+    """Birden fazla sohbetin tek istekte analiz sonucu"""
+
+    sonuclar: list[PackedChatResult] = Field(
+        description="Her sohbet için bir sonuç"
+    )
+
+
+class PackedAnalyzer:
+    """
+    Birden fazla sohbeti tek API çağrısında analiz eder; böylece büyük system
+    prompt her sohbet için ayrı ayrı gönderilmez. Sohbetler token bütçesine göre
+    paketlenir, eksik ya da bozuk paket yanıtlarında tek tek analize dönülür.
+    """
+
+    def __init__(self, analyzer, token_budget=None, max_chats=None):
+        self.analyzer = analyzer
+        self.token_budget = token_budget or settings.PACK_TOKEN_BUDGET
+        self.max_chats = max_chats or settings.PACK_MAX_CHATS
+        self.request_count = 0
+        self.packed_count = 0
+        self.fallback_count = 0
+
+    def _build_pack_prompt(self, pack):
+        """Paketteki sohbetleri ID başlıklarıyla tek bir kullanıcı mesajında birleştirir"""
+        sections = [
+            f"### Sohbet ID: {item['chat_info']['sohbet_id']}\n{item['prompt'][len(PROMPT_HEADER):]}"
+            for item in pack
+        ]
+        return (
+            f"Aşağıdaki {len(pack)} sohbeti birbirinden bağımsız olarak analiz edin. "
+            "Her sohbet için sohbet_id alanıyla birlikte ayrı bir sonuç döndürün.\n\n"
+            + "\n".join(sections)
+        )
+
+    async def _analyze_pack(self, pack, journal):
+        """Paketi tek istekte analiz eder, eksik kalan sohbetleri tek tek analiz eder"""
+        analyses = {}
+        prompt = self._build_pack_prompt(pack)
+
+        try:
+            estimate = self.analyzer._estimate_tokens(prompt) + MAX_COMPLETION_TOKENS * (len(pack) - 1)
+            params = self.analyzer._request_params(prompt)
+            params["response_format"] = PackedChatAnalysis
+            params["max_completion_tokens"] = MAX_COMPLETION_TOKENS * len(pack)
+            completion = await self.analyzer._call_with_retry_async(
+                lambda: self.analyzer.async_client.chat.completions.parse(**params), estimate
+            )
+            self.request_count += 1
+            self.analyzer.usage.record(completion.usage)
+            parsed = completion.choices[0].message.parsed
+            if parsed is not None:
+                analyses = {
+                    str(result.sohbet_id): result.model_dump(exclude={"sohbet_id"})
+                    for result in parsed.sonuclar
+                }
+        except Exception as e:
+            log(f"❌ Paket API hatası ({len(pack)} sohbet): {str(e)[:200]}", 'WARNING')
+
+        missing = [item for item in pack if str(item["chat_info"]["sohbet_id"]) not in analyses]
+        if missing:
+            log(f"↩️ Paketteki {len(missing)}/{len(pack)} sohbet tek tek analiz ediliyor")
+            self.fallback_count += len(missing)
+            fallbacks = await asyncio.gather(
+                *(self.analyzer._get_api_response_async(item["prompt"]) for item in missing),
+                return_exceptions=True
+            )
+            for item, response in zip(missing, fallbacks):
+                if isinstance(response, Exception):
+                    response = self.analyzer._fallback(response)
+                analyses[str(item["chat_info"]["sohbet_id"])] = response
+                self.request_count += 1
+
+        for item in pack:
+            try:
+                analysis_result = analyses[str(item["chat_info"]["sohbet_id"])]
+                await self.analyzer._cache_store_async(item["cache_key"], analysis_result)
+                analysis_result = self.analyzer._dedup_record(
+                    item["cluster"], item["similarity"],
+                    {**self.analyzer._parse_response(analysis_result), **item["compaction"]}
+                )
+                result = self.analyzer._combine_result(item["chat_info"], analysis_result)
+                await self.analyzer._record_result_async(journal, result, analysis_result)
+            except Exception as e:
+                result = self.analyzer._combine_result(item["chat_info"], self.analyzer._fallback(e))
+            finally:
+                self.analyzer._dedup_release(item["cluster"], item["similarity"])
+            item["future"].set_result(result)
+
+    async def _analyze_member(self, chat_info, cluster, similarity, future, journal):
+        """Temsilcisi henüz analiz edilen küme üyesini, temsilcinin sonucunu bekleyerek analiz eder"""
+        try:
+            analysis_result = await self.analyzer._analyze_matched_async(
+                chat_info['raw_chat'], chat_info.get(PREPARED_KEY), cluster, similarity
+            )
+            result = self.analyzer._combine_result(chat_info, analysis_result)
+            await self.analyzer._record_result_async(journal, result, analysis_result)
+        except Exception as e:
+            result = self.analyzer._combine_result(chat_info, self.analyzer._fallback(e))
+        future.set_result(result)
+
+    async def aiter_analyze_chats(self, chats, journal=None):
+        """
+        Sohbetleri paketler halinde eşzamanlı analiz eder, sonuçları giriş sırasıyla döner
+        """
+        loop = asyncio.get_running_loop()
+        self.analyzer._start_async_run()
+        window = deque()
+        window_size = self.analyzer.max_concurrency * self.max_chats * 2
+        tasks = set()
+        pack = []
+        pack_tokens = 0
+        total = 0
+
+        def flush():
+            nonlocal pack, pack_tokens
+            if pack:
+                self.packed_count += len(pack)
+                task = asyncio.ensure_future(self._analyze_pack(pack, journal))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+                pack, pack_tokens = [], 0
+
+        async for chat_info in aiter_items(chats):
+            total += 1
+            future = loop.create_future()
+            window.append(future)
+
+            completed = journal.get(chat_info['sohbet_id']) if journal is not None else None
+            local = None
+            if completed is None:
+                local = self.analyzer._fast_path_result(chat_info['raw_chat'])
+            
+            if completed is not None:
+                future.set_result(completed)
+            elif local is not None:
+                result = self.analyzer._combine_result(chat_info, local)
+                await self.analyzer._record_result_async(journal, result, local)
+                future.set_result(result)
+            else:
+                prepared = chat_info.get(PREPARED_KEY)
+                cluster, similarity = self.analyzer._dedup_match(chat_info['raw_chat'], prepared)
+                shared = self.analyzer._dedup_shared(chat_info['raw_chat'], cluster, similarity)
+                if shared is not None:
+                    result = self.analyzer._combine_result(chat_info, shared)
+                    await self.analyzer._record_result_async(journal, result, shared)
+                    future.set_result(result)
+                elif similarity is not None and cluster.pending is not None:
+                    # Temsilci henüz analiz edilen bir pakette
+                    task = asyncio.ensure_future(self._analyze_member(chat_info, cluster, similarity, future, journal))
+                    tasks.add(task)
+                    task.add_done_callback(tasks.discard)
+                else:
+                    prompt, compaction = self.analyzer._build_prompt(chat_info['raw_chat'], prepared)
+                    cache_key, cached = await self.analyzer._cache_lookup_async(
+                        prompt, prepared and prepared['cache_key']
+                    )
+                    if cached is not None:
+                        analysis_result = self.analyzer._dedup_record(cluster, similarity, {**cached, **compaction})
+                        result = self.analyzer._combine_result(chat_info, analysis_result)
+                        await self.analyzer._record_result_async(journal, result, analysis_result)
+                        future.set_result(result)
+                    else:
+                        if pack and (len(pack) >= self.max_chats
+                                     or pack_tokens + compaction['prompt_token'] > self.token_budget):
+                            flush()
+                        self.analyzer._dedup_begin_async(cluster, similarity)
+                        pack.append({
+                            "chat_info": chat_info, "prompt": prompt, "compaction": compaction,
+                            "cache_key": cache_key, "future": future,
+                            "cluster": cluster, "similarity": similarity
+                        })
+                        pack_tokens += compaction['prompt_token']
+
+            if len(window) >= window_size:
+                flush()
+                yield await window.popleft()
+
+        flush()
+        while window:
+            yield await window.popleft()
+
+        print(f"📦 Paketli analiz tamamlandı: {total} sohbet, {self.request_count} API isteği "
+              f"({self.packed_count} paketlenen, {self.fallback_count} tek tek)")
+
+    async def analyze_all_chats_async(self, chats, journal=None):
+        return [result async for result in self.aiter_analyze_chats(chats, journal)]
+
+    def analyze_all_chats(self, chats, journal=None):
+        """
+        Tüm sohbetleri paketli modda analiz eder - sonuçlar giriş sırasıyla döner
+        """
+        return asyncio.run(self.analyze_all_chats_async(chats, journal))
@@ -0,0 +1,272 @@
+import asyncio
+import pickle
+import queue
+import tempfile
+import threading
+from itertools import islice
+from config.settings import settings
+from src.batch_analyzer import BatchAnalyzer
+from src.data_processor import DataProcessor
+from src.metrics import metrics
+from src.packed_analyzer import PackedAnalyzer
+from src.report_aggregator import ReportAggregates
+from src.timing_metrics import TimingStats, add_timing_metrics, has_timing_metrics
+
+_DONE = object()
+
+# Zaman metrikleri yükleyicide bu boyuttaki parçalarla toplu hesaplanır
+TIMING_CHUNK_SIZE = 500
+
+# Excel dışa aktarımında biriktirme dosyası bu boyuttaki parçalarla okunur
+EXCEL_CHUNK_ROWS = 10_000
+
+
+def _put(output, item, stop):
+    """Kuyruk doluysa bekler; hat durdurulduysa False döner"""
+    while not stop.is_set():
+        try:
+            output.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def _get(source, stop):
+    """Kuyruktan bir öğe alır; kuyruk boşken hat durdurulduysa _DONE döner"""
+    while True:
+        try:
+            return source.get(timeout=0.1)
+        except queue.Empty:
+            if stop.is_set():
+                return _DONE
+
+
+def _drain(source, stop):
+    """Kuyruktaki öğeleri bitiş işaretine (ya da hat durdurulana) kadar döner; üretici hatasını yükseltir"""
+    while True:
+        item = _get(source, stop)
+        if item is _DONE:
+            return
+        if isinstance(item, BaseException):
+            raise item
+        yield item
+
+
+async def _adrain(source, stop):
+    """
+    _drain'in event loop'u bloklamayan sürümü: hazır öğe hemen alınır, kuyruk
+    boşsa bekleme iş parçacığında yapılır (süren istekler beklemez)
+    """
+    while True:
+        try:
+            item = source.get_nowait()
+        except queue.Empty:
+            item = await asyncio.to_thread(_get, source, stop)
+        if item is _DONE:
+            return
+        if isinstance(item, BaseException):
+            raise item
+        yield item
+
+
+async def _aput(output, item, stop):
+    """_put'un event loop'u bloklamayan sürümü: kuyruk doluysa bekleme iş parçacığında yapılır"""
+    if stop.is_set():
+        return False
+    try:
+        output.put_nowait(item)
+        return True
+    except queue.Full:
+        return await asyncio.to_thread(_put, output, item, stop)
+
+
+class ExcelSpool:
+    """
+    Excel dışa aktarımı için sonuçları giriş sırasıyla geçici dosyaya (ya da
+    shard çıktısı olarak verilen dosyaya) biriktirir; bellekte tutulmaz ve
+    dışa aktarımda da parça parça okunur. Satır sınırı aşılırsa biriktirme bırakılır.
+    """
+
+    def __init__(self, max_rows, path=None):
+        self.max_rows = max_rows
+        self.rows = 0
+        self._file = open(path, 'w+b') if path else tempfile.TemporaryFile()
+
+    def add(self, result):
+        self.rows += 1
+        if self.rows <= self.max_rows:
+            pickle.dump(result, self._file, protocol=pickle.HIGHEST_PROTOCOL)
+
+    @property
+    def overflowed(self):
+        return self.rows > self.max_rows
+
+    def chunks(self, size=None):
+        """Biriken sonuçları giriş sırasıyla parça parça okur; tekrar çağrılabilir"""
+        self._file.flush()
+        self._file.seek(0)
+        return _iter_chunks(self._file, size or EXCEL_CHUNK_ROWS)
+
+    def close(self):
+        self._file.close()
+
+    @staticmethod
+    def read_chunks(path, size=None):
+        """Shard'ın kalıcı dosyasındaki sonuçları sırasıyla parça parça okur"""
+        with open(path, 'rb') as f:
+            yield from _iter_chunks(f, size or EXCEL_CHUNK_ROWS)
+
+
+def _iter_chunks(file, size):
+    chunk = []
+    while True:
+        try:
+            chunk.append(pickle.load(file))
+        except EOFError:
+            break
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+class AnalysisPipeline:
+    """
+    Yükleyici → zaman metrikleri → analizör → sonuç yazıcı ve rapor toplayıcı
+    aşamalarını sınırlı kuyruklarla birbirine bağlar. Yükleme ve yazma ayrı iş
+    parçacıklarında analizle örtüşür; hiçbir aşama sohbet başına durum tutmaz.
+    Rapor sayaçları (ReportAggregates) ve zamanlama özeti (TimingStats) sonuçlar
+    geldikçe güncellenir; ground truth sonuçtaki gercek_* alanlarından okunur.
+    """
+
+    def __init__(self, analyzer, mode=None, journal=None, writer=None, excel=None, queue_size=None, batch_dir=None,
+                 guard=None):
+        self.analyzer = analyzer
+        self.mode = mode or settings.ANALYSIS_MODE
+        self.journal = journal
+        self.writer = writer  # Opsiyonel ResultWriter
+        self.excel = excel  # Opsiyonel ExcelSpool
+        self.queue_size = queue_size or settings.PIPELINE_QUEUE_SIZE
+        self.batch_dir = batch_dir  # Batch modda istek/yanıt dosyalarının dizini (shard başına ayrı)
+        self.guard = guard  # Yazımlardan önce çağrılır; hata yükseltirse hat durur (ör. shard sahipliği kaybı)
+        self.aggregates = ReportAggregates()
+        self.timing = TimingStats()
+        self.count = 0
+        self._sink_error = None
+
+    def _load(self, chats, output, stop):
+        """Sohbetleri parça parça zaman metrikleriyle zenginleştirip kuyruğa koyar (sonuçlara taşınır)"""
+        try:
+            iterator = iter(chats)
+            while True:
+                chunk = list(islice(iterator, TIMING_CHUNK_SIZE))
+                if not chunk:
+                    break
+                # Ön işleme süreçleri metrikleri zaten hesapladıysa yeniden parse edilmez
+                missing = [chat_info for chat_info in chunk if not has_timing_metrics(chat_info)]
+                if missing:
+                    with metrics.timer('timing_metrics'):
+                        add_timing_metrics(missing)
+                for chat_info in chunk:
+                    if not _put(output, chat_info, stop):
+                        return
+            _put(output, _DONE, stop)
+        except BaseException as e:
+            _put(output, e, stop)
+
+    def _sink(self, source, stop):
+        """Sonuçları rapor sayaçlarına ve yazıcılara aktarır"""
+        try:
+            while True:
+                try:
+                    result = source.get(timeout=0.1)
+                except queue.Empty:
+                    if stop.is_set():
+                        return
+                    continue
+                if result is _DONE:
+                    break
+                with metrics.timer('aggregate'):
+                    self.aggregates.add(result, DataProcessor.ground_truth_from_result(result))
+                    self.timing.add(result)
+                # Parquet tamponu/yazımı ve Excel biriktirme ('parquet' yazım süresi ayrıca ölçülür)
+                with metrics.timer('write'):
+                    if self.guard is not None:
+                        self.guard()
+                    if self.writer is not None:
+                        self.writer.add(result)
+                    if self.excel is not None:
+                        self.excel.add(result)
+                self.count += 1
+        except BaseException as e:
+            self._sink_error = e
+            stop.set()
+
+    def _analyze(self, source, output, stop):
+        """Seçilen modda analiz eder, her sonucu sonraki aşamanın kuyruğuna iletir"""
+        if self.mode in ("async", "packed"):
+            # Kuyruk beklemeleri event loop'u bloklamaz
+            chats = _adrain(source, stop)
+            if self.mode == "packed":
+                results = PackedAnalyzer(self.analyzer).aiter_analyze_chats(chats, self.journal)
+            else:
+                results = self.analyzer.aiter_analyze_chats(chats, self.journal)
+
+            async def forward():
+                try:
+                    async for result in results:
+                        if not await _aput(output, result, stop):
+                            break
+                except BaseException:
+                    # Kuyrukta bekleyen iş parçacıkları da çıksın (asyncio.run onları bekler)
+                    stop.set()
+                    raise
+
+            asyncio.run(forward())
+            return
+
+        chats = _drain(source, stop)
+        if self.mode == "batch":
+            results = BatchAnalyzer(self.analyzer, work_dir=self.batch_dir).iter_analyze_chats(chats, self.journal)
+        else:
+            results = self.analyzer.iter_analyze_chats(chats, self.journal)
+        for result in results:
+            if not _put(output, result, stop):
+                break
+
+    def run(self, chats):
+        """
+        Hattı çalıştırır; sonuç sayısını döner. Aşama hataları çağırana iletilir.
+        Yazıcı her durumda kapatılır (yazılan sonuçlar --resume ile korunur);
+        hata durumunda Excel biriktirme dosyası da kapatılır.
+        """
+        chat_queue = queue.Queue(maxsize=self.queue_size)
+        result_queue = queue.Queue(maxsize=self.queue_size)
+        stop = threading.Event()
+        loader = threading.Thread(target=self._load, args=(chats, chat_queue, stop), daemon=True)
+        sink = threading.Thread(target=self._sink, args=(result_queue, stop), daemon=True)
+        loader.start()
+        sink.start()
+
+        completed = False
+        try:
+            with metrics.timer('analyze'):
+                self._analyze(chat_queue, result_queue, stop)
+            _put(result_queue, _DONE, stop)
+            sink.join()
+            completed = self._sink_error is None
+        finally:
+            stop.set()
+            sink.join()
+            try:
+                if self.writer is not None:
+                    self.writer.close()
+            finally:
+                if not completed and self.excel is not None:
+                    self.excel.close()
+
+        if self._sink_error is not None:
+            raise self._sink_error
+        return self.count
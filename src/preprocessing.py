@@ -0,0 +1,155 @@
+import os
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from config.settings import settings
+from src.data_processor import DataProcessor
+from src.prompt_compactor import PromptCompactor, TokenCounter
+from src.result_cache import ResultCache
+from src.deduplicator import MinHasher
+from src.metrics import metrics
+from src.timing_metrics import add_timing_metrics
+
+# Ön işlenmiş alanların chat_info içindeki anahtarı (sonuçlara taşınmaz)
+PREPARED_KEY = 'on_isleme'
+
+_DONE = object()
+
+# Her işçi süreçte bir kez kurulan nesneler
+_worker = {}
+
+
+def _init_worker(token_budget, encoding_name, cache_context, dedup_context=None):
+    _worker['extractor'] = DataProcessor(None, streaming=True)
+    _worker['compactor'] = PromptCompactor(token_budget, TokenCounter(encoding_name))
+    _worker['cache_context'] = cache_context
+    _worker['hasher'] = MinHasher(*dedup_context) if dedup_context else None
+
+
+def _prepare_chunk(chunk):
+    """
+    Bir parça ham sohbet için temel bilgileri (zaman, süre), token bütçesine
+    sığdırılmış promptu, önbellek anahtarını, (--dedup) MinHash imzasını ve zaman
+    metriklerini (parça başına tek toplu parse ile) üretir. Ham sohbet geri
+    gönderilmez; ana süreç kendi kopyasını ekler. Aşama süreleri işçi süreçte
+    ölçülür ve sonuçla birlikte döner (ana süreçteki metriklere eklenir).
+    """
+    extractor = _worker['extractor']
+    compactor = _worker['compactor']
+    cache_context = _worker['cache_context']
+    hasher = _worker['hasher']
+
+    prepared = []
+    timings = {'extract': 0.0, 'prompt_build': 0.0}
+    if hasher is not None:
+        timings['minhash'] = 0.0
+    for chat in chunk:
+        start = time.perf_counter()
+        chat_info = extractor.extract_chat_info(chat)
+        extracted = time.perf_counter()
+        timings['extract'] += extracted - start
+        if chat_info:
+            prompt, compaction = compactor.compact(chat)
+            cache_key = ResultCache.make_key(prompt, *cache_context) if cache_context else None
+            chat_info[PREPARED_KEY] = {'prompt': prompt, 'compaction': compaction, 'cache_key': cache_key}
+            built = time.perf_counter()
+            timings['prompt_build'] += built - extracted
+            if hasher is not None:
+                chat_info[PREPARED_KEY]['minhash'] = hasher.signature(chat)
+                timings['minhash'] += time.perf_counter() - built
+        prepared.append(chat_info)
+
+    valid = [(chat_info, chat) for chat_info, chat in zip(prepared, chunk) if chat_info]
+    if valid:
+        start = time.perf_counter()
+        add_timing_metrics([chat_info for chat_info, _ in valid], [chat for _, chat in valid])
+        timings['timing_metrics'] = time.perf_counter() - start
+    return prepared, timings
+
+
+def _chunked(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+class ChatPreprocessor:
+    """
+    Zaman damgası ayrıştırma, süre hesabı, prompt oluşturma ve önbellek anahtarı
+    hesaplamasını süreç havuzunda parça parça yapar. Sonuçlar sınırlı bir kuyruk
+    üzerinden analizöre akar; böylece ön işleme tüm çekirdekleri kullanır ve
+    ağ beklemesiyle örtüşür, bellekte yalnızca birkaç parça tutulur.
+    """
+
+    def __init__(self, analyzer, workers=None, chunk_size=None, queue_size=None):
+        self.workers = workers or settings.PREPROCESS_WORKERS or os.cpu_count() or 1
+        self.chunk_size = chunk_size or settings.PREPROCESS_CHUNK_SIZE
+        self.queue_size = queue_size or self.workers * 2
+        cache_context = None
+        if analyzer.cache is not None:
+            cache_context = (analyzer.system_prompt, analyzer.model, analyzer._schema)
+        dedup_context = analyzer.dedup.context if analyzer.dedup is not None else None
+        self._initargs = (analyzer.compactor.token_budget, settings.TOKENIZER_ENCODING, cache_context, dedup_context)
+
+    def _feed(self, raw_chats, output, stop):
+        """Parçaları havuza gönderir, sonuçları sırasıyla kuyruğa koyar"""
+        def put(item):
+            while not stop.is_set():
+                try:
+                    output.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        try:
+            with ProcessPoolExecutor(self.workers, initializer=_init_worker, initargs=self._initargs) as pool:
+                pending = deque()
+                for chunk in _chunked(raw_chats, self.chunk_size):
+                    pending.append((chunk, pool.submit(_prepare_chunk, chunk)))
+                    # Havuzda en fazla queue_size parça bekler
+                    if len(pending) >= self.queue_size:
+                        chunk, future = pending.popleft()
+                        if not put((chunk, future.result())):
+                            return
+                while pending:
+                    chunk, future = pending.popleft()
+                    if not put((chunk, future.result())):
+                        return
+            put(_DONE)
+        except BaseException as e:
+            put(e)
+
+    def iter_chats(self, raw_chats):
+        """
+        Ham sohbetleri ön işleyip DataProcessor.iter_chats ile aynı sırada ve
+        biçimde (raw_chat dahil) döner; ek olarak PREPARED_KEY alanını taşır
+        """
+        output = queue.Queue(maxsize=self.queue_size)
+        stop = threading.Event()
+        feeder = threading.Thread(target=self._feed, args=(raw_chats, output, stop), daemon=True)
+        feeder.start()
+        print(f"🧵 Ön işleme: {self.workers} süreç, {self.chunk_size} sohbetlik parçalar")
+
+        try:
+            while True:
+                item = output.get()
+                if item is _DONE:
+                    return
+                if isinstance(item, BaseException):
+                    raise item
+                chunk, (prepared, timings) = item
+                for stage, seconds in timings.items():
+                    metrics.record_time(stage, seconds, len(chunk))
+                for chat, chat_info in zip(chunk, prepared):
+                    if chat_info:
+                        chat_info['raw_chat'] = chat
+                        yield chat_info
+        finally:
+            stop.set()
@@ -0,0 +1,154 @@
+import re
+
+try:
+    import tiktoken
+except ImportError:  # Opsiyonel bağımlılık - yoksa yaklaşık sayım kullanılır
+    tiktoken = None
+
+# Her sohbette tekrar eden, analize katkısı olmayan bot karşılamaları
+BOILERPLATE_PATTERNS = [
+    re.compile(r"^merhaba[!.,]?\s*(ben\s+[\w\s]+?[.!]\s*)?size nasıl yardımcı olabilirim\??$", re.IGNORECASE),
+    re.compile(r"^hoş ?geldiniz[!.,]?\s*size nasıl yardımcı olabilirim\??$", re.IGNORECASE),
+]
+
+PROMPT_HEADER = "Aşağıdaki sohbeti analiz edin:\n\n"
+
+
+class TokenCounter:
+    """tiktoken ile token sayar; tokenizer yoksa ~4 karakter/token varsayar"""
+
+    def __init__(self, encoding_name="o200k_base"):
+        self._encoding = None
+        if tiktoken is not None:
+            try:
+                self._encoding = tiktoken.get_encoding(encoding_name)
+            except Exception as e:
+                print(f"⚠️ Tokenizer yüklenemedi, yaklaşık sayım kullanılıyor: {str(e)[:100]}")
+
+    def count(self, text):
+        if not text:
+            return 0
+        if self._encoding is not None:
+            return len(self._encoding.encode(text))
+        return (len(text) + 3) // 4
+
+    def truncate(self, text, max_tokens):
+        """Metni en fazla max_tokens token olacak şekilde kısaltır"""
+        if self.count(text) <= max_tokens:
+            return text
+        if self._encoding is not None:
+            return self._encoding.decode(self._encoding.encode(text)[:max_tokens]) + "…"
+        return text[:max_tokens * 4] + "…"
+
+
+class PromptCompactor:
+    """
+    Sohbet promptunu mesaj yapısı üzerinden token bütçesine sığdırır:
+    kalıp bot karşılamalarını ve tekrar eden bot mesajlarını çıkarır, ilk ve son
+    müşteri mesajlarını ve sohbetin kapanışını korur, gerekirse aradaki mesajları atar.
+    """
+
+    def __init__(self, token_budget, counter=None):
+        self.token_budget = token_budget
+        self.counter = counter or TokenCounter()
+        self.total_chats = 0
+        self.total_original_tokens = 0
+        self.total_tokens = 0
+
+    @staticmethod
+    def _format_line(sender, text):
+        return f"{sender}: {text}\n"
+
+    @staticmethod
+    def _is_boilerplate(text):
+        stripped = text.strip()
+        return any(pattern.match(stripped) for pattern in BOILERPLATE_PATTERNS)
+
+    def compact(self, chat_data):
+        """
+        (prompt, istatistik) döner. İstatistik: orijinal_token, prompt_token, kazanilan_token
+        """
+        messages = []
+        for message in chat_data.get('mesajlar', []):
+            sender = "Müşteri" if message.get('sender') == 'Müşteri' else "Bot"
+            messages.append((sender, " ".join(str(message.get('text', '')).split())))
+
+        original_tokens = self.counter.count(
+            PROMPT_HEADER + "".join(self._format_line(sender, text) for sender, text in messages)
+        )
+
+        # 1) Kalıp karşılamaları ve tekrar eden bot mesajlarını çıkar
+        seen_bot_texts = set()
+        kept = []
+        for sender, text in messages:
+            if sender == "Bot":
+                if self._is_boilerplate(text) or text in seen_bot_texts:
+                    continue
+                seen_bot_texts.add(text)
+            kept.append((sender, text))
+
+        # 2) Bütçe aşılıyorsa aradaki mesajları baştan sona doğru at; ilk müşteri mesajı
+        #    ve ona verilen ilk yanıt, son müşteri mesajı ve kapanış (çözüm) korunur
+        header_tokens = self.counter.count(PROMPT_HEADER)
+        line_tokens = [self.counter.count(self._format_line(sender, text)) for sender, text in kept]
+        customer_indices = [i for i, (sender, _) in enumerate(kept) if sender == "Müşteri"]
+        protected = {len(kept) - 1}
+        if customer_indices:
+            protected.update((customer_indices[0], customer_indices[0] + 1, customer_indices[-1]))
+
+        removed = set()
+        candidates = [i for i in range(len(kept)) if i not in protected]
+        total = header_tokens + sum(line_tokens)
+        for i in candidates:
+            if total <= self.token_budget:
+                break
+            removed.add(i)
+            total -= line_tokens[i]
+
+        # 3) Tek tek çok uzun mesajlar kaldıysa metinlerini kısalt
+        remaining = {i for i in range(len(kept)) if i not in removed}
+        if total > self.token_budget and remaining:
+            per_message = max(16, (self.token_budget - header_tokens) // len(remaining))
+            kept = [
+                (sender, self.counter.truncate(text, per_message)) if i in remaining else (sender, text)
+                for i, (sender, text) in enumerate(kept)
+            ]
+
+        lines = []
+        skipped = 0
+        for i, (sender, text) in enumerate(kept):
+            if i in removed:
+                skipped += 1
+                continue
+            if skipped:
+                lines.append(f"[... {skipped} mesaj kısaltıldı ...]\n")
+                skipped = 0
+            lines.append(self._format_line(sender, text))
+
+        prompt = PROMPT_HEADER + "".join(lines)
+        prompt_tokens = self.counter.count(prompt)
+
+        compaction = {
+            'orijinal_token': original_tokens,
+            'prompt_token': prompt_tokens,
+            'kazanilan_token': max(0, original_tokens - prompt_tokens)
+        }
+        self.record(compaction)
+        return prompt, compaction
+
+    def record(self, compaction):
+        """Sıkıştırma istatistiğini toplama ekler (başka süreçte üretilen promptlar için de)"""
+        self.total_chats += 1
+        self.total_original_tokens += compaction['orijinal_token']
+        self.total_tokens += compaction['prompt_token']
+
+    def stats(self):
+        """Çalıştırma boyunca toplam tasarruf istatistikleri"""
+        saved = max(0, self.total_original_tokens - self.total_tokens)
+        return {
+            'chats': self.total_chats,
+            'original_tokens': self.total_original_tokens,
+            'prompt_tokens': self.total_tokens,
+            'saved_tokens': saved,
+            'saved_rate': round((saved / self.total_original_tokens) * 100, 1) if self.total_original_tokens else 0.0
+        }
@@ -0,0 +1,53 @@
+import asyncio
+import time
+
+
+class TokenBucket:
+    """Dakikalık bütçeye göre dolan basit token kovası"""
+
+    def __init__(self, per_minute):
+        self.capacity = float(per_minute)
+        self.rate = self.capacity / 60.0  # saniyede dolan miktar
+        self.available = self.capacity
+        self.updated_at = time.monotonic()
+
+    def refill(self):
+        """Geçen süreye göre kovayı doldurur"""
+        now = time.monotonic()
+        self.available = min(self.capacity, self.available + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def wait_time(self, amount):
+        """İstenen miktar için beklenmesi gereken süreyi (sn) döner"""
+        amount = min(amount, self.capacity)
+        if self.available >= amount:
+            return 0.0
+        return (amount - self.available) / self.rate
+
+    def consume(self, amount):
+        self.available -= min(amount, self.capacity)
+
+
+class RateLimiter:
+    """
+    İstek/dakika (RPM) ve token/dakika (TPM) bütçelerini birlikte takip eden
+    asenkron hız sınırlayıcı
+    """
+
+    def __init__(self, requests_per_minute, tokens_per_minute):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self._lock = asyncio.Lock()
+
+    async def acquire(self, token_count):
+        """Bir istek ve tahmini token sayısı için bütçe ayırır, gerekirse bekler"""
+        async with self._lock:
+            while True:
+                self.requests.refill()
+                self.tokens.refill()
+                wait = max(self.requests.wait_time(1), self.tokens.wait_time(token_count))
+                if wait <= 0:
+                    self.requests.consume(1)
+                    self.tokens.consume(token_count)
+                    return
+                await asyncio.sleep(wait)
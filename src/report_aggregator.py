@@ -0,0 +1,271 @@
+import hashlib
+import json
+import os
+from collections import Counter, defaultdict
+from utils.helpers import write_text_atomic
+
+# Ground truth alanı -> analiz alanı
+ACCURACY_FIELDS = {
+    'yanit_durumu': 'yanıt_durumu',
+    'sentiment': 'sentiment',
+    'tur': 'tür',
+    'intent': 'intent'
+}
+
+
+# Birleştirmede toplanan alanlar
+SCALAR_FIELDS = ('total', 'detail_length_total', 'detail_length_count')
+COUNTER_FIELDS = (
+    'resolution_counts', 'sentiment_counts', 'tur_counts', 'intent_counts',
+    'unresolved_intents', 'unresolved_tur', 'negative_intents'
+)
+CROSSTAB_FIELDS = ('intent_by_tur', 'sentiment_by_intent', 'resolution_by_intent')
+
+STATE_VERSION = 2
+
+# Intent başına saklanan en fazla farklı detay (kalıcı durum sınırsız büyümesin diye)
+INTENT_DETAIL_LIMIT = 50
+_ID_MODULUS = 1 << 64
+
+
+def _id_hash(sohbet_id):
+    return int.from_bytes(hashlib.blake2b(str(sohbet_id).encode('utf-8'), digest_size=8).digest(), 'big')
+
+
+class ReportAggregates:
+    """
+    Raporların ihtiyaç duyduğu tüm sayaç, çapraz tablo ve dağılımları sonuçlar
+    üzerinden tek geçişte toplar. SWOT, öneriler, talep özeti ve doğruluk
+    raporları bu nesneden üretilir. Durum kaydedilip yeni sonuçlarla
+    birleştirilebilir; böylece günlük eklerde tüm geçmiş yeniden işlenmez.
+    Eklenen sohbetlerin kimlik özeti (delta_id) durumda saklanır, aynı sohbet
+    kümesi ikinci kez eklenmez.
+    """
+
+    def __init__(self):
+        self.total = 0
+        self.resolution_counts = Counter()
+        self.sentiment_counts = Counter()
+        self.tur_counts = Counter()
+        self.intent_counts = Counter()
+        # Intent -> detaylar (ilk görülme sırasıyla, tekrarsız, en fazla INTENT_DETAIL_LIMIT)
+        self.intent_details = defaultdict(dict)
+        # Detay sınırına ulaşıp yeni detayları sayılmayan intentler
+        self.truncated_intents = set()
+        self.intent_by_tur = defaultdict(Counter)
+        self.sentiment_by_intent = defaultdict(Counter)
+        self.resolution_by_intent = defaultdict(Counter)
+        self.unresolved_intents = Counter()
+        self.unresolved_tur = Counter()
+        self.negative_intents = Counter()
+        self.detail_length_total = 0
+        self.detail_length_count = 0
+        # confusion[alan][gerçek etiket][tahmin] = adet
+        self.confusion = {field: defaultdict(Counter) for field in ACCURACY_FIELDS.values()}
+        # sohbet_id hash'lerinin toplamı: sıradan bağımsız, birleştirmede toplanır
+        self.id_sum = 0
+        # Durumda: daha önce eklenmiş sohbet kümelerinin delta_id'leri
+        self.applied_deltas = []
+
+    def add(self, result, truth=None):
+        """Tek bir analiz sonucunu (ve varsa ground truth kaydını) sayaçlara ekler"""
+        intent = result.get('intent', 'Diğer')
+        detail = result.get('intent_detay', 'Belirtilmemiş')
+        tur = result.get('tür', 'Belirsiz')
+        sentiment = result.get('sentiment', 'Belirsiz')
+        resolution = result.get('yanıt_durumu', 'Belirsiz')
+
+        self.total += 1
+        self.resolution_counts[resolution] += 1
+        self.sentiment_counts[sentiment] += 1
+        self.tur_counts[tur] += 1
+        self.intent_counts[intent] += 1
+        self._add_detail(intent, detail)
+        self.id_sum = (self.id_sum + _id_hash(result.get('sohbet_id'))) % _ID_MODULUS
+        self.intent_by_tur[intent][tur] += 1
+        self.sentiment_by_intent[intent][sentiment] += 1
+        self.resolution_by_intent[intent][resolution] += 1
+
+        if resolution == 'Çözülemedi':
+            self.unresolved_intents[intent] += 1
+            self.unresolved_tur[tur] += 1
+        if sentiment == 'Negatif':
+            self.negative_intents[intent] += 1
+
+        if detail and str(detail).strip():
+            self.detail_length_total += len(str(detail))
+            self.detail_length_count += 1
+
+        # API hatası nedeniyle yedek değer almış sohbetler doğruluğa katılmaz
+        if truth and not result.get('hata_nedeni'):
+            self._add_truth(result, truth)
+        return self
+
+    def _add_detail(self, intent, detail):
+        details = self.intent_details[intent]
+        if detail in details:
+            return
+        if len(details) >= INTENT_DETAIL_LIMIT:
+            self.truncated_intents.add(intent)
+            return
+        details[detail] = None
+
+    @property
+    def delta_id(self):
+        """Eklenen sohbet kümesinin kimliği (adet + sohbet_id hash toplamı)"""
+        return f"{self.total}:{self.id_sum:016x}"
+
+    def _add_truth(self, result, truth):
+        for truth_field, ai_field in ACCURACY_FIELDS.items():
+            ai_value = str(result.get(ai_field) or '').strip()
+            truth_value = str(truth.get(truth_field) or '').strip()
+
+            if ai_value and truth_value:
+                # Büyük/küçük harf farkı hata sayılmaz
+                if ai_value.lower() == truth_value.lower():
+                    ai_value = truth_value
+                self.confusion[ai_field][truth_value][ai_value] += 1
+
+    @classmethod
+    def from_results(cls, analysis_results, truth_index=None):
+        """Sonuçlardan tek geçişte toplam nesnesi oluşturur"""
+        aggregates = cls()
+        for result in analysis_results:
+            truth = truth_index.get(str(result.get('sohbet_id'))) if truth_index else None
+            aggregates.add(result, truth)
+        return aggregates
+
+    def merge(self, other):
+        """Başka bir toplam nesnesini (ör. yeni günün sonuçları) bu nesneye ekler"""
+        for name in SCALAR_FIELDS:
+            setattr(self, name, getattr(self, name) + getattr(other, name))
+        for name in COUNTER_FIELDS:
+            getattr(self, name).update(getattr(other, name))
+        for name in CROSSTAB_FIELDS:
+            target = getattr(self, name)
+            for key, row in getattr(other, name).items():
+                target[key].update(row)
+        for intent, details in other.intent_details.items():
+            for detail in details:
+                self._add_detail(intent, detail)
+        self.truncated_intents |= other.truncated_intents
+        for field, matrix in other.confusion.items():
+            for label, row in matrix.items():
+                self.confusion[field][label].update(row)
+        self.id_sum = (self.id_sum + other.id_sum) % _ID_MODULUS
+        self.applied_deltas.extend(delta for delta in other.applied_deltas if delta not in self.applied_deltas)
+        return self
+
+    def apply(self, delta):
+        """
+        Yeni sonuçların toplamını (delta) kayıtlı duruma ekler. Aynı sohbet kümesi
+        (ör. aynı günün yeniden çalıştırılması) daha önce eklendiyse durum
+        değişmez ve False döner.
+        """
+        if delta.delta_id in self.applied_deltas:
+            return False
+        self.merge(delta)
+        self.applied_deltas.append(delta.delta_id)
+        return True
+
+    def to_dict(self):
+        """JSON'a yazılabilir durum"""
+        data = {'version': STATE_VERSION}
+        for name in SCALAR_FIELDS:
+            data[name] = getattr(self, name)
+        for name in COUNTER_FIELDS:
+            data[name] = dict(getattr(self, name))
+        for name in CROSSTAB_FIELDS:
+            data[name] = {key: dict(row) for key, row in getattr(self, name).items()}
+        data['intent_details'] = {intent: list(details) for intent, details in self.intent_details.items()}
+        data['truncated_intents'] = sorted(self.truncated_intents)
+        data['id_sum'] = self.id_sum
+        data['applied_deltas'] = self.applied_deltas
+        data['confusion'] = {
+            field: {label: dict(row) for label, row in matrix.items()}
+            for field, matrix in self.confusion.items()
+        }
+        return data
+
+    @classmethod
+    def from_dict(cls, data):
+        aggregates = cls()
+        for name in SCALAR_FIELDS:
+            setattr(aggregates, name, data.get(name, 0))
+        for name in COUNTER_FIELDS:
+            getattr(aggregates, name).update(data.get(name, {}))
+        for name in CROSSTAB_FIELDS:
+            target = getattr(aggregates, name)
+            for key, row in data.get(name, {}).items():
+                target[key].update(row)
+        for intent, details in data.get('intent_details', {}).items():
+            for detail in details:
+                aggregates._add_detail(intent, detail)
+        aggregates.truncated_intents.update(data.get('truncated_intents', []))
+        aggregates.id_sum = data.get('id_sum', 0)
+        aggregates.applied_deltas = list(data.get('applied_deltas', []))
+        for field, matrix in data.get('confusion', {}).items():
+            for label, row in matrix.items():
+                aggregates.confusion.setdefault(field, defaultdict(Counter))[label].update(row)
+        return aggregates
+
+    def save(self, path):
+        """Durumu geçici dosyaya yazıp yerine taşır (yarım yazılmış durum okunmaz)"""
+        write_text_atomic(path, json.dumps(self.to_dict(), ensure_ascii=False))
+
+    @classmethod
+    def load(cls, path):
+        """Kayıtlı durumu yükler; dosya yoksa boş durum döner"""
+        if not os.path.exists(path):
+            return cls()
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls.from_dict(json.load(f))
+
+    @property
+    def resolved_count(self):
+        return self.resolution_counts['Çözüldü']
+
+    @property
+    def unresolved_count(self):
+        return self.resolution_counts['Çözülemedi']
+
+    @property
+    def avg_detail_length(self):
+        return self.detail_length_total / self.detail_length_count if self.detail_length_count else 0
+
+    def accuracy_results(self):
+        """Alan bazında doğruluk, karışıklık matrisi ve intent metrikleri"""
+        accuracy_percentages = {}
+        for field, matrix in self.confusion.items():
+            total = sum(sum(row.values()) for row in matrix.values())
+            correct = sum(row[label] for label, row in matrix.items())
+            accuracy_percentages[field] = round((correct / total) * 100, 1) if total > 0 else 0
+
+        return {
+            'accuracy': accuracy_percentages,
+            'confusion_matrix': {field: {label: dict(row) for label, row in matrix.items()}
+                                 for field, matrix in self.confusion.items()},
+            'intent_metrics': class_metrics(self.confusion['intent'])
+        }
+
+
+def class_metrics(matrix):
+    """Karışıklık matrisinden sınıf bazında precision, recall ve F1 hesaplar"""
+    predicted = Counter()
+    for row in matrix.values():
+        predicted.update(row)
+
+    metrics = {}
+    for label in sorted(set(matrix) | set(predicted)):
+        true_positive = matrix.get(label, {}).get(label, 0)
+        support = sum(matrix.get(label, {}).values())
+        precision = true_positive / predicted[label] if predicted[label] else 0.0
+        recall = true_positive / support if support else 0.0
+        f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+        metrics[label] = {
+            'precision': round(precision * 100, 1),
+            'recall': round(recall * 100, 1),
+            'f1': round(f1 * 100, 1),
+            'support': support
+        }
+    return metrics
@@ -1,7 +1,9 @@
-from utils.helpers import save_to_txt
-from collections import Counter, defaultdict
-import statistics
+from utils.helpers import write_text_atomic
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from config.settings import settings
+from src.report_aggregator import ReportAggregates
+from src.metrics import metrics
 
 class ReportGenerator:
     def __init__(self):
@@ -13,7 +15,14 @@ class ReportGenerator:
         self.analyzed_model_name = analyzed_model
         self.analysis_model = analysis_model
     
-    def generate_swot(self, analysis_results):
+    def aggregate(self, analysis_results, ground_truth=None):
+        """Tüm raporlar için sayaçları sonuçlar üzerinde tek geçişte toplar"""
+        truth_index = None
+        if ground_truth is not None:
+            truth_index = ground_truth if isinstance(ground_truth, dict) else self.build_ground_truth_index(ground_truth)
+        return ReportAggregates.from_results(analysis_results, truth_index)
+    
+    def generate_swot(self, analysis_results=None, aggregates=None):
         """Detaylı SWOT analizi oluşturur - Analiz edilen model için"""
         strengths = []
         weaknesses = []
@@ -21,26 +30,19 @@ class ReportGenerator:
         threats = []
         
         # İstatistiksel veriler
-        total_chats = len(analysis_results)
-        resolved_count = sum(1 for r in analysis_results if r.get('yanıt_durumu') == 'Çözüldü')
-        unresolved_count = sum(1 for r in analysis_results if r.get('yanıt_durumu') == 'Çözülemedi')
-        positive_sentiment = sum(1 for r in analysis_results if r.get('sentiment') == 'Pozitif')
-        negative_sentiment = sum(1 for r in analysis_results if r.get('sentiment') == 'Negatif')
-        neutral_sentiment = sum(1 for r in analysis_results if r.get('sentiment') == 'Nötr')
+        agg = aggregates or self.aggregate(analysis_results)
+        total_chats = agg.total
+        resolved_count = agg.resolved_count
+        unresolved_count = agg.unresolved_count
+        positive_sentiment = agg.sentiment_counts['Pozitif']
+        negative_sentiment = agg.sentiment_counts['Negatif']
+        neutral_sentiment = agg.sentiment_counts['Nötr']
         
-        # Tür ve intent dağılımı
-        tur_counts = Counter(r.get('tür', '') for r in analysis_results)
-        intent_counts = Counter(r.get('intent', '') for r in analysis_results)
+        # Intent dağılımı
+        intent_counts = agg.intent_counts
         
         # Yanıt kalitesi metrikleri - DÜZELTME: yanıt_metni yerine intent_detay kullan
-        response_lengths = [
-            len(str(r.get('intent_detay', ''))) 
-            for r in analysis_results 
-            if r.get('intent_detay') and str(r.get('intent_detay', '')).strip()
-        ]
-        
-        # Ortalama hesaplama - boş liste kontrolü
-        avg_response_length = statistics.mean(response_lengths) if response_lengths else 0
+        avg_response_length = agg.avg_detail_length
         
         # Güçlü Yönler (Analiz edilen modelin)
         if resolved_count > 0:
@@ -86,11 +88,9 @@ class ReportGenerator:
                 weaknesses.append(f"Kayda değer olumsuz tepki (%{negative_rate:.1f}) - önemli sayıda kullanıcı memnun değil")
         
         # Çözülemeyen sohbetlerin detaylı analizi
-        unresolved_chats = [r for r in analysis_results if r.get('yanıt_durumu') == 'Çözülemedi']
-        if unresolved_chats:
-            unresolved_intents = Counter(r.get('intent', '') for r in unresolved_chats)
-            for intent, count in unresolved_intents.most_common(3):
-                intent_failure_rate = (count / len(unresolved_chats)) * 100
+        if unresolved_count:
+            for intent, count in agg.unresolved_intents.most_common(3):
+                intent_failure_rate = (count / unresolved_count) * 100
                 weaknesses.append(f"'{intent}' konusunda kritik başarısızlık - çözülemeyen sohbetlerin %{intent_failure_rate:.1f}'u")
         
         # Fırsatlar
@@ -171,50 +171,45 @@ class ReportGenerator:
         
         return swot_text
     
-    def generate_recommendations(self, analysis_results):
+    def generate_recommendations(self, analysis_results=None, aggregates=None):
         """Detaylı model geliştirme önerileri oluşturur"""
         recommendations = []
         
         # Temel istatistikler
-        total_chats = len(analysis_results)
-        unresolved_chats = [r for r in analysis_results if r.get('yanıt_durumu') == 'Çözülemedi']
-        negative_chats = [r for r in analysis_results if r.get('sentiment') == 'Negatif']
+        agg = aggregates or self.aggregate(analysis_results)
+        total_chats = agg.total
+        unresolved_count = agg.unresolved_count
+        negative_count = agg.sentiment_counts['Negatif']
         
         # Çözülemeyen sohbetlerin detaylı analizi
-        if unresolved_chats:
-            unresolved_rate = (len(unresolved_chats) / total_chats) * 100
-            unresolved_intents = Counter(r.get('intent', '') for r in unresolved_chats)
-            unresolved_tur = Counter(r.get('tür', '') for r in unresolved_chats)
+        if unresolved_count:
+            unresolved_rate = (unresolved_count / total_chats) * 100
             
             recommendations.append(f"🎯 **ÇÖZÜM ORANI İYİLEŞTİRME** (%{unresolved_rate:.1f} çözülemeyen sohbet):")
             
-            for intent, count in unresolved_intents.most_common(3):
-                intent_failure_rate = (count / len(unresolved_chats)) * 100
+            for intent, count in agg.unresolved_intents.most_common(3):
+                intent_failure_rate = (count / unresolved_count) * 100
                 recommendations.append(f"   • '{intent}' intent'i için özel eğitim verilmeli (%{intent_failure_rate:.1f} çözümsüzlük)")
             
             # Tür bazlı öneriler
-            for tur, count in unresolved_tur.most_common(2):
+            for tur, count in agg.unresolved_tur.most_common(2):
                 recommendations.append(f"   • {tur} türündeki sorgulara özel çözüm akışları geliştirilmeli")
         
         # Negatif sentiment analizi
-        if negative_chats:
-            negative_rate = (len(negative_chats) / total_chats) * 100
-            negative_intents = Counter(r.get('intent', '') for r in negative_chats)
+        if negative_count:
+            negative_rate = (negative_count / total_chats) * 100
             
             recommendations.append(f"😊 **MÜŞTERİ DENEYİMİ İYİLEŞTİRME** (%{negative_rate:.1f} negatif deneyim):")
             
-            for intent, count in negative_intents.most_common(3):
+            for intent, count in agg.negative_intents.most_common(3):
                 recommendations.append(f"   • '{intent}' sürecinde daha empatik dil kullanılmalı")
             
             recommendations.append(f"   • Olumsuz durumlarda 'özür ve telafi' şablonları entegre edilmeli")
             recommendations.append(f"   • Duygu analizi modülü güçlendirilmeli")
         
         # Intent bazlı optimizasyon önerileri
-        intent_counts = Counter(r.get('intent', '') for r in analysis_results)
-        tur_counts = Counter(r.get('tür', '') for r in analysis_results)
-        
         recommendations.append(f"📈 **INTENT BAZLI OPTİMİZASYON**:")
-        top_intents = intent_counts.most_common(6)
+        top_intents = agg.intent_counts.most_common(6)
         for intent, count in top_intents:
             intent_rate = (count / total_chats) * 100
             if intent_rate > 10:
@@ -246,9 +241,9 @@ class ReportGenerator:
         
         rec_text += "📈 PERFORMANS ÖZETİ:\n"
         rec_text += f"• Toplam Analiz: {total_chats} sohbet\n"
-        rec_text += f"• Çözülemeyen: {len(unresolved_chats)} sohbet (%{(len(unresolved_chats)/total_chats)*100:.1f})\n"
-        rec_text += f"• Negatif Deneyim: {len(negative_chats)} sohbet (%{(len(negative_chats)/total_chats)*100:.1f})\n"
-        rec_text += f"• Başarı Oranı: %{((total_chats - len(unresolved_chats)) / total_chats) * 100:.1f}\n\n"
+        rec_text += f"• Çözülemeyen: {unresolved_count} sohbet (%{(unresolved_count/total_chats)*100:.1f})\n"
+        rec_text += f"• Negatif Deneyim: {negative_count} sohbet (%{(negative_count/total_chats)*100:.1f})\n"
+        rec_text += f"• Başarı Oranı: %{((total_chats - unresolved_count) / total_chats) * 100:.1f}\n\n"
         
         rec_text += "💡 DETAYLI ÖNERİLER:\n"
         rec_text += "-" * 30 + "\n"
@@ -265,44 +260,22 @@ class ReportGenerator:
             
         return rec_text
 
-    def calculate_accuracy(self, analysis_results, ground_truth):
-        """Doğruluk ölçümü yapar - Analiz edilen modelin performansı için"""
-        accuracy_results = {
-            'yanıt_durumu': {'correct': 0, 'total': 0},
-            'sentiment': {'correct': 0, 'total': 0},
-            'tür': {'correct': 0, 'total': 0},
-            'intent': {'correct': 0, 'total': 0}
-        }
-    
-        field_mapping = {
-            'yanit_durumu': 'yanıt_durumu',
-            'sentiment': 'sentiment', 
-            'tur': 'tür',
-            'intent': 'intent'
-        }
-    
-        for ai_result in analysis_results:
-            sohbet_id = ai_result.get('sohbet_id')
-            truth = next((item for item in ground_truth if item['sohbet_id'] == sohbet_id), None)
-        
-            if truth:
-                for truth_field, ai_field in field_mapping.items():
-                    ai_value = ai_result.get(ai_field, '').lower().strip()
-                    truth_value = truth.get(truth_field, '').lower().strip()
-                
-                    if ai_value and truth_value:
-                        accuracy_results[ai_field]['total'] += 1
-                        if ai_value == truth_value:
-                            accuracy_results[ai_field]['correct'] += 1
+    def build_ground_truth_index(self, ground_truth):
+        """Ground truth kayıtlarını sohbet_id ile indeksler (tek geçişte O(N) birleştirme için)"""
+        return {str(item['sohbet_id']): item for item in ground_truth}
     
-        accuracy_percentages = {}
-        for field, counts in accuracy_results.items():
-            if counts['total'] > 0:
-                accuracy_percentages[field] = round((counts['correct'] / counts['total']) * 100, 1)
-            else:
-                accuracy_percentages[field] = 0
+    def calculate_accuracy(self, analysis_results, ground_truth):
+        """
+        Doğruluk ölçümü yapar - Analiz edilen modelin performansı için.
+        ground_truth liste ya da build_ground_truth_index() çıktısı olabilir.
+        Alan bazında doğruluk yüzdesi, karışıklık matrisi ve intent bazında
+        precision / recall / F1 döner.
+        """
+        return self.accuracy_from_aggregates(self.aggregate(analysis_results, ground_truth))
     
-        return accuracy_percentages
+    def accuracy_from_aggregates(self, aggregates):
+        """calculate_accuracy ile aynı çıktıyı analiz sırasında toplanmış sayaçlardan üretir"""
+        return aggregates.accuracy_results()
 
     def generate_accuracy_report(self, accuracy_results):
         """Detaylı doğruluk raporu oluşturur"""
@@ -324,7 +297,8 @@ class ReportGenerator:
         
         performance_descriptions = []
         
-        for field, accuracy in accuracy_results.items():
+        accuracy_percentages = accuracy_results['accuracy']
+        for field, accuracy in accuracy_percentages.items():
             icon = performance_icons.get(field, '📊')
             
             if accuracy >= 90:
@@ -347,7 +321,7 @@ class ReportGenerator:
             performance_descriptions.append((field, accuracy, level))
         
         # Genel değerlendirme
-        avg_accuracy = sum(accuracy_results.values()) / len(accuracy_results)
+        avg_accuracy = sum(accuracy_percentages.values()) / len(accuracy_percentages)
         
         if avg_accuracy >= 90:
             overall = "MÜKEMMEL PERFORMANS"
@@ -374,31 +348,38 @@ class ReportGenerator:
         for field, accuracy, level in performance_descriptions:
             report += f"• {field.upper()}: %{accuracy} ({level})\n"
         
+        intent_metrics = accuracy_results.get('intent_metrics', {})
+        if intent_metrics:
+            report += "\n🎯 INTENT BAZINDA PRECISION / RECALL / F1:\n"
+            report += "-" * 45 + "\n"
+            sorted_metrics = sorted(intent_metrics.items(), key=lambda x: x[1]['support'], reverse=True)
+            for intent, metrics in sorted_metrics:
+                report += (f"• {intent}: P %{metrics['precision']} | R %{metrics['recall']} | "
+                           f"F1 %{metrics['f1']} ({metrics['support']} örnek)\n")
+        
+        report += "\n🔀 KARIŞIKLIK MATRİSİ (gerçek → tahmin):\n"
+        report += "-" * 45 + "\n"
+        for field, matrix in accuracy_results.get('confusion_matrix', {}).items():
+            report += f"{performance_icons.get(field, '📊')} {field.upper()}:\n"
+            for truth_label, row in sorted(matrix.items()):
+                predictions = ", ".join(
+                    f"{label} {count}" for label, count in sorted(row.items(), key=lambda x: x[1], reverse=True)
+                )
+                report += f"   • {truth_label} → {predictions}\n"
+        
         return report
     
-    def generate_demand_summary(self, analysis_results):
+    def generate_demand_summary(self, analysis_results=None, aggregates=None):
         """Detaylı müşteri talepleri özeti oluşturur"""
-        intent_counts = Counter()
-        intent_details = defaultdict(set)
-        intent_by_tur = defaultdict(Counter)
-        sentiment_by_intent = defaultdict(Counter)
-        resolution_by_intent = defaultdict(Counter)
-        
-        for result in analysis_results:
-            intent = result.get('intent', 'Diğer')
-            detail = result.get('intent_detay', 'Belirtilmemiş')
-            tur = result.get('tür', 'Belirsiz')
-            sentiment = result.get('sentiment', 'Belirsiz')
-            resolution = result.get('yanıt_durumu', 'Belirsiz')
-            
-            intent_counts[intent] += 1
-            intent_details[intent].add(detail)
-            intent_by_tur[intent][tur] += 1
-            sentiment_by_intent[intent][sentiment] += 1
-            resolution_by_intent[intent][resolution] += 1
+        agg = aggregates or self.aggregate(analysis_results)
+        intent_counts = agg.intent_counts
+        intent_details = agg.intent_details
+        intent_by_tur = agg.intent_by_tur
+        sentiment_by_intent = agg.sentiment_by_intent
+        resolution_by_intent = agg.resolution_by_intent
         
         # İstatistikler
-        total = sum(intent_counts.values())
+        total = agg.total
         intent_percentages = {k: round((v/total)*100, 1) for k, v in intent_counts.items()}
         sorted_intents = sorted(intent_percentages.items(), key=lambda x: x[1], reverse=True)
         
@@ -454,11 +435,13 @@ class ReportGenerator:
             # Detaylar
             if intent in intent_details:
                 details_list = list(intent_details[intent])
-                summary_text += f"   📋 Detay Çeşitliliği: {len(details_list)} farklı varyasyon\n"
+                # Sınıra ulaşan intentlerde yalnızca ilk detaylar saklanır
+                more = "+" if intent in agg.truncated_intents else ""
+                summary_text += f"   📋 Detay Çeşitliliği: {len(details_list)}{more} farklı varyasyon\n"
                 for i, detail in enumerate(details_list[:3], 1):
                     summary_text += f"      {i}. {detail}\n"
                 if len(details_list) > 3:
-                    summary_text += f"      ... ve {len(details_list) - 3} detay daha\n"
+                    summary_text += f"      ... ve {len(details_list) - 3}{more} detay daha\n"
             
             summary_text += "\n"
         
@@ -483,30 +466,81 @@ class ReportGenerator:
         
         return summary_text
     
-    def save_all_reports(self, analysis_results, ground_truth, output_paths):
-        """Tüm detaylı raporları kaydeder"""
+    def generate_timing_report(self, timing):
+        """Sohbet süreleri ve bot yanıt süreleri için yüzdelik özeti (TimingStats) oluşturur"""
+        labels = {
+            'toplam_sure_sn': "⏱️ Toplam Sohbet Süresi (sn)",
+            'ilk_yanit_sn': "⚡ İlk Yanıt Süresi (sn)",
+            'ort_bot_yanit_sn': "🤖 Ortalama Bot Yanıt Süresi (sn)",
+            'musteri_tur_sayisi': "💬 Müşteri Tur Sayısı"
+        }
+        
+        report = "SOHBET ZAMANLAMA ÖZETİ\n"
+        report += "=" * 60 + "\n\n"
+        report += f"Analiz Tarihi: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n"
+        report += f"Sohbet Sayısı: {timing.count}\n\n"
+        
+        for column, stats in timing.summary().items():
+            report += f"{labels[column]}:\n"
+            report += "   " + " | ".join(f"{name}: {value}" for name, value in stats.items()) + "\n\n"
+        
+        return report
+    
+    def save_all_reports(self, analysis_results, ground_truth, output_paths, max_workers=None, timing=None):
+        """
+        Tüm detaylı raporları sonuç listesinden üretip kaydeder (bkz. save_reports).
+        """
         # Model ismini analiz sonuçlarından çıkar
         if analysis_results:
             first_result = analysis_results[0]
             if 'model_adi' in first_result:
                 self.analyzed_model_name = first_result['model_adi']
         
-        swot = self.generate_swot(analysis_results)
-        recommendations = self.generate_recommendations(analysis_results)
-        demand_summary = self.generate_demand_summary(analysis_results)
-        
-        accuracy_results = self.calculate_accuracy(analysis_results, ground_truth)
-        accuracy_report = self.generate_accuracy_report(accuracy_results)
-        
-        # Dosyalara kaydet
-        save_to_txt(output_paths.get('swot', 'outputs/swot_analizi.txt'), swot)
-        save_to_txt(output_paths.get('recommendations', 'outputs/oneriler.txt'), recommendations)
-        save_to_txt(output_paths.get('demand_summary', 'outputs/talepler_ozeti.txt'), demand_summary)
-        save_to_txt(output_paths.get('accuracy_report', 'outputs/dogruluk_raporu.txt'), accuracy_report)
-        
-        return {
-            'swot': swot,
-            'recommendations': recommendations,
-            'demand_summary': demand_summary,
-            'accuracy_report': accuracy_report
+        aggregates = self.aggregate(analysis_results, ground_truth)
+        return self.save_reports(aggregates, output_paths, max_workers=max_workers, timing=timing)
+    
+    def save_reports(self, aggregates, output_paths, accuracy_results=None, max_workers=None, timing=None):
+        """
+        Tüm detaylı raporları aynı toplam nesnesinden üretip kaydeder.
+        accuracy_results verilirse doğruluk yeniden hesaplanmaz; timing verilirse
+        zamanlama özeti de yazılır. Raporlar eşzamanlı üretilip yazılır
+        (max_workers=1 sıralı çalışır); yazım hataları çağırana iletilir.
+        """
+        if accuracy_results is None:
+            accuracy_results = self.accuracy_from_aggregates(aggregates)
+        
+        # Raporlar birbirinden bağımsız: her biri ayrı iş parçacığında üretilip yazılır
+        jobs = {
+            'swot': (lambda: self.generate_swot(aggregates=aggregates),
+                     output_paths.get('swot', 'outputs/swot_analizi.txt')),
+            'recommendations': (lambda: self.generate_recommendations(aggregates=aggregates),
+                                output_paths.get('recommendations', 'outputs/oneriler.txt')),
+            'demand_summary': (lambda: self.generate_demand_summary(aggregates=aggregates),
+                               output_paths.get('demand_summary', 'outputs/talepler_ozeti.txt')),
+            'accuracy_report': (lambda: self.generate_accuracy_report(accuracy_results),
+                                output_paths.get('accuracy_report', 'outputs/dogruluk_raporu.txt'))
         }
+        if timing is not None:
+            jobs['timing'] = (lambda: self.generate_timing_report(timing),
+                              output_paths.get('timing', settings.OUTPUT_TIMING_REPORT))
+        
+        with ThreadPoolExecutor(max_workers=max_workers or settings.REPORT_WORKERS) as executor:
+            futures = {
+                name: executor.submit(self._render_and_save, name, render, path)
+                for name, (render, path) in jobs.items()
+            }
+        
+        # Tüm işler bitmiştir; hata olan raporun istisnası burada yükseltilir.
+        # Çıktılar iş parçacıklarında değil burada, sabit sırayla yazdırılır
+        reports = {}
+        for name, future in futures.items():
+            reports[name] = future.result()
+            print(f"Dosya kaydedildi: {jobs[name][1]}")
+        return reports
+    
+    def _render_and_save(self, name, render, path):
+        """Raporu üretir ve geçici dosya üzerinden atomik olarak yazar (çıktı yazdırmaz)"""
+        with metrics.timer(f"report_{name}"):
+            content = render()
+            write_text_atomic(path, content)
+        return content
@@ -0,0 +1,120 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+
+def normalize_chat_text(text):
+    """Anahtar üretimi için boşlukları sadeleştirir"""
+    return " ".join(text.split())
+
+
+class ResultCache:
+    """
+    Sohbet analiz sonuçları için SQLite tabanlı, içerik adresli kalıcı önbellek.
+    Anahtar: (normalize sohbet metni, system prompt, model, şema) özeti.
+    Kayıt sayısı sınırı aşıldığında en eski erişilen kayıtlar silinir (LRU).
+    Async modda olay döngüsünü bekletmemek için iş parçacıklarından çağrılır;
+    bağlantı kilitle paylaşılır.
+    """
+
+    def __init__(self, db_path, max_entries=500000):
+        self.db_path = db_path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            """CREATE TABLE IF NOT EXISTS analiz_cache (
+                key TEXT PRIMARY KEY,
+                result TEXT NOT NULL,
+                accessed_at REAL NOT NULL
+            )"""
+        )
+        self.conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_analiz_cache_accessed ON analiz_cache(accessed_at)"
+        )
+        self.conn.commit()
+        self._count = self.conn.execute("SELECT COUNT(*) FROM analiz_cache").fetchone()[0]
+
+    @staticmethod
+    def make_key(chat_text, system_prompt, model, schema):
+        """Önbellek anahtarını üretir"""
+        digest = hashlib.sha256()
+        for part in (normalize_chat_text(chat_text), system_prompt, model,
+                     json.dumps(schema, sort_keys=True, ensure_ascii=False)):
+            digest.update(part.encode("utf-8"))
+            digest.update(b"\x00")
+        return digest.hexdigest()
+
+    def get(self, key):
+        """Kayıt varsa sonucu döner, yoksa None"""
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT result FROM analiz_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            self.conn.execute(
+                "UPDATE analiz_cache SET accessed_at = ? WHERE key = ?", (time.time(), key)
+            )
+            self.conn.commit()
+        return json.loads(row[0])
+
+    def put(self, key, result):
+        """Sonucu kaydeder, gerekirse eski kayıtları siler"""
+        payload = json.dumps(result, ensure_ascii=False)
+        with self._lock:
+            exists = self.conn.execute(
+                "SELECT 1 FROM analiz_cache WHERE key = ?", (key,)
+            ).fetchone()
+            self.conn.execute(
+                "INSERT OR REPLACE INTO analiz_cache (key, result, accessed_at) VALUES (?, ?, ?)",
+                (key, payload, time.time())
+            )
+            if not exists:
+                self._count += 1
+            self._evict()
+            self.conn.commit()
+
+    def _evict(self):
+        overflow = self._count - self.max_entries
+        if overflow <= 0:
+            return
+        self.conn.execute(
+            """DELETE FROM analiz_cache WHERE key IN (
+                SELECT key FROM analiz_cache ORDER BY accessed_at ASC LIMIT ?
+            )""",
+            (overflow,)
+        )
+        self._count -= overflow
+        self.evictions += overflow
+
+    def stats(self):
+        """İsabet/ıska istatistiklerini döner"""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round((self.hits / lookups) * 100, 1) if lookups else 0.0,
+            "entries": self._count,
+            "evictions": self.evictions
+        }
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
@@ -0,0 +1,226 @@
+import glob
+import os
+import time
+import uuid
+from typing import Literal, get_args, get_origin
+import pandas as pd
+from config.settings import settings
+from src.metrics import metrics
+from src.chat_analyzer import ChatAnalysis, FALLBACK_RESULT
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+except ImportError:  # Opsiyonel bağımlılık - yoksa Parquet çıktısı atlanır
+    pa = None
+
+TIMESTAMP_FORMAT = "%d.%m.%Y %H:%M:%S"
+PARTITION_COLUMN = "tarih"
+UNKNOWN_PARTITION = "bilinmiyor"
+# Parça parça yazılan dosyaların şeması aynı kalsın diye her zaman metin olarak yazılır
+ERROR_COLUMN = "hata_nedeni"
+
+
+def _label_categories():
+    """ChatAnalysis'teki Literal alanların değerleri (+ yedek sonuç etiketi)"""
+    categories = {}
+    for name, field in ChatAnalysis.model_fields.items():
+        if get_origin(field.annotation) is Literal:
+            values = list(get_args(field.annotation))
+            fallback = FALLBACK_RESULT.get(name)
+            if fallback is not None and fallback not in values:
+                values.append(fallback)
+            categories[name] = values
+    return categories
+
+
+LABEL_CATEGORIES = _label_categories()
+
+
+def results_to_frame(results):
+    """
+    Analiz sonuçlarını kolon tabanlı saklamaya uygun DataFrame'e çevirir:
+    etiket alanları sabit kategorili, tarih bölümü sohbet_baslangic'tan türetilir
+    """
+    df = pd.DataFrame(results)
+    if 'raw_chat' in df.columns:
+        df = df.drop('raw_chat', axis=1)
+
+    for column, categories in LABEL_CATEGORIES.items():
+        if column in df.columns:
+            df[column] = pd.Categorical(df[column], categories=categories)
+
+    if ERROR_COLUMN not in df.columns:
+        df[ERROR_COLUMN] = None
+    df[ERROR_COLUMN] = df[ERROR_COLUMN].astype('string')
+
+    if 'sohbet_baslangic' in df.columns:
+        started = pd.to_datetime(df['sohbet_baslangic'], format=TIMESTAMP_FORMAT, errors='coerce')
+        df[PARTITION_COLUMN] = started.dt.strftime('%Y-%m-%d').fillna(UNKNOWN_PARTITION)
+    else:
+        df[PARTITION_COLUMN] = UNKNOWN_PARTITION
+    return df
+
+
+def new_run_id():
+    """Dosya adlarında kullanılan, zamana göre sıralanan çalıştırma kimliği"""
+    return f"{time.strftime('%Y%m%d%H%M%S')}-{uuid.uuid4().hex[:12]}"
+
+
+class ResultStore:
+    """
+    Analiz sonuçlarını tarih=YYYY-MM-DD bölümlü Parquet veri kümesi olarak saklar.
+    Bir aylık sonuç, yalnızca ilgili bölümler okunarak taranabilir. Yazımlar
+    varsayılan olarak yalnızca ekler (dosya adları çalıştırma kimliği taşır);
+    bir bölümün önceki dosyaları yalnızca replace=True ile silinir.
+    """
+
+    def __init__(self, root=None):
+        self.root = root or settings.OUTPUT_PARQUET_DIR
+
+    @property
+    def available(self):
+        return pa is not None
+
+    def write(self, results, replace=False):
+        """
+        Sonuçları yeni dosyalar olarak ekler; replace=True ise aynı tarihlerin
+        önceki bölümleri bu sonuçlarla değiştirilir. Yazılan satır sayısını döner.
+        """
+        if not self.available:
+            print("⚠️ pyarrow kurulu değil, Parquet çıktısı atlandı")
+            return 0
+
+        df = results_to_frame(results)
+        if df.empty:
+            return 0
+
+        os.makedirs(self.root, exist_ok=True)
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        pq.write_to_dataset(
+            table,
+            self.root,
+            partition_cols=[PARTITION_COLUMN],
+            basename_template=f"{new_run_id()}-{{i}}.parquet",
+            existing_data_behavior="delete_matching" if replace else "overwrite_or_ignore"
+        )
+        print(f"✅ Parquet sonuçları kaydedildi: {self.root} ({len(df)} satır)")
+        return len(df)
+
+    def open_writer(self, flush_rows=None, flush_seconds=None, replace=False, run_id=None, guard=None):
+        """Sonuçları geldikçe yazan ResultWriter döner (pyarrow yoksa None)"""
+        if not self.available:
+            print("⚠️ pyarrow kurulu değil, Parquet çıktısı atlandı")
+            return None
+        return ResultWriter(self.root, flush_rows, flush_seconds, replace, run_id, guard)
+
+    def read(self, start_date=None, end_date=None, columns=None):
+        """
+        Tarih aralığındaki (YYYY-MM-DD, uçlar dahil) sonuçları okur.
+        Filtre bölüm dizinlerine uygulanır, aralık dışındaki dosyalar açılmaz.
+        """
+        if not self.available:
+            raise ImportError("Parquet okumak için pyarrow gerekli")
+
+        dataset = _unified_dataset(self.root, partitioning="hive")
+        expression = None
+        if start_date is not None:
+            expression = ds.field(PARTITION_COLUMN) >= start_date
+        if end_date is not None:
+            upper = ds.field(PARTITION_COLUMN) <= end_date
+            expression = upper if expression is None else expression & upper
+        return dataset.to_table(columns=columns, filter=expression).to_pandas()
+
+
+def _unified_dataset(source, partitioning=None):
+    """
+    Parça parça yazılmış dosyalarda sütun kümesi farklı olabilir (ör. bir parçada
+    hiç yedek sonuç yoksa); şemalar birleştirilerek tek veri kümesi açılır
+    """
+    dataset = ds.dataset(source, format="parquet", partitioning=partitioning)
+    schemas = {fragment.physical_schema for fragment in dataset.get_fragments()}
+    if len(schemas) <= 1:
+        return dataset
+    schema = pa.unify_schemas([dataset.schema, *schemas], promote_options="permissive")
+    return ds.dataset(source, schema=schema, format="parquet", partitioning=partitioning)
+
+
+class ResultWriter:
+    """
+    Sonuçları geldikçe tamponlar ve belirli satır sayısına ya da süreye
+    ulaşınca tarih bölümlerine ayrı Parquet dosyaları olarak yazar; böylece
+    bellekte yalnızca bir tampon tutulur ve ilk sonuçlar hemen diske iner.
+    Başka çalıştırmaların dosyalarına dokunulmaz; yalnızca replace=True ise bir
+    tarihe bu çalıştırmada ilk kez yazılırken o bölümün önceki dosyaları silinir.
+    run_id verilirse (--resume, günlükteki kimlik) o kimliğin önceki dosyaları
+    açılışta silinir: günlükten yeniden gelen sonuçlar tekrar eklenmez.
+    guard verilirse her dosya yazımından önce çağrılır (ör. shard sahipliği kaybedildiyse hata yükseltir).
+    """
+
+    def __init__(self, root, flush_rows=None, flush_seconds=None, replace=False, run_id=None, guard=None):
+        self.root = root
+        self.flush_rows = flush_rows or settings.PIPELINE_FLUSH_ROWS
+        self.flush_seconds = flush_seconds or settings.PIPELINE_FLUSH_SECONDS
+        self.replace = replace
+        self.guard = guard
+        self.rows_written = 0
+        self.files = []
+        self._run_id = run_id or new_run_id()
+        self._buffer = []
+        self._partitions = set()
+        self._part = 0
+        self._last_flush = time.monotonic()
+        os.makedirs(self.root, exist_ok=True)
+        if run_id:
+            self._clear_run()
+
+    def add(self, result):
+        self._buffer.append(result)
+        if (len(self._buffer) >= self.flush_rows
+                or time.monotonic() - self._last_flush >= self.flush_seconds):
+            self.flush()
+
+    def flush(self):
+        self._last_flush = time.monotonic()
+        if not self._buffer:
+            return
+        if self.guard is not None:
+            self.guard()
+        with metrics.timer('parquet'):
+            self._write(results_to_frame(self._buffer))
+        self._buffer = []
+
+    def _write(self, df):
+        if self.replace:
+            for partition in set(df[PARTITION_COLUMN]) - self._partitions:
+                self._clear_partition(partition)
+                self._partitions.add(partition)
+
+        pq.write_to_dataset(
+            pa.Table.from_pandas(df, preserve_index=False),
+            self.root,
+            partition_cols=[PARTITION_COLUMN],
+            basename_template=f"{self._run_id}-{self._part:05d}-{{i}}.parquet",
+            existing_data_behavior="overwrite_or_ignore",
+            file_visitor=lambda written: self.files.append(written.path)
+        )
+        self._part += 1
+        self.rows_written += len(df)
+
+    def _clear_partition(self, partition):
+        for path in glob.glob(os.path.join(self.root, f"{PARTITION_COLUMN}={partition}", "*.parquet")):
+            os.remove(path)
+
+    def _clear_run(self):
+        """Aynı kimlikle önceden (yarıda kalan çalıştırmada) yazılmış dosyaları siler"""
+        previous = glob.glob(os.path.join(self.root, f"{PARTITION_COLUMN}=*", f"{self._run_id}-*.parquet"))
+        for path in previous:
+            os.remove(path)
+        if previous:
+            print(f"♻️ Yarıda kalan çalıştırmanın {len(previous)} Parquet dosyası günlükten yeniden yazılacak")
+
+    def close(self):
+        self.flush()
+        print(f"✅ Parquet sonuçları kaydedildi: {self.root} ({self.rows_written} satır, {len(self.files)} dosya)")
+        return self.rows_written
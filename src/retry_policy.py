@@ -0,0 +1,126 @@
+import asyncio
+import random
+import time
+from email.utils import parsedate_to_datetime
+import openai
+
+# Yeniden denemeye değer HTTP durum kodları (5xx ayrıca kontrol edilir)
+RETRYABLE_STATUS_CODES = {408, 409, 429}
+
+
+def is_rate_limit(error):
+    return isinstance(error, openai.RateLimitError)
+
+
+def is_retryable(error):
+    """429, 5xx, zaman aşımı ve bağlantı hataları yeniden denenir"""
+    if isinstance(error, openai.APIConnectionError):  # APITimeoutError dahil
+        return True
+    if isinstance(error, openai.APIStatusError):
+        return error.status_code in RETRYABLE_STATUS_CODES or error.status_code >= 500
+    return False
+
+
+def is_invalid_output(error):
+    """Yapılandırılmış çıktının şemaya uymadığı ya da kesildiği hatalar (model yönlendirmede üst modele çıkılır)"""
+    return isinstance(error, (ValueError, openai.LengthFinishReasonError, openai.ContentFilterFinishReasonError))
+
+
+def error_reason(error):
+    """Hata için kısa etiket - yedek sonuçlarda hata_nedeni olarak kullanılır"""
+    if is_rate_limit(error):
+        return "rate_limit"
+    if isinstance(error, openai.APIConnectionError):
+        return "baglanti_hatasi"
+    if isinstance(error, openai.APIStatusError):
+        return "sunucu_hatasi" if error.status_code >= 500 else "istek_hatasi"
+    if isinstance(error, ValueError):
+        return "gecersiz_yanit"
+    return "analiz_hatasi"
+
+
+def retry_after_seconds(error):
+    """Yanıttaki retry-after-ms / Retry-After başlığını saniyeye çevirir"""
+    response = getattr(error, "response", None)
+    if response is None:
+        return None
+    headers = response.headers
+
+    retry_after_ms = headers.get("retry-after-ms")
+    if retry_after_ms:
+        try:
+            return float(retry_after_ms) / 1000
+        except ValueError:
+            pass
+
+    retry_after = headers.get("retry-after")
+    if retry_after:
+        try:
+            return float(retry_after)
+        except ValueError:
+            try:
+                return max(0.0, parsedate_to_datetime(retry_after).timestamp() - time.time())
+            except (TypeError, ValueError):
+                return None
+    return None
+
+
+class RetryPolicy:
+    """Retry-After başlığını dikkate alan, jitter'lı üstel geri çekilme politikası"""
+
+    def __init__(self, max_retries=5, base_delay=1.0, max_delay=60.0):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def should_retry(self, error, attempt):
+        return attempt < self.max_retries and is_retryable(error)
+
+    def delay(self, error, attempt):
+        """Sunucu Retry-After verdiyse ona, yoksa tam jitter'lı üstel süreye göre bekler"""
+        retry_after = retry_after_seconds(error)
+        if retry_after is not None:
+            return min(self.max_delay, retry_after) + random.uniform(0, self.base_delay / 4)
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+
+class AdaptiveConcurrencyLimiter:
+    """
+    AIMD eşzamanlılık kontrolü: başarılı yanıtlarda limit yavaşça artar (additive
+    increase), 429 alındığında yarıya iner (multiplicative decrease).
+    """
+
+    def __init__(self, initial, min_limit=1, max_limit=None, decrease_factor=0.5, cooldown=1.0):
+        self.max_limit = max_limit or initial
+        self.min_limit = min_limit
+        self.limit = float(max(min_limit, min(initial, self.max_limit)))
+        self.decrease_factor = decrease_factor
+        self.cooldown = cooldown  # Aynı 429 dalgası için tekrar tekrar düşürmemek için
+        self.in_flight = 0
+        self.decrease_count = 0
+        self._last_decrease = 0.0
+        self._condition = asyncio.Condition()
+
+    async def __aenter__(self):
+        async with self._condition:
+            while self.in_flight >= int(self.limit):
+                await self._condition.wait()
+            self.in_flight += 1
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        async with self._condition:
+            self.in_flight -= 1
+            self._condition.notify_all()
+
+    def on_success(self):
+        # Her tam "limit" kadar başarıda limit 1 artar
+        self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+
+    def on_throttle(self):
+        now = time.monotonic()
+        if now - self._last_decrease < self.cooldown:
+            return
+        self._last_decrease = now
+        self.limit = max(self.min_limit, self.limit * self.decrease_factor)
+        self.decrease_count += 1
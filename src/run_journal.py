@@ -0,0 +1,77 @@
+import json
+import os
+import threading
+
+
+class RunJournal:
+    """
+    Analiz çalıştırmaları için salt-ekleme (append-only) JSONL günlüğü.
+    Her satır tamamlanan bir sohbetin sohbet_id'sini ve analiz sonucunu içerir;
+    yarıda kalan bir çalıştırma --resume ile kaldığı yerden devam eder. İlk satır
+    çalıştırmanın Parquet dosyalarının kimliğini (run_id) taşır; devam eden
+    çalıştırma aynı kimliği kullanır ve yalnızca kendi dosyalarını yeniden yazar.
+    guard verilirse her kayıttan önce çağrılır (ör. shard sahipliği kaybedildiyse hata yükseltir).
+    """
+
+    def __init__(self, path, resume=False, run_id=None, guard=None):
+        self.path = path
+        self.guard = guard
+        self.completed = {}
+        self.run_id = None
+        # Async modda kayıtlar iş parçacıklarından yazılır
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        if resume and os.path.exists(path):
+            self._load()
+            print(f"♻️ Günlükten devam ediliyor: {len(self.completed)} sohbet zaten tamamlanmış")
+            self._file = open(path, 'a', encoding='utf-8')
+        else:
+            self._file = open(path, 'w', encoding='utf-8')
+
+        # Kimliği olmayan (eski ya da yeni) günlüğe verilen kimlik yazılır
+        if self.run_id is None and run_id is not None:
+            self.run_id = run_id
+            self._file.write(json.dumps({'run_id': run_id}) + '\n')
+            self._file.flush()
+
+    def _load(self):
+        """Önceki çalıştırmanın kayıtlarını okur - yarım kalan son satır atlanır"""
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if 'run_id' in entry:
+                    self.run_id = entry['run_id']
+                    continue
+                self.completed[str(entry['sohbet_id'])] = entry['result']
+
+        # Yarım satır kaldıysa sonraki kayıt yeni satırdan başlasın
+        with open(self.path, 'rb+') as f:
+            if f.seek(0, os.SEEK_END) == 0:
+                return
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) != b'\n':
+                f.write(b'\n')
+
+    def get(self, sohbet_id):
+        """Tamamlanmış sohbetin kayıtlı sonucunu döner, yoksa None"""
+        return self.completed.get(str(sohbet_id))
+
+    def record(self, result):
+        """Tamamlanan sonucu hemen diske yazar"""
+        if self.guard is not None:
+            self.guard()
+        line = json.dumps({'sohbet_id': str(result['sohbet_id']), 'result': result}, ensure_ascii=False) + '\n'
+        with self._lock:
+            self._file.write(line)
+            self._file.flush()
+
+    def close(self):
+        with self._lock:
+            self._file.close()
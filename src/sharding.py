@@ -0,0 +1,321 @@
+import glob
+import json
+import os
+import shutil
+import socket
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+from datetime import datetime
+from config.settings import settings
+from src.result_store import PARTITION_COLUMN
+from utils.helpers import write_text_atomic
+
+MANIFEST_FILE = "shards.json"
+DONE_FILE = "tamamlandi.json"
+CLAIM_PREFIX = "sahip-"
+STAGING_PREFIX = "nesil-"
+PUBLISHED_DIR = "cikti"
+
+
+class ShardLostError(RuntimeError):
+    """Shard'ın sahipliği süresi dolup başka bir sürece geçti"""
+
+
+def shard_of(sohbet_id, shard_count):
+    """sohbet_id'nin shard'ı; her süreçte ve her makinede aynıdır"""
+    return zlib.crc32(str(sohbet_id).encode('utf-8')) % shard_count
+
+
+def iter_shard(raw_chats, shard_index, shard_count):
+    """Ham sohbetlerden yalnızca verilen shard'a düşenleri döner"""
+    for chat in raw_chats:
+        if shard_of(chat.get('sohbet_id', ''), shard_count) == shard_index:
+            yield chat
+
+
+def run_identity(data_file, run_id=None):
+    """
+    Shard dizinini tek bir çalıştırmaya bağlayan kimlik: verilen --run-id ya da
+    veri dosyasının adı, boyutu ve değişiklik zamanı. Aynı adla gelen yeni günün
+    verisi ayrı bir çalıştırma sayılır.
+    """
+    if run_id:
+        return run_id
+    if not data_file:
+        return None
+    stat = os.stat(data_file)
+    return f"{os.path.basename(data_file)}:{stat.st_size}:{stat.st_mtime_ns}"
+
+
+def shard_cache_path(cache_file, shard_index, shard_count):
+    """
+    Shard başına ayrı sonuç önbelleği: süreçler tek SQLite dosyasında yazma kilidi
+    için beklemez. Shard ataması sabit olduğundan aynı sohbet hep aynı önbelleğe düşer.
+    """
+    root, ext = os.path.splitext(cache_file)
+    return f"{root}.shard-{shard_index:04d}-of-{shard_count:04d}{ext}"
+
+
+class ShardQueue:
+    """
+    Paylaşılan bir dizin üzerinden shard dağıtımı. Her shard'ın kendi alt dizini
+    vardır; sahiplik O_EXCL ile oluşturulan nesil numaralı dosyayla alınır, işlenirken
+    düzenli dokunuşla canlı tutulur. Süresi dolan (süreci ölmüş) sahiplik bir sonraki
+    nesil dosyasını ilk oluşturan sürece geçer; süreç yalnızca kendi oluşturduğu
+    dosyaya dokunur ve onu siler, dosyası gittiyse shard'ı tamamlanmış yazamaz.
+    Her nesil çıktılarını kendi hazırlık dizinine yazar (devralan nesil öncekinin
+    günlüğüyle başlar); tamamlanan nesil dizinini özetiyle birlikte tek bir rename
+    ile yayımlar. Süresi dolmuş eski sahibin geç yazdıkları yayımlanmaz. Tek makinede
+    çok süreçle ya da ortak depolamalı küçük bir kümede aynı şekilde çalışır.
+    """
+
+    def __init__(self, root, shard_count, data_file=None, claim_timeout=None, run_id=None, resume_files=None):
+        if shard_count < 1:
+            raise ValueError("Shard sayısı en az 1 olmalı")
+        self.root = root
+        self.shard_count = shard_count
+        self.claim_timeout = claim_timeout or settings.SHARD_CLAIM_TIMEOUT
+        self.worker = f"{socket.gethostname()}:{os.getpid()}"
+        # Bu sürecin oluşturduğu sahiplik dosyaları (shard indeksi → yol)
+        self._held = {}
+        # Devralan neslin kaldığı yerden devam etmesi için kopyaladığı çıktılar
+        self.resume_files = resume_files or (os.path.basename(settings.RUN_JOURNAL),
+                                             os.path.basename(settings.BATCH_WORK_DIR))
+        os.makedirs(root, exist_ok=True)
+        self.run_id = run_identity(data_file, run_id)
+        self._check_manifest()
+
+    @classmethod
+    def open(cls, root, claim_timeout=None):
+        """Var olan shard dizinini shard sayısını bilmeden açar"""
+        path = os.path.join(root, MANIFEST_FILE)
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"Shard dizini bulunamadı: {path}")
+        with open(path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+        return cls(root, manifest['shard_count'], claim_timeout=claim_timeout, run_id=manifest.get('run_id'))
+
+    def _check_manifest(self):
+        """Aynı dizini farklı shard sayısı ya da başka bir çalıştırmanın (veri dosyası, --run-id) kimliğiyle kullanmayı engeller"""
+        path = os.path.join(self.root, MANIFEST_FILE)
+        manifest = {'shard_count': self.shard_count, 'run_id': self.run_id}
+        if not os.path.exists(path):
+            write_text_atomic(path, json.dumps(manifest, ensure_ascii=False))
+            return
+        with open(path, 'r', encoding='utf-8') as f:
+            existing = json.load(f)
+        if existing['shard_count'] != self.shard_count or existing.get('run_id') != self.run_id:
+            raise ValueError(f"{self.root} başka bir shard çalıştırmasına ait ({existing['shard_count']} shard, "
+                             f"kimlik {existing.get('run_id')}); yeni bir --shard-dir ya da aynı --run-id kullanın")
+
+    def shard_dir(self, index):
+        return os.path.join(self.root, f"shard-{index:04d}")
+
+    def staging_dir(self, index):
+        """Bu sürecin sahip olduğu neslin çıktı dizini (yayımlanana kadar)"""
+        return os.path.join(self.shard_dir(index), f"{STAGING_PREFIX}{_generation(self._held[index]):04d}")
+
+    def published_dir(self, index):
+        """Tamamlanan shard'ın yayımlanmış çıktı dizini"""
+        return os.path.join(self.shard_dir(index), PUBLISHED_DIR)
+
+    def _claims(self, index):
+        """Shard'ın sahiplik dosyaları, nesil sırasıyla"""
+        return sorted(glob.glob(os.path.join(self.shard_dir(index), f"{CLAIM_PREFIX}*")))
+
+    def _claim_path(self, index, generation):
+        return os.path.join(self.shard_dir(index), f"{CLAIM_PREFIX}{generation:04d}")
+
+    def _expired(self, path):
+        try:
+            return time.time() - os.path.getmtime(path) > self.claim_timeout
+        except FileNotFoundError:
+            return True
+
+    def is_done(self, index):
+        return os.path.exists(os.path.join(self.published_dir(index), DONE_FILE))
+
+    def summary(self, index):
+        """Tamamlanmış shard'ın özeti"""
+        with open(os.path.join(self.published_dir(index), DONE_FILE), 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def claim(self, index=None):
+        """
+        Verilen (ya da sıradaki boşta) shard'ın sahipliğini alır, indeksini döner;
+        alınacak shard yoksa None. Devralınan shard'ın günlüğü yeni neslin dizinine kopyalanır.
+        """
+        for candidate in ([index] if index is not None else range(self.shard_count)):
+            if not self.is_done(candidate) and self._try_claim(candidate):
+                return candidate
+        return None
+
+    def _try_claim(self, index):
+        os.makedirs(self.shard_dir(index), exist_ok=True)
+        claims = self._claims(index)
+        generation = 0
+        if claims:
+            if not self._expired(claims[-1]):
+                return False
+            generation = _generation(claims[-1]) + 1
+        path = self._claim_path(index, generation)
+        try:
+            fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            return False
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(self.worker)
+        self._held[index] = path
+        # Eski neslin dosyaları artık kimseye ait değil
+        for old in claims:
+            _remove(old)
+        self._prepare_staging(index)
+        return True
+
+    def _prepare_staging(self, index):
+        """
+        Yeni neslin dizinini önceki neslin günlüğü (ve Batch durumu) ile başlatır.
+        Önceki nesil dizinine dokunulmaz: eski sahip hâlâ yazıyor olabilir,
+        dizinler shard yayımlanınca silinir.
+        """
+        staging = self.staging_dir(index)
+        previous = [path for path in sorted(glob.glob(os.path.join(self.shard_dir(index), f"{STAGING_PREFIX}*")))
+                    if path != staging]
+        os.makedirs(staging, exist_ok=True)
+        if not previous:
+            return
+        for name in self.resume_files:
+            source = os.path.join(previous[-1], name)
+            if os.path.isdir(source):
+                shutil.copytree(source, os.path.join(staging, name), dirs_exist_ok=True)
+            elif os.path.exists(source):
+                shutil.copy2(source, os.path.join(staging, name))
+
+    def holds(self, index):
+        """Bu sürecin oluşturduğu sahiplik dosyası hâlâ yerinde mi (devralınmadı mı)"""
+        path = self._held.get(index)
+        return path is not None and os.path.exists(path)
+
+    def check(self, index):
+        """Sahiplik kaybedildiyse ShardLostError yükseltir (yazımlardan önce çağrılır)"""
+        if not self.holds(index):
+            raise ShardLostError(f"Shard {index} sahipliği kaybedildi; shard'ı devralan süreç tamamlayacak")
+
+    @contextmanager
+    def hold(self, index):
+        """
+        Shard işlenirken bu sürecin sahiplik dosyasını arka planda düzenli dokunuşla
+        canlı tutar; dosya gittiyse (süresi dolup devralındıysa) dokunuş durur.
+        İşlem hata verirse sahiplik bırakılır, shard başka bir sürece geçebilir.
+        """
+        path = self._held[index]
+        stop = threading.Event()
+
+        def beat():
+            while not stop.wait(self.claim_timeout / 4):
+                try:
+                    os.utime(path)
+                except FileNotFoundError:
+                    print(f"⚠️ Shard {index} sahipliği kaybedildi (başka bir sürece geçti)")
+                    return
+                except OSError:
+                    pass
+
+        thread = threading.Thread(target=beat, daemon=True)
+        thread.start()
+        try:
+            yield
+        except BaseException:
+            self.release(index)
+            raise
+        finally:
+            stop.set()
+            thread.join()
+
+    def release(self, index):
+        """Yalnızca bu sürecin sahiplik dosyasını siler (devralan sürecinkine dokunmaz)"""
+        path = self._held.pop(index, None)
+        if path is not None:
+            _remove(path)
+
+    def complete(self, index, summary):
+        """
+        Sahiplik hâlâ bu süreçteyse shard özetini neslin dizinine yazar, dizini tek
+        bir rename ile yayımlar ve sahipliği bırakır. Shard'ı başka bir nesil
+        yayımladıysa rename başarısız olur; iki nesil birden yayımlanamaz.
+        """
+        try:
+            self.check(index)
+            staging = self.staging_dir(index)
+            summary = {'shard': index, 'worker': self.worker,
+                       'finished': datetime.now().isoformat(timespec='seconds'), **summary}
+            write_text_atomic(os.path.join(staging, DONE_FILE), json.dumps(summary, ensure_ascii=False))
+            try:
+                os.rename(staging, self.published_dir(index))
+            except OSError as e:
+                raise ShardLostError(f"Shard {index} başka bir süreç tarafından tamamlandı") from e
+        except ShardLostError:
+            self.release(index)
+            raise
+        self.release(index)
+        # Yayımlanmayan (devralınmış ya da eski) nesillerin dizinleri
+        for path in glob.glob(os.path.join(self.shard_dir(index), f"{STAGING_PREFIX}*")):
+            shutil.rmtree(path, ignore_errors=True)
+
+    def status(self):
+        """(tamamlanan, çalışan, bekleyen) shard indeksleri"""
+        done, running, pending = [], [], []
+        for index in range(self.shard_count):
+            if self.is_done(index):
+                done.append(index)
+                continue
+            claims = self._claims(index)
+            (running if claims and not self._expired(claims[-1]) else pending).append(index)
+        return done, running, pending
+
+
+def merge_parquet(sources, target, replace=False):
+    """
+    Shard'ların Parquet dosyalarını hedef veri kümesine ekler (aynı dosya sisteminde
+    kopyalamadan bağlayarak, değilse kopyalayarak). Hedefteki dosyalar silinmez;
+    replace verilirse shard'larda bulunan tarih bölümlerinin önceki dosyaları
+    silinir. Hedefte zaten bulunan dosya (önceki birleştirme) atlanır; eklenen
+    dosya sayısını döner.
+    """
+    files = []
+    for source in sources:
+        files.extend(glob.glob(os.path.join(source, f"{PARTITION_COLUMN}=*", "*.parquet")))
+
+    if replace:
+        for partition in {os.path.basename(os.path.dirname(path)) for path in files}:
+            for path in glob.glob(os.path.join(target, partition, "*.parquet")):
+                os.remove(path)
+
+    added = 0
+    for path in files:
+        # Dosya adları yazıcının çalıştırma kimliğini içerir: aynı ad aynı dosyadır
+        destination = os.path.join(target, os.path.basename(os.path.dirname(path)), os.path.basename(path))
+        if os.path.exists(destination):
+            continue
+        os.makedirs(os.path.dirname(destination), exist_ok=True)
+        try:
+            os.link(path, destination)
+        except FileExistsError:
+            continue
+        except OSError:
+            shutil.copy2(path, destination)
+        added += 1
+    return added
+
+
+def _generation(claim_path):
+    return int(os.path.basename(claim_path)[len(CLAIM_PREFIX):])
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
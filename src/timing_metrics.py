@@ -0,0 +1,236 @@
+import json
+import math
+import os
+from collections import Counter
+import numpy as np
+import pandas as pd
+from utils.helpers import write_text_atomic
+
+TIMESTAMP_FORMAT = "%d.%m.%Y %H:%M:%S"
+
+# Sohbet başına sayısal zamanlama metrikleri
+TIMING_COLUMNS = ['toplam_sure_sn', 'ilk_yanit_sn', 'ort_bot_yanit_sn', 'musteri_tur_sayisi']
+
+# Yüzdelikler metrik başına bu kadar değere kadar tam hesaplanır
+EXACT_LIMIT = 10_000
+# Sonrasında logaritmik kovaların göreli hatası
+RELATIVE_ACCURACY = 0.005
+_GAMMA = (1 + RELATIVE_ACCURACY) / (1 - RELATIVE_ACCURACY)
+# Bundan küçük mutlak değerler sıfır kovasına düşer
+MIN_BUCKET_VALUE = 1e-6
+
+
+def _timing_frame(chats):
+    """Bir grup ham sohbetin metriklerini tüm zaman damgalarını tek seferde parse ederek hesaplar"""
+    chat_ids = []
+    starts = []
+    message_ids = []
+    is_customer = []
+    timestamps = []
+    for chat in chats:
+        sohbet_id = str(chat.get('sohbet_id', ''))
+        chat_ids.append(sohbet_id)
+        starts.append(chat.get('tarih_saat'))
+        for message in chat.get('mesajlar', []):
+            message_ids.append(sohbet_id)
+            is_customer.append(message.get('sender') == 'Müşteri')
+            timestamps.append(message.get('timestamp'))
+
+    messages = pd.DataFrame({
+        'sohbet_id': message_ids,
+        'musteri': is_customer,
+        'zaman': pd.to_datetime(pd.Series(timestamps, dtype=object), format=TIMESTAMP_FORMAT, errors='coerce')
+    })
+    started = pd.Series(
+        pd.to_datetime(pd.Series(starts, dtype=object), format=TIMESTAMP_FORMAT, errors='coerce').to_numpy(),
+        index=chat_ids
+    )
+
+    grouped = messages.groupby('sohbet_id', sort=False)
+    previous_customer = grouped['musteri'].shift(fill_value=False)
+
+    # Müşteri turu: art arda gelen müşteri mesajları tek tur sayılır
+    new_turn = messages['musteri'] & ~previous_customer
+    turn_start = messages['zaman'].where(new_turn).groupby(messages['sohbet_id']).ffill()
+
+    # Bot yanıt süresi: müşteri turunun ilk mesajından turdan sonraki ilk bot mesajına
+    bot_reply = ~messages['musteri'] & previous_customer
+    reply_gaps = (messages['zaman'] - turn_start).dt.total_seconds()[bot_reply]
+    reply_groups = reply_gaps.groupby(messages['sohbet_id'][bot_reply], sort=False)
+
+    start_times = started.fillna(grouped['zaman'].first().reindex(started.index))
+    last_times = grouped['zaman'].last().reindex(started.index)
+
+    frame = pd.DataFrame({
+        'toplam_sure_sn': (last_times - start_times).dt.total_seconds(),
+        'ilk_yanit_sn': reply_groups.first().reindex(started.index),
+        'ort_bot_yanit_sn': reply_groups.mean().reindex(started.index),
+        'musteri_tur_sayisi': new_turn.groupby(messages['sohbet_id'], sort=False).sum()
+                                      .reindex(started.index).fillna(0).astype('int32')
+    }, index=started.index)
+    frame.index.name = 'sohbet_id'
+    return frame
+
+
+def add_timing_metrics(chat_infos, raw_chats=None):
+    """
+    Bir parça chat_info'nun metriklerini toplu hesaplayıp her sohbete sayısal alan
+    olarak ekler; sonuçlara _combine_result ile taşınır. Ham sohbetler verilmezse
+    chat_info['raw_chat'] kullanılır. Hesaplanan tabloyu döner.
+    """
+    if raw_chats is None:
+        raw_chats = [chat_info['raw_chat'] for chat_info in chat_infos]
+    timing = _timing_frame(raw_chats)
+    for chat_info, metrics in zip(chat_infos, timing.to_dict('records')):
+        chat_info.update(metrics)
+    return timing
+
+
+def has_timing_metrics(chat_info):
+    """Metrikler (ör. ön işleme süreçlerinde) zaten eklenmiş mi"""
+    return TIMING_COLUMNS[0] in chat_info
+
+
+class _ColumnStats:
+    """Tek metriğin akan özeti (bkz. TimingStats)"""
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.values = []  # Kovalara katlanınca None
+        self.zeros = 0
+        self.positive = Counter()
+        self.negative = Counter()
+
+    def add(self, value):
+        self.count += 1
+        self.total += value
+        if self.values is not None:
+            self.values.append(value)
+            if len(self.values) > EXACT_LIMIT:
+                self._fold()
+        else:
+            self._bucket(value)
+
+    def _fold(self):
+        values, self.values = self.values, None
+        for value in values:
+            self._bucket(value)
+
+    def _bucket(self, value):
+        if abs(value) < MIN_BUCKET_VALUE:
+            self.zeros += 1
+        elif value > 0:
+            self.positive[math.ceil(math.log(value, _GAMMA))] += 1
+        else:
+            self.negative[math.ceil(math.log(-value, _GAMMA))] += 1
+
+    def merge(self, other):
+        self.count += other.count
+        self.total += other.total
+        if self.values is not None and other.values is not None and \
+                len(self.values) + len(other.values) <= EXACT_LIMIT:
+            self.values.extend(other.values)
+            return
+        if self.values is not None:
+            self._fold()
+        for value in other.values or ():
+            self._bucket(value)
+        self.zeros += other.zeros
+        self.positive.update(other.positive)
+        self.negative.update(other.negative)
+
+    def quantile(self, q):
+        if self.values is not None:
+            return float(np.quantile(self.values, q))
+        # Kovalar küçükten büyüğe; kova değeri sınırlarının göreli ortası
+        buckets = [(-_bucket_value(key), count) for key, count in sorted(self.negative.items(), reverse=True)]
+        buckets.append((0.0, self.zeros))
+        buckets.extend((_bucket_value(key), count) for key, count in sorted(self.positive.items()))
+        rank = q * (self.count - 1)
+        seen = 0
+        for value, count in buckets:
+            seen += count
+            if seen > rank:
+                return value
+        return buckets[-1][0]
+
+    def to_dict(self):
+        return {'count': self.count, 'total': self.total, 'values': self.values, 'zeros': self.zeros,
+                'positive': dict(self.positive), 'negative': dict(self.negative)}
+
+    @classmethod
+    def from_dict(cls, data):
+        stats = cls()
+        stats.count = data['count']
+        stats.total = data['total']
+        stats.values = data['values']
+        stats.zeros = data['zeros']
+        stats.positive.update({int(key): count for key, count in data['positive'].items()})
+        stats.negative.update({int(key): count for key, count in data['negative'].items()})
+        return stats
+
+
+def _bucket_value(key):
+    return 2 * _GAMMA ** key / (_GAMMA + 1)
+
+
+class TimingStats:
+    """
+    Sohbet zaman metriklerinin akan özeti: sonuçlar geldikçe eklenir, bellek
+    sohbet sayısından bağımsızdır. Ortalama tam hesaplanır; yüzdelikler metrik
+    başına EXACT_LIMIT değere kadar tam, sonrasında göreli hatası RELATIVE_ACCURACY
+    olan logaritmik kovalardan tahmin edilir. Shard özetleri merge ile birleşir.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.columns = {column: _ColumnStats() for column in TIMING_COLUMNS}
+
+    def add(self, result):
+        """Sonuca taşınmış metrikleri ekler (eksik ya da boş değerler atlanır)"""
+        self.count += 1
+        for column, stats in self.columns.items():
+            value = result.get(column)
+            if value is not None and not pd.isna(value):
+                stats.add(float(value))
+
+    def merge(self, other):
+        self.count += other.count
+        for column, stats in self.columns.items():
+            stats.merge(other.columns[column])
+        return self
+
+    def summary(self, percentiles=(0.5, 0.9, 0.95)):
+        """Her metrik için ortalama ve yüzdelik değerleri döner"""
+        summary = {}
+        for column, stats in self.columns.items():
+            if not stats.count:
+                continue
+            summary[column] = {
+                'ortalama': round(stats.total / stats.count, 1),
+                **{f"p{int(p * 100)}": round(stats.quantile(p), 1) for p in percentiles}
+            }
+        return summary
+
+    def to_dict(self):
+        return {'count': self.count, 'columns': {column: stats.to_dict() for column, stats in self.columns.items()}}
+
+    @classmethod
+    def from_dict(cls, data):
+        timing = cls()
+        timing.count = data['count']
+        for column, stats in data['columns'].items():
+            timing.columns[column] = _ColumnStats.from_dict(stats)
+        return timing
+
+    def save(self, path):
+        write_text_atomic(path, json.dumps(self.to_dict()))
+
+    @classmethod
+    def load(cls, path):
+        """Kayıtlı özeti yükler; dosya yoksa boş özet döner"""
+        if not os.path.exists(path):
+            return cls()
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls.from_dict(json.load(f))
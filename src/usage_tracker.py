@@ -0,0 +1,49 @@
+from src.metrics import metrics
+
+
+def _field(obj, name):
+    """Yanıt nesnesinden ya da dict'ten alan okur"""
+    if obj is None:
+        return None
+    if isinstance(obj, dict):
+        return obj.get(name)
+    return getattr(obj, name, None)
+
+
+class UsageTracker:
+    """
+    API yanıtlarındaki token kullanımını toplar; sağlayıcı tarafı prompt
+    önbelleğinden gelen (cached) ve gelmeyen prompt tokenlarını ayrı tutar.
+    """
+
+    def __init__(self):
+        self.requests = 0
+        self.prompt_tokens = 0
+        self.cached_tokens = 0
+        self.completion_tokens = 0
+
+    def record(self, usage):
+        """completion.usage (nesne ya da Batch API'deki dict) kaydeder"""
+        if usage is None:
+            return
+        prompt_tokens = _field(usage, 'prompt_tokens') or 0
+        completion_tokens = _field(usage, 'completion_tokens') or 0
+        self.requests += 1
+        self.prompt_tokens += prompt_tokens
+        self.completion_tokens += completion_tokens
+        metrics.observe('prompt_tokens', prompt_tokens)
+        metrics.observe('completion_tokens', completion_tokens)
+        details = _field(usage, 'prompt_tokens_details')
+        self.cached_tokens += _field(details, 'cached_tokens') or 0
+
+    def summary(self):
+        """Önbellekli / önbelleksiz token dağılımını döner"""
+        uncached = self.prompt_tokens - self.cached_tokens
+        return {
+            'requests': self.requests,
+            'prompt_tokens': self.prompt_tokens,
+            'cached_tokens': self.cached_tokens,
+            'uncached_tokens': uncached,
+            'completion_tokens': self.completion_tokens,
+            'cached_rate': round((self.cached_tokens / self.prompt_tokens) * 100, 1) if self.prompt_tokens else 0.0
+        }
@@ -1,6 +1,32 @@
+import io
+import itertools
 import json
+import os
+import tempfile
 import pandas as pd
 from datetime import datetime
+from config.settings import settings
+
+# mkstemp dosyaları 0600 açar; atomik yazılan dosyalar normal open() izinleriyle kalsın
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+# LOG_LEVEL=WARNING sohbet başına ilerleme/başarı satırlarını, ERROR yeniden deneme uyarılarını da susturur
+LOG_LEVELS = {'DEBUG': 10, 'INFO': 20, 'WARNING': 30, 'ERROR': 40}
+
+def log(message, level='INFO'):
+    """Mesajı yalnızca seviyesi settings.LOG_LEVEL ve üzerindeyse yazdırır"""
+    if LOG_LEVELS[level] >= LOG_LEVELS.get(str(settings.LOG_LEVEL).upper(), LOG_LEVELS['INFO']):
+        print(message)
+
+async def aiter_items(items):
+    """Senkron ya da asenkron yinelenebilir nesneyi async for ile gezer"""
+    if hasattr(items, '__aiter__'):
+        async for item in items:
+            yield item
+    else:
+        for item in items:
+            yield item
 
 def load_json_file(file_path):
     """JSON dosyasını yükler"""
@@ -11,11 +37,73 @@ def load_json_file(file_path):
         print(f"JSON yükleme hatası: {e}")
         return None
 
+def iter_json_records(file_path, chunk_size=1 << 16):
+    """
+    JSON dizisi ya da NDJSON/JSONL dosyasındaki kayıtları tek tek döner.
+    Dosya belleğe bütün olarak alınmaz; dizi formatında artımlı ayrıştırılır.
+    """
+    decoder = json.JSONDecoder()
+    with open(file_path, 'r', encoding='utf-8') as f:
+        buffer = ""
+        while not buffer:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                return
+            buffer = chunk.lstrip()
+        
+        if not buffer.startswith('['):
+            # NDJSON / JSONL: her satır bir kayıt
+            head = buffer + f.readline()
+            for line in itertools.chain(io.StringIO(head), f):
+                if line.strip():
+                    yield json.loads(line)
+            return
+        
+        # JSON dizisi: elemanları raw_decode ile tek tek çöz
+        pos = 1
+        eof = False
+        while True:
+            while pos < len(buffer) and (buffer[pos].isspace() or buffer[pos] == ','):
+                pos += 1
+            if pos < len(buffer) and buffer[pos] == ']':
+                return
+            try:
+                record, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                chunk = f.read(chunk_size)
+                eof = not chunk
+                buffer = buffer[pos:] + chunk
+                pos = 0
+                continue
+            yield record
+            pos = end
+
+def write_text_atomic(file_path, content):
+    """
+    Metni aynı dizindeki geçici dosyaya yazıp yerine taşır; okuyucular dosyayı
+    hiçbir zaman yarım yazılmış görmez. Hatalar çağırana iletilir.
+    """
+    directory = os.path.dirname(file_path) or '.'
+    os.makedirs(directory, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix='.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(content)
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(temp_path, 0o666 & ~_UMASK)
+        os.replace(temp_path, file_path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
 def save_to_txt(file_path, content):
     """Metin dosyasına kaydeder"""
     try:
-        with open(file_path, 'w', encoding='utf-8') as f:
-            f.write(content)
+        write_text_atomic(file_path, content)
         print(f"Dosya kaydedildi: {file_path}")
     except Exception as e:
         print(f"Dosya kaydetme hatası: {e}")
@@ -34,3 +122,19 @@ def parse_timestamp(timestamp_str, format="%d.%m.%Y %H:%M"):
         return datetime.strptime(timestamp_str, format)
     except:
         return None
+
+def parse_fixed_timestamp(timestamp_str):
+    """
+    'GG.AA.YYYY SS:DD:ss' biçimini strptime'a gitmeden dilimleyerek parse eder;
+    biçim uymazsa parse_timestamp'a düşer
+    """
+    if (isinstance(timestamp_str, str) and len(timestamp_str) == 19
+            and timestamp_str[2] == '.' and timestamp_str[5] == '.' and timestamp_str[10] == ' '):
+        try:
+            return datetime(
+                int(timestamp_str[6:10]), int(timestamp_str[3:5]), int(timestamp_str[0:2]),
+                int(timestamp_str[11:13]), int(timestamp_str[14:16]), int(timestamp_str[17:19])
+            )
+        except ValueError:
+            pass
+    return parse_timestamp(timestamp_str, "%d.%m.%Y %H:%M:%S")